@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from globalsat.cost import calc_capex, calc_opex, calc_total_cost_ownership
+
 
 def cost_model(satellite_launch_cost, ground_station_cost, spectrum_cost, regulation_fees, \
     digital_infrastructure_cost, ground_station_energy, subscriber_acquisition, \
@@ -8,6 +10,8 @@ def cost_model(satellite_launch_cost, ground_station_cost, spectrum_cost, regula
     """
     Calculate the total cost of ownership(TCO):
 
+    Each cost item may be a single value or an array of samples.
+
     Parameters
     ----------
     params : dict.
@@ -20,17 +24,13 @@ def cost_model(satellite_launch_cost, ground_station_cost, spectrum_cost, regula
 
     """
 
-    capex = satellite_launch_cost + ground_station_cost + spectrum_cost + regulation_fees \
-            + digital_infrastructure_cost #Addition of all capital expenditure
-
-    opex_costs = ground_station_energy + subscriber_acquisition + staff_costs \
-                 + research_development + maintenance #Addition of all recurrent expenditures
+    capex = calc_capex(satellite_launch_cost, ground_station_cost, spectrum_cost,
+            regulation_fees, digital_infrastructure_cost) #Addition of all capital expenditure
 
-    year_costs = []
-    for time in np.arange(1, assessment_period):  #Discounted for the years
-        yearly_opex = opex_costs/(((discount_rate/100) + 1)**time)
-        year_costs.append(yearly_opex)
+    opex_costs = calc_opex(ground_station_energy, subscriber_acquisition, staff_costs,
+                 research_development, maintenance) #Addition of all recurrent expenditures
 
-    total_cost_ownership = capex + sum(year_costs) + opex_costs
+    total_cost_ownership = calc_total_cost_ownership(capex, opex_costs,
+                           discount_rate, assessment_period)
 
-    return total_cost_ownership
\ No newline at end of file
+    return total_cost_ownership
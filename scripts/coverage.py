@@ -1,30 +1,39 @@
 import numpy as np
-import math as mt
+
+from globalsat.geometry import (
+    EARTH_RADIUS_POLES_KM,
+    calc_radius_at_latitude,
+    calc_latitude_steps
+)
 
 equator = 0  # Reference point
-earth_radius_equator = 6378.137  # Radius of the earth at the equator in km
-earth_radius_poles = 6356.752     # Radius of the earth at the poles in km
 
 
 def coverage_area(latitude_interval):
-    coverage_data = []
-    for angles in range(0, 91, latitude_interval):  
-        latitude2 = angles
-        numerator = (((earth_radius_equator**2)*(np.cos(np.radians(angles))))
-                     ** 2)+(((earth_radius_poles**2)*(np.sin(np.radians(angles))))**2)
-        denominator = ((((earth_radius_equator)*(np.cos(np.radians(angles))))
-                        ** 2)+(((earth_radius_poles)*(np.sin(np.radians(angles))))**2))
-        radius_at_latitude = np.sqrt(numerator/denominator)
-        latitude_change = angles-equator
-        eccentricity = 1-((earth_radius_poles**2)/(radius_at_latitude**2)) #Compute eccentricity
-        area = 4*np.pi*radius_at_latitude**2  #Circular area at given latitude
-        if eccentricity != 0:
-            earth_surface_area_at_latitude = (2*radius_at_latitude**2)*(
-                1+(((1-(eccentricity**2))/eccentricity)*(mt.atanh(eccentricity))))#surface area of the earth at given latitude
-            coverage_data.append({'Equator': equator, 'User latitude': angles,
-                                  'Radius_at_latitude': radius_at_latitude,
-                                  'Area of a circle at the latitude':
-                                  earth_surface_area_at_latitude, 'Surface_area': area})
-        else:
-            pass
+    """
+    Find the Earth's radius and surface areas from the equator to the pole
+    at the given latitude interval, which may be a fraction of a degree.
+
+    """
+    angles = calc_latitude_steps(latitude_interval)
+
+    radius_at_latitude = calc_radius_at_latitude(angles)
+    eccentricity = 1-((EARTH_RADIUS_POLES_KM**2)/(radius_at_latitude**2)) #Compute eccentricity
+    area = 4*np.pi*radius_at_latitude**2  #Circular area at given latitude
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        earth_surface_area_at_latitude = (2*radius_at_latitude**2)*(
+            1+(((1-(eccentricity**2))/eccentricity)*(np.arctanh(eccentricity))))#surface area of the earth at given latitude
+
+    valid = eccentricity != 0
+
+    coverage_data = [{'Equator': equator, 'User latitude': angle,
+                      'Radius_at_latitude': radius,
+                      'Area of a circle at the latitude': surface_area,
+                      'Surface_area': circle_area}
+                     for angle, radius, surface_area, circle_area in zip(
+                        angles[valid].tolist(), radius_at_latitude[valid].tolist(),
+                        earth_surface_area_at_latitude[valid].tolist(), area[valid].tolist())]
+
     return coverage_data
+
@@ -0,0 +1,147 @@
+"""
+Fleet lifetime run script for Globalsat.
+
+Estimates launches, on-orbit satellites and emissions by year as each
+constellation is deployed and retired satellites are replaced.
+
+Written by Bonface Osoro & Ed Oughton.
+
+December 2022
+
+"""
+import configparser
+import os
+import numpy as np
+import pandas as pd
+
+from globalsat.sim import CONSTELLATION_VEHICLES
+from globalsat.emissions import FUELS, calc_emissions
+from globalsat.fleet import generate_deployment_schedule, simulate_fleet
+from inputs import parameters
+
+CONFIG = configparser.ConfigParser()
+CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
+BASE_PATH = CONFIG['file_locations']['base_path']
+
+RESULTS = os.path.join(BASE_PATH, '..', 'results')
+
+#parameter holding the kilograms of each fuel burnt per launch
+FUEL_PARAMETERS = {
+    'kerosene': 'fuel_mass',
+    'hypergolic': 'fuel_mass_1',
+    'solid': 'fuel_mass_2',
+    'cryogenic': 'fuel_mass_3',
+}
+
+
+def calc_launch_emissions(params):
+    """
+    Calculate the emissions of one launch of each constellation.
+
+    The fuel load is read directly from the fuel mass parameters, rather
+    than through `calc_per_sat_emission`, whose arguments map to different
+    fuels for each vehicle.
+
+    Parameters
+    ----------
+    params : list of dicts
+        Simulation parameters of each constellation.
+
+    Returns
+    -------
+    emissions : numpy.ndarray
+        Array of shape (constellations, compounds) of emissions per launch
+        in kilograms, in the order of COMPOUNDS.
+
+    """
+    vehicles = [CONSTELLATION_VEHICLES[item['name']][0] for item in params]
+
+    fuel_masses = np.array([[item[FUEL_PARAMETERS[fuel]] for fuel in FUELS]
+        for item in params], dtype=float)
+
+    return calc_emissions(vehicles, fuel_masses)
+
+
+def process_fleet_results(parameters, horizon_years, samples, lifetime_std, seed_value):
+    """
+    Simulate every constellation over the horizon with uncertain satellite
+    lifetimes.
+
+    Parameters
+    ----------
+    parameters : dict
+        Contains the simulation parameters of each constellation.
+    horizon_years : int
+        Number of years simulated.
+    samples : int
+        Number of lifetime samples per constellation.
+    lifetime_std : float
+        Standard deviation of the satellite lifetime in years.
+    seed_value : int
+        Starting point for pseudo-random number generator.
+
+    Returns
+    -------
+    output : list of dicts
+        Mean and 90% interval of each metric by constellation and year.
+
+    """
+    params = list(parameters.values())
+
+    deployment = generate_deployment_schedule(
+        [item['number_of_satellites'] for item in params],
+        [item['deployment_years'] for item in params],
+        horizon_years)
+
+    rng = np.random.default_rng(seed_value)
+    mean_lifetimes = np.array([item['satellite_lifetime'] for item in params])
+    lifetimes = np.maximum(np.round(mean_lifetimes[:, np.newaxis] +
+        lifetime_std * rng.standard_normal((len(params), samples))), 1)
+
+    emissions_per_launch = calc_launch_emissions(params)
+
+    results = simulate_fleet(
+        deployment[..., np.newaxis],
+        lifetimes,
+        np.array([item['satellites_per_launch'] for item in params])[:, np.newaxis],
+        emissions_per_launch[:, np.newaxis, :] / 1000,
+    )
+
+    metrics = {
+        'launches': results['launches'],
+        'on_orbit': results['on_orbit'],
+        'total_emissions_t': results['emissions'].sum(axis=-1),
+        'cumulative_emissions_t': results['cumulative_emissions'].sum(axis=-1),
+    }
+
+    output = []
+
+    for idx, item in enumerate(params):
+        for year in range(horizon_years):
+
+            record = {'constellation': item['name'], 'year': year}
+
+            for metric, values in metrics.items():
+                record[metric] = values[year, idx].mean()
+                record[metric + '_low'] = np.quantile(values[year, idx], 0.05)
+                record[metric + '_high'] = np.quantile(values[year, idx], 0.95)
+
+            output.append(record)
+
+    return output
+
+
+if __name__ == '__main__':
+
+    HORIZON_YEARS = 30
+
+    output = process_fleet_results(parameters, HORIZON_YEARS, samples=1000,
+        lifetime_std=1, seed_value=42)
+
+    output = pd.DataFrame(output)
+
+    if not os.path.exists(RESULTS):
+        os.makedirs(RESULTS)
+
+    path = os.path.join(RESULTS, 'fleet_results.csv')
+    output.to_csv(path, index=False)
@@ -0,0 +1,63 @@
+"""
+Geography settings shared by the Globalsat scripts.
+
+Results are reported either for administrative regions or, in grid mode,
+for the quadkey tiles of `globalsat.grid`. Preprocessing writes one global
+population lookup for the chosen geography, which the run script reads.
+
+"""
+import os
+
+from globalsat.grid import get_pyramid_filename
+
+
+def get_geography(config):
+    """
+    Read the geography settings from the script configuration.
+
+    Parameters
+    ----------
+    config : configparser.ConfigParser
+        Script configuration.
+
+    Returns
+    -------
+    resolution_km : int
+        Resolution of the settlement layer pyramid level used.
+    grid_zoom : int
+        Zoom level of the quadkey tiles, or None for regions.
+
+    """
+    resolution_km = config.getint('preprocess', 'resolution_km', fallback=1)
+
+    mode = config.get('geography', 'mode', fallback='regions')
+
+    if mode == 'regions':
+        return resolution_km, None
+    if mode == 'grid':
+        return resolution_km, config.getint('geography', 'grid_zoom')
+
+    raise ValueError('Did not recognise geography mode {}'.format(mode))
+
+
+def get_population_lookup_path(folder, resolution_km=1, grid_zoom=None):
+    """
+    Return the path of the global population lookup.
+
+    Parameters
+    ----------
+    folder : string
+        Folder of intermediate data.
+    resolution_km : int
+        Resolution of the settlement layer pyramid level used.
+    grid_zoom : int
+        Zoom level of the quadkey tiles, or None for regions.
+
+    """
+    if grid_zoom is None:
+        filename = 'global_regional_population_lookup'
+    else:
+        filename = 'global_grid_population_lookup_z{}'.format(grid_zoom)
+
+    return os.path.join(folder, get_pyramid_filename(filename + '.csv',
+        resolution_km))
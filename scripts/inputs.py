@@ -44,7 +44,12 @@ parameters = {
         'research_development': 60000000,
         'maintenance': 13000000,
         'discount_rate': 5,
-        'assessment_period': 5
+        'assessment_period': 5,
+        'satellite_lifetime': 5, #Years in orbit before replacement
+        'satellites_per_launch': 60,
+        'deployment_years': 5, #Years taken to deploy the constellation
+        'inclination_deg': 53, #Orbital inclination of the main shell
+        'min_elevation_deg': 25, #Minimum elevation angle of user terminals
     },
     'oneweb': {
         'number_of_satellites': 720,
@@ -82,7 +87,12 @@ parameters = {
         'research_development': 60000000,
         'maintenance': 13000000,
         'discount_rate': 5,
-        'assessment_period': 5
+        'assessment_period': 5,
+        'satellite_lifetime': 5, #Years in orbit before replacement
+        'satellites_per_launch': 36,
+        'deployment_years': 5, #Years taken to deploy the constellation
+        'inclination_deg': 87.9, #Orbital inclination of the main shell
+        'min_elevation_deg': 25, #Minimum elevation angle of user terminals
     },
     'kuiper': {
         'number_of_satellites': 3236,
@@ -120,7 +130,12 @@ parameters = {
         'research_development': 60000000,
         'maintenance': 55000000,
         'discount_rate': 5,
-        'assessment_period': 5
+        'assessment_period': 5,
+        'satellite_lifetime': 7, #Years in orbit before replacement
+        'satellites_per_launch': 60,
+        'deployment_years': 5, #Years taken to deploy the constellation
+        'inclination_deg': 51.9, #Orbital inclination of the main shell
+        'min_elevation_deg': 35, #Minimum elevation angle of user terminals
     },
     # 'telesat': {
     #     'number_of_satellites': 300,
@@ -0,0 +1,213 @@
+"""
+Preprocessing manifests for Globalsat.
+
+Each country folder holds a manifest.json recording, for every
+preprocessing step, the checksums of its inputs, its parameters and the
+checksums of its outputs. A step is rerun only when something it depends
+on has changed or an output is missing or altered. Checksums are only
+recomputed for files whose size or modification time has changed, so
+validating an up-to-date country is cheap.
+
+Outputs are written to a temporary file and renamed into place, so an
+interrupted run never leaves a partial output that looks complete.
+
+"""
+import os
+import json
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+#checksums already computed in this process, by path, size and mtime
+CHECKSUMS = {}
+
+
+def calc_checksum(path, block_size=2**20):
+    """
+    Calculate the SHA-256 checksum of a file.
+
+    Parameters
+    ----------
+    path : string
+        Path of the file.
+    block_size : int
+        Number of bytes read at a time.
+
+    """
+    sha = hashlib.sha256()
+
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(block_size), b''):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+def fingerprint_file(path, previous=None):
+    """
+    Describe a file by its size, modification time and checksum.
+
+    The checksum of `previous` is reused when the size and modification
+    time are unchanged, and each file is hashed at most once per process.
+
+    Parameters
+    ----------
+    path : string
+        Path of the file.
+    previous : dict
+        Earlier fingerprint of the same file.
+
+    """
+    stat = os.stat(path)
+
+    fingerprint = {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+    }
+
+    key = (os.path.abspath(path), fingerprint['size'], fingerprint['mtime'])
+
+    if (previous is not None and previous['size'] == fingerprint['size'] and
+        previous['mtime'] == fingerprint['mtime']):
+        CHECKSUMS[key] = previous['sha256']
+    elif key not in CHECKSUMS:
+        CHECKSUMS[key] = calc_checksum(path)
+
+    fingerprint['sha256'] = CHECKSUMS[key]
+
+    return fingerprint
+
+
+def load_manifest(folder):
+    """
+    Load the manifest of a folder, or an empty one if there is none.
+
+    Parameters
+    ----------
+    folder : string
+        Folder holding manifest.json.
+
+    """
+    path = os.path.join(folder, 'manifest.json')
+
+    if not os.path.exists(path):
+        return {'steps': {}}
+
+    with open(path, 'r') as source:
+        return json.load(source)
+
+
+def save_manifest(folder, manifest):
+    """
+    Write the manifest of a folder atomically.
+
+    Parameters
+    ----------
+    folder : string
+        Folder holding manifest.json.
+    manifest : dict
+        Manifest to write.
+
+    """
+    with atomic_output(os.path.join(folder, 'manifest.json')) as path:
+        with open(path, 'w') as target:
+            json.dump(manifest, target, indent=2, sort_keys=True)
+
+
+def is_current(manifest, step, inputs, params, outputs):
+    """
+    Check whether a step's recorded outputs are still valid.
+
+    Parameters
+    ----------
+    manifest : dict
+        Manifest as returned by `load_manifest`.
+    step : string
+        Name of the step.
+    inputs : list of strings
+        Paths of the files the step reads.
+    params : dict
+        JSON-serializable parameters of the step.
+    outputs : list of strings
+        Paths of the files the step writes.
+
+    """
+    entry = manifest['steps'].get(step)
+
+    if entry is None:
+        return False
+
+    if entry['params'] != json.loads(json.dumps(params)):
+        return False
+
+    for key, paths in [('inputs', inputs), ('outputs', outputs)]:
+
+        if sorted(entry[key]) != sorted(paths):
+            return False
+
+        for path in paths:
+            if not os.path.exists(path):
+                return False
+            if fingerprint_file(path, entry[key][path])['sha256'] != entry[key][path]['sha256']:
+                return False
+
+    return True
+
+
+def record_step(manifest, step, inputs, params, outputs):
+    """
+    Record the inputs, parameters and outputs of a completed step.
+
+    Parameters
+    ----------
+    manifest : dict
+        Manifest as returned by `load_manifest`, updated in place.
+    step : string
+        Name of the step.
+    inputs : list of strings
+        Paths of the files the step read.
+    params : dict
+        JSON-serializable parameters of the step.
+    outputs : list of strings
+        Paths of the files the step wrote.
+
+    """
+    previous = manifest['steps'].get(step, {})
+
+    manifest['steps'][step] = {
+        'inputs': {path: fingerprint_file(path, previous.get('inputs', {}).get(path))
+            for path in inputs},
+        'params': json.loads(json.dumps(params)),
+        'outputs': {path: fingerprint_file(path) for path in outputs},
+    }
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    Give a temporary path which is renamed to `path` on success.
+
+    The temporary file is in the same folder, so the rename is atomic, and
+    keeps the extension of `path` so drivers can infer the format. It is
+    removed if writing fails.
+
+    Parameters
+    ----------
+    path : string
+        Final path of the output.
+
+    """
+    folder, filename = os.path.split(path)
+    extension = os.path.splitext(filename)[1]
+
+    handle, temp_path = tempfile.mkstemp(prefix='.' + filename + '.',
+        suffix=extension, dir=folder or '.')
+    os.close(handle)
+    os.remove(temp_path)
+
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
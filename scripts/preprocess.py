@@ -11,18 +11,41 @@ import configparser
 import json
 import math
 import glob
+import hashlib
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 import geopandas as gpd
 import pyproj
+import fiona
 from shapely.geometry import Point, LineString, Polygon, MultiPolygon, shape, mapping, box
 from shapely.ops import unary_union, nearest_points, transform
 import rasterio
 from rasterio.warp import calculate_default_transform, reproject, Resampling
-from rasterio.mask import mask
-from rasterstats import zonal_stats, gen_zonal_stats
+from rasterio.features import rasterize
+from rasterio.transform import Affine
+from rasterio.windows import Window
 from tqdm import tqdm
 
+from globalsat.grid import (
+    PYRAMID_RESOLUTIONS_KM,
+    get_pyramid_filename,
+    aggregate_blocks,
+    aggregate_raster_to_quadkeys,
+    format_quadkeys
+)
+
+from manifest import (
+    load_manifest,
+    save_manifest,
+    is_current,
+    record_step,
+    atomic_output
+)
+from geography import get_geography, get_population_lookup_path
+
 CONFIG = configparser.ConfigParser()
 CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
 BASE_PATH = CONFIG['file_locations']['base_path']
@@ -31,6 +54,27 @@ DATA_RAW = os.path.join(BASE_PATH, 'raw')
 DATA_INTERMEDIATE = os.path.join(BASE_PATH, 'intermediate')
 DATA_PROCESSED = os.path.join(BASE_PATH, 'processed')
 
+PATH_BOUNDARIES = os.path.join(DATA_INTERMEDIATE, 'boundaries.gpkg')
+PATH_SETTLEMENTS_TILED = os.path.join(DATA_INTERMEDIATE, 'settlements_tiled.tif')
+
+RASTER_HANDLES = {}
+
+AREA_CRS = pyproj.CRS.from_epsg(6933)
+
+#columns of every population lookup
+LOOKUP_COLUMNS = ['iso3', 'regions', 'population', 'area_m', 'pop_density_km2',
+    'latitude']
+
+#minimum part area in degrees^2 for countries with many small islands
+SMALL_SHAPE_THRESHOLDS = {
+    'CHL': 0.01,
+    'IDN': 0.01,
+    'RUS': 0.01,
+    'GRL': 0.01,
+    'CAN': 0.01,
+    'USA': 0.01,
+}
+
 
 def find_country_list(continent_list):
     """
@@ -70,212 +114,675 @@ def find_country_list(continent_list):
             'iso3': country['GID_0'],
             'iso2': country['ISO_2digit'],
             'regional_level': country['gid_region'],
+            'area': country['geometry'].area,
         })
 
     return countries
 
 
-def process_country_shapes(country):
+def get_layer_name(iso3, level):
     """
-    Creates a single national boundary for the desired country.
+    Name of the boundary layer of a country at the given GADM level.
 
     Parameters
     ----------
-    country : string
+    iso3 : string
         Three digit ISO country code.
+    level : int
+        GADM level, where 0 is the national outline.
 
     """
-    iso3 = country['iso3']
+    if level == 0:
+        return 'national_outline_{}'.format(iso3)
 
-    path = os.path.join(DATA_INTERMEDIATE, iso3)
+    return 'regions_{}_{}'.format(level, iso3)
 
-    if os.path.exists(os.path.join(path, 'national_outline.shp')):
-        return 'Completed national outline processing'
 
-    if not os.path.exists(path):
-        # print('Creating directory {}'.format(path))
-        os.makedirs(path)
+def partition_boundaries(countries):
+    """
+    Split the global GADM layers into per-country layers of a single
+    GeoPackage.
 
-    shape_path = os.path.join(path, 'national_outline.shp')
+    Each global layer is streamed once, keeping only the features of the
+    selected countries, and all country layers for that level are written
+    in the same pass. GeoPackage layers carry a spatial index, so later
+    per-country reads are indexed reads rather than full scans.
 
-    # print('Loading all country shapes')
-    path = os.path.join(DATA_RAW, 'gadm36_levels_shp', 'gadm36_0.shp')
-    countries = gpd.read_file(path)
+    A country layer is rewritten only if it is missing, or if the GADM
+    source or the small shape thresholds recorded in the country manifest
+    have changed. The checksum of each layer is recorded for later steps,
+    with a signature which is cheap to check on later runs.
 
-    # print('Getting specific country shape for {}'.format(iso3))
-    single_country = countries[countries.GID_0 == iso3]
+    Parameters
+    ----------
+    countries : list of dicts
+        Country information as returned by `find_country_list`.
 
-    # print('Excluding small shapes')
-    single_country['geometry'] = single_country.apply(
-        exclude_small_shapes, axis=1)
+    """
+    if os.path.exists(PATH_BOUNDARIES):
+        existing = set(fiona.listlayers(PATH_BOUNDARIES))
+    else:
+        existing = set()
 
-    # print('Adding ISO country code and other global information')
     glob_info_path = os.path.join(DATA_RAW, 'global_information.csv')
     load_glob_info = pd.read_csv(glob_info_path, encoding = "ISO-8859-1")
-    single_country = single_country.merge(
-        load_glob_info,left_on='GID_0', right_on='ISO_3digit')
 
-    single_country.to_file(shape_path, driver='ESRI Shapefile')
+    manifests = {}
+    for country in countries:
+        folder = os.path.join(DATA_INTERMEDIATE, country['iso3'])
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        manifests[country['iso3']] = load_manifest(folder)
+
+    max_level = max([country['regional_level'] for country in countries])
+
+    for level in range(0, max_level + 1):
+
+        filename = 'gadm36_{}.shp'.format(level)
+        path = os.path.join(DATA_RAW, 'gadm36_levels_shp', filename)
+        inputs = [path, path.replace('.shp', '.dbf')]
+        step = 'boundaries_{}'.format(level)
+        params = {'small_shape_thresholds': SMALL_SHAPE_THRESHOLDS}
+
+        wanted = set()
+        for country in countries:
+            if country['regional_level'] < level:
+                continue
+
+            iso3 = country['iso3']
+            manifest = manifests[iso3]
+            signature = manifest['steps'].get(step, {}).get('layer_signature')
+
+            if not (get_layer_name(iso3, level) in existing and
+                is_current(manifest, step, inputs, params, []) and
+                is_layer_current(manifest, iso3, level)):
+                wanted.add(iso3)
+            elif manifest['steps'][step]['layer_signature'] != signature:
+                #a layer confirmed by its checksum keeps its new signature
+                save_manifest(os.path.join(DATA_INTERMEDIATE, iso3), manifest)
+
+        if len(wanted) == 0:
+            continue
+
+        with fiona.open(path) as source:
+            crs = source.crs
+            features = [feature for feature in source
+                if feature['properties']['GID_0'] in wanted]
+
+        layer = gpd.GeoDataFrame.from_features(features, crs=crs)
+
+        layer['geometry'] = exclude_small_shapes(layer)
+
+        if level == 0:
+            layer = layer.merge(load_glob_info, left_on='GID_0', right_on='ISO_3digit')
+
+        for iso3, country_layer in layer.groupby('GID_0'):
+            country_layer.to_file(PATH_BOUNDARIES,
+                layer=get_layer_name(iso3, level), driver='GPKG')
+
+            #recorded only once the layer is complete, so an interrupted
+            #write is redone on the next run, and read back so the checksum
+            #describes the stored layer
+            manifest = manifests[iso3]
+            record_step(manifest, step, inputs, params, [])
+            manifest['steps'][step]['layer_sha256'] = calc_layer_checksum(
+                load_boundaries(iso3, level))
+            manifest['steps'][step]['layer_signature'] = calc_layer_signature(
+                iso3, level)
+            save_manifest(os.path.join(DATA_INTERMEDIATE, iso3), manifest)
 
     return
 
 
-def process_regions(country):
+def calc_layer_checksum(layer):
     """
-    Function for processing the lowest desired subnational regions for the
-    chosen country.
+    Calculate a SHA-256 checksum of the geometries and attributes of a layer.
 
     Parameters
     ----------
-    country : string
+    layer : geopandas.GeoDataFrame
+        Layer to describe.
+
+    """
+    sha = hashlib.sha256()
+
+    for geometry in layer.geometry:
+        sha.update(geometry.wkb if geometry is not None else b'')
+
+    sha.update(layer.drop(columns='geometry').to_csv(index=False).encode('utf-8'))
+
+    return sha.hexdigest()
+
+
+def calc_layer_signature(iso3, level):
+    """
+    Describe a country's stored boundary layer without reading its features.
+
+    The signature is the feature count of the layer with the extent and
+    time of last change which GeoPackage keeps for every layer, so it
+    changes whenever the layer is written.
+
+    Parameters
+    ----------
+    iso3 : string
         Three digit ISO country code.
+    level : int
+        GADM level, where 0 is the national outline.
+
+    Returns
+    -------
+    signature : list
+        Feature count, last change, and minimum and maximum x and y, or None
+        if the layer is missing.
 
     """
-    regions = []
+    if not os.path.exists(PATH_BOUNDARIES):
+        return None
 
-    iso3 = country['iso3']
-    level = country['regional_level']
+    name = get_layer_name(iso3, level)
 
-    for regional_level in range(1, level + 1):
+    with closing(sqlite3.connect(PATH_BOUNDARIES)) as connection:
+        contents = connection.execute('SELECT last_change, min_x, min_y, '
+            'max_x, max_y FROM gpkg_contents WHERE table_name = ?', (name,)).fetchone()
 
-        filename = 'regions_{}_{}.shp'.format(regional_level, iso3)
-        folder = os.path.join(DATA_INTERMEDIATE, iso3, 'regions')
-        path_processed = os.path.join(folder, filename)
+        if contents is None:
+            return None
 
-        if os.path.exists(path_processed):
-            continue
+        count = connection.execute('SELECT COUNT(*) FROM "{}"'.format(name)).fetchone()[0]
 
-        if not os.path.exists(folder):
-            os.mkdir(folder)
+    return [count] + list(contents)
 
-        filename = 'gadm36_{}.shp'.format(regional_level)
-        path_regions = os.path.join(DATA_RAW, 'gadm36_levels_shp', filename)
-        regions = gpd.read_file(path_regions)
 
-        regions = regions[regions.GID_0 == iso3]
+def get_boundary_checksum(manifest, iso3, level):
+    """
+    Return the recorded checksum of a country's boundary layer.
 
-        regions['geometry'] = regions.apply(exclude_small_shapes, axis=1)
+    Parameters
+    ----------
+    manifest : dict
+        Manifest of the country.
+    iso3 : string
+        Three digit ISO country code.
+    level : int
+        GADM level, where 0 is the national outline.
 
-        try:
-            regions.to_file(path_processed, driver='ESRI Shapefile')
-        except:
-            pass
+    """
+    entry = manifest['steps'].get('boundaries_{}'.format(level), {})
 
-    return
+    if 'layer_sha256' not in entry:
+        raise ValueError('No level {} boundaries recorded for {}, run '
+            'partition_boundaries first'.format(level, iso3))
 
+    return entry['layer_sha256']
 
-def process_settlement_layer(country):
+
+def is_layer_current(manifest, iso3, level):
     """
-    Clip the settlement layer to the chosen country boundary and place in
-    desired country folder.
+    Check that a country's stored boundary layer matches its recorded
+    checksum, so that a layer changed outside this script is rewritten.
+
+    A layer whose signature is unchanged is current without being read.
+    Otherwise its features are loaded and checksummed, and if they still
+    match, the new signature is recorded in `manifest`.
 
     Parameters
     ----------
-    country : string
+    manifest : dict
+        Manifest of the country, updated in place. The caller saves it.
+    iso3 : string
         Three digit ISO country code.
+    level : int
+        GADM level, where 0 is the national outline.
 
     """
-    iso3 = country['iso3']
+    try:
+        recorded = get_boundary_checksum(manifest, iso3, level)
+    except ValueError:
+        return False
+
+    entry = manifest['steps']['boundaries_{}'.format(level)]
+    signature = calc_layer_signature(iso3, level)
+
+    if signature is None:
+        return False
+
+    if signature == entry.get('layer_signature'):
+        return True
+
+    if calc_layer_checksum(load_boundaries(iso3, level)) != recorded:
+        return False
+
+    entry['layer_signature'] = signature
+
+    return True
+
+
+def load_boundaries(iso3, level):
+    """
+    Load the boundary layer of a country from the partitioned GeoPackage.
+
+    Parameters
+    ----------
+    iso3 : string
+        Three digit ISO country code.
+    level : int
+        GADM level, where 0 is the national outline.
+
+    """
+    return gpd.read_file(PATH_BOUNDARIES, layer=get_layer_name(iso3, level))
+
+
+def open_raster(path):
+    """
+    Open a raster read-only, keeping one open handle per worker process.
+
+    Parameters
+    ----------
+    path : string
+        Path of the raster.
+
+    """
+    #handles are keyed by process so forked workers never share one
+    key = (os.getpid(), path)
+
+    if key not in RASTER_HANDLES:
+        RASTER_HANDLES[key] = rasterio.open(path, 'r')
+
+    return RASTER_HANDLES[key]
+
+
+def get_window(src, bounds):
+    """
+    Find the pixel window covering a bounding box, clipped to the raster.
 
-    path_settlements = os.path.join(DATA_RAW,'settlement_layer',
+    Parameters
+    ----------
+    src : rasterio.DatasetReader
+        Open raster.
+    bounds : tuple
+        Bounding box as (minx, miny, maxx, maxy) in the CRS of the raster.
+
+    """
+    minx, miny, maxx, maxy = bounds
+    col_start, row_start = ~src.transform * (minx, maxy)
+    col_end, row_end = ~src.transform * (maxx, miny)
+
+    row_start = max(int(math.floor(row_start)), 0)
+    col_start = max(int(math.floor(col_start)), 0)
+    row_end = min(int(math.ceil(row_end)), src.height)
+    col_end = min(int(math.ceil(col_end)), src.width)
+
+    return Window(col_start, row_start, max(col_end - col_start, 0),
+        max(row_end - row_start, 0))
+
+
+def read_raster_window(path, bounds):
+    """
+    Read only the pixels of a raster which cover a bounding box.
+
+    Parameters
+    ----------
+    path : string
+        Path of the raster.
+    bounds : tuple
+        Bounding box as (minx, miny, maxx, maxy) in the CRS of the raster.
+
+    Returns
+    -------
+    array : numpy.ndarray
+        Pixel values of shape (bands, rows, columns).
+    meta : dict
+        Raster metadata updated for the window.
+
+    """
+    src = open_raster(path)
+
+    window = get_window(src, bounds)
+    array = src.read(window=window)
+
+    meta = src.meta.copy()
+    meta.update({
+        'height': array.shape[1],
+        'width': array.shape[2],
+        'transform': src.window_transform(window),
+    })
+
+    return array, meta
+
+
+def get_raster_cache_paths(path):
+    """
+    Return the paths of the .npy array and .json sidecar caching a raster.
+
+    Parameters
+    ----------
+    path : string
+        Path of the raster.
+
+    """
+    base = os.path.splitext(path)[0]
+
+    return base + '.npy', base + '.json'
+
+
+def cache_raster(path, manifest):
+    """
+    Decode the first band of a raster once into a raw .npy file.
+
+    The array is written next to the raster, with its transform, CRS and
+    nodata value in a .json sidecar, and recorded as a step of `manifest`
+    so it is rebuilt only when the checksum of the raster changes.
+
+    Parameters
+    ----------
+    path : string
+        Path of the raster.
+    manifest : dict
+        Manifest of the folder holding the raster, updated in place. The
+        caller saves it.
+
+    Returns
+    -------
+    updated : bool
+        Whether the cache was rebuilt.
+
+    """
+    outputs = list(get_raster_cache_paths(path))
+    step = 'cache_{}'.format(os.path.splitext(os.path.basename(path))[0])
+
+    if is_current(manifest, step, [path], {}, outputs):
+        return False
+
+    path_array, path_meta = outputs
+
+    with rasterio.open(path) as src:
+        meta = {
+            'transform': list(src.transform)[:6],
+            'crs': src.crs.to_string() if src.crs else None,
+            'nodata': src.nodata,
+        }
+        array = src.read(1)
+
+    with atomic_output(path_array) as temp_path:
+        np.save(temp_path, array)
+
+    with atomic_output(path_meta) as temp_path:
+        with open(temp_path, 'w') as target:
+            json.dump(meta, target)
+
+    record_step(manifest, step, [path], {}, outputs)
+
+    return True
+
+
+def load_raster(path):
+    """
+    Load the cached first band of a raster as a read-only memory map.
+
+    Mapping the .npy file written by `cache_raster` neither decodes nor
+    copies it, so worker processes share its pages through the operating
+    system cache.
+
+    Parameters
+    ----------
+    path : string
+        Path of the raster.
+
+    Returns
+    -------
+    array : numpy.memmap
+        Values of the first band.
+    affine : affine.Affine
+        Transform of the raster.
+
+    """
+    path_array, path_meta = get_raster_cache_paths(path)
+
+    if not (os.path.exists(path_array) and os.path.exists(path_meta)):
+        raise ValueError('No cached array for {}, run cache_raster first'.format(path))
+
+    with open(path_meta, 'r') as source:
+        meta = json.load(source)
+
+    return np.load(path_array, mmap_mode='r'), Affine(*meta['transform'])
+
+
+def create_tiled_settlement_layer(block_rows=1024):
+    """
+    Create a tiled, compressed copy of the global settlement layer with
+    overviews, so that country extracts are fast windowed reads.
+
+    The source raster is only read, in blocks of rows, and is never modified.
+
+    Parameters
+    ----------
+    block_rows : int
+        Number of rows copied at a time.
+
+    """
+    path_settlements = os.path.join(DATA_RAW, 'settlement_layer',
         'ppp_2020_1km_Aggregated.tif')
 
-    settlements = rasterio.open(path_settlements, 'r+')
-    settlements.nodata = 255
-    settlements.crs = {"init": "epsg:4326"}
+    manifest = load_manifest(DATA_INTERMEDIATE)
+    step, inputs, params = 'settlements_tiled', [path_settlements], {}
 
-    iso3 = country['iso3']
-    path_country = os.path.join(DATA_INTERMEDIATE, iso3,
-        'national_outline.shp')
+    if is_current(manifest, step, inputs, params, [PATH_SETTLEMENTS_TILED]):
+        return
+
+    with rasterio.open(path_settlements, 'r') as src, \
+        atomic_output(PATH_SETTLEMENTS_TILED) as temp_path:
+
+        profile = src.profile.copy()
+        profile.update({
+            'driver': 'GTiff',
+            'tiled': True,
+            'blockxsize': 256,
+            'blockysize': 256,
+            'compress': 'deflate',
+            'nodata': 255,
+            'crs': 'epsg:4326',
+        })
+
+        with rasterio.open(temp_path, 'w', **profile) as dest:
+            for row in range(0, src.height, block_rows):
+                window = Window(0, row, src.width, min(block_rows, src.height - row))
+                dest.write(src.read(window=window), window=window)
+
+            dest.build_overviews([2, 4, 8, 16], Resampling.average)
+
+    record_step(manifest, step, inputs, params, [PATH_SETTLEMENTS_TILED])
+    save_manifest(DATA_INTERMEDIATE, manifest)
+
+    return
+
+
+def get_settlement_layer_path(resolution_km):
+    """
+    Path of the global settlement layer at a pyramid resolution.
+
+    Parameters
+    ----------
+    resolution_km : int
+        Resolution in km, one of `PYRAMID_RESOLUTIONS_KM`.
+
+    """
+    return os.path.join(DATA_INTERMEDIATE,
+        get_pyramid_filename('settlements_tiled.tif', resolution_km))
 
-    if os.path.exists(path_country):
-        country = gpd.read_file(path_country)
-    else:
-        print('Must generate national_outline.shp first for {}'.format(iso3) )
+
+def get_country_path(iso3, filename, resolution_km):
+    """
+    Path of a country output, suffixed with the resolution if not 1 km.
+
+    Parameters
+    ----------
+    iso3 : string
+        Three digit ISO country code.
+    filename : string
+        Name of the output at 1 km resolution.
+    resolution_km : int
+        Resolution in km, one of `PYRAMID_RESOLUTIONS_KM`.
+
+    """
+    return os.path.join(DATA_INTERMEDIATE, iso3,
+        get_pyramid_filename(filename, resolution_km))
+
+
+def create_settlement_pyramid(block_rows=1000):
+    """
+    Build coarser copies of the settlement layer which preserve population
+    sums, for quick exploratory runs.
+
+    Each level sums square blocks of the 1 km layer, after setting
+    negative and missing values to zero as in the population lookup, and is
+    stored as a tiled GeoTIFF.
+
+    Parameters
+    ----------
+    block_rows : int
+        Approximate number of 1 km rows read at a time.
+
+    """
+    manifest = load_manifest(DATA_INTERMEDIATE)
+
+    for resolution_km in PYRAMID_RESOLUTIONS_KM[1:]:
+
+        path_level = get_settlement_layer_path(resolution_km)
+        step = 'settlements_tiled_{}km'.format(resolution_km)
+        inputs, params = [PATH_SETTLEMENTS_TILED], {'factor': resolution_km}
+
+        if is_current(manifest, step, inputs, params, [path_level]):
+            continue
+
+        with rasterio.open(PATH_SETTLEMENTS_TILED, 'r') as src, \
+            atomic_output(path_level) as temp_path:
+
+            profile = src.profile.copy()
+            profile.update({
+                'height': -(-src.height // resolution_km),
+                'width': -(-src.width // resolution_km),
+                'transform': src.transform * Affine.scale(resolution_km),
+                'dtype': 'float32',
+                'nodata': None,
+            })
+
+            strip_rows = resolution_km * max(1, block_rows // resolution_km)
+
+            with rasterio.open(temp_path, 'w', **profile) as dest:
+                for row in range(0, src.height, strip_rows):
+                    window = Window(0, row, src.width, min(strip_rows, src.height - row))
+                    aggregated = aggregate_blocks(src.read(1, window=window),
+                        resolution_km)
+                    dest.write(aggregated.astype(np.float32), 1, window=Window(
+                        0, row // resolution_km, aggregated.shape[1], aggregated.shape[0]))
+
+        record_step(manifest, step, inputs, params, [path_level])
+        save_manifest(DATA_INTERMEDIATE, manifest)
+
+    return
+
+
+def process_settlement_layer(country, resolution_km=1):
+    """
+    Clip the settlement layer to the chosen country boundary and place in
+    desired country folder, along with its cached array.
+
+    Parameters
+    ----------
+    country : string
+        Three digit ISO country code.
+    resolution_km : int
+        Resolution of the settlement layer pyramid level to use.
+
+    """
+    iso3 = country['iso3']
 
     path_country = os.path.join(DATA_INTERMEDIATE, iso3)
-    shape_path = os.path.join(path_country, 'settlements.tif')
+    shape_path = get_country_path(iso3, 'settlements.tif', resolution_km)
+    path_settlements = get_settlement_layer_path(resolution_km)
 
-    if os.path.exists(shape_path):
-        return
+    manifest = load_manifest(path_country)
+    step = os.path.splitext(os.path.basename(shape_path))[0]
+    inputs = [path_settlements]
+    params = {'boundaries': get_boundary_checksum(manifest, iso3, 0)}
 
-    bbox = country.envelope
-    geo = gpd.GeoDataFrame()
+    updated = False
 
-    geo = gpd.GeoDataFrame({'geometry': bbox})
+    if not is_current(manifest, step, inputs, params, [shape_path]):
 
-    coords = [json.loads(geo.to_json())['features'][0]['geometry']]
+        country = load_boundaries(iso3, 0)
 
-    #chop on coords
-    out_img, out_transform = mask(settlements, coords, crop=True)
+        out_img, out_meta = read_raster_window(path_settlements,
+            country.total_bounds)
 
-    # Copy the metadata
-    out_meta = settlements.meta.copy()
+        out_meta.update({"driver": "GTiff",
+                        "crs": 'epsg:4326'})
 
-    out_meta.update({"driver": "GTiff",
-                    "height": out_img.shape[1],
-                    "width": out_img.shape[2],
-                    "transform": out_transform,
-                    "crs": 'epsg:4326'})
+        with atomic_output(shape_path) as temp_path:
+            with rasterio.open(temp_path, "w", **out_meta) as dest:
+                    dest.write(out_img)
 
-    with rasterio.open(shape_path, "w", **out_meta) as dest:
-            dest.write(out_img)
+        record_step(manifest, step, inputs, params, [shape_path])
+        updated = True
+
+    if cache_raster(shape_path, manifest) or updated:
+        save_manifest(path_country, manifest)
 
     return
 
 
-def exclude_small_shapes(x):
+def exclude_small_shapes(layer):
     """
-    Remove small multipolygon shapes.
+    Remove small polygons from multipolygon shapes.
+
+    All multipolygons are exploded once, part areas are compared as an
+    array against the threshold of their feature, and the remaining parts
+    are regrouped by feature. Polygons, and multipolygons with a total area
+    below 0.01, are kept as they are.
 
     Parameters
     ---------
-    x : polygon
-        Feature to simplify.
+    layer : geopandas.GeoDataFrame
+        Features with a 'GID_0' country code, in degrees.
 
     Returns
     -------
-    MultiPolygon : MultiPolygon
-        Shapely MultiPolygon geometry without tiny shapes.
+    geometry : geopandas.GeoSeries
+        Geometries without tiny shapes, with the index of `layer`.
 
     """
-    # if its a single polygon, just return the polygon geometry
-    if x.geometry.geom_type == 'Polygon':
-        return x.geometry
+    geometry = layer.geometry.reset_index(drop=True)
+    geom_type = geometry.geom_type.values
+    area = geometry.area.values
 
-    # if its a multipolygon, we start trying to simplify
-    # and remove shapes if its too big.
-    elif x.geometry.geom_type == 'MultiPolygon':
+    #remove bigger shapes if the country is really big, or the shape is
+    threshold = layer['GID_0'].map(SMALL_SHAPE_THRESHOLDS).values.astype(float)
+    threshold = np.where(np.isnan(threshold),
+        np.where(area > 50, 0.1, 0.001), threshold)
 
-        area1 = 0.01
-        area2 = 50
+    #dont remove shapes if total area is already very small
+    simplify = (geom_type == 'MultiPolygon') & (area >= 0.01)
 
-        # dont remove shapes if total area is already very small
-        if x.geometry.area < area1:
-            return x.geometry
-        # remove bigger shapes if country is really big
+    parts = geometry[simplify].explode()
+    if isinstance(parts.index, pd.MultiIndex):
+        parts.index = parts.index.get_level_values(0)
 
-        if x['GID_0'] in ['CHL','IDN']:
-            threshold = 0.01
-        elif x['GID_0'] in ['RUS','GRL','CAN','USA']:
-            threshold = 0.01
+    owner = parts.index.values
+    kept = parts[parts.area.values > threshold[owner]]
 
-        elif x.geometry.area > area2:
-            threshold = 0.1
-        else:
-            threshold = 0.001
+    output = geometry.copy()
+    output[~np.isin(geom_type, ['Polygon', 'MultiPolygon'])] = None
+    output[simplify] = MultiPolygon()
 
-        # save remaining polygons as new multipolygon for
-        # the specific country
-        new_geom = []
-        for y in x.geometry:
-            if y.area > threshold:
-                new_geom.append(y)
+    regrouped = kept.groupby(level=0).agg(lambda group: MultiPolygon(list(group)))
+    output[regrouped.index] = regrouped.values
 
-        return MultiPolygon(new_geom)
+    output.index = layer.index
+
+    return output
 
 
-def create_pop_regional_lookup(country):
+def create_pop_regional_lookup(country, resolution_km=1):
     """
     Extract regional luminosity and population data.
 
@@ -284,35 +791,47 @@ def create_pop_regional_lookup(country):
 
     country : string
         Three digit ISO country code.
+    resolution_km : int
+        Resolution of the settlement layer pyramid level to use.
 
     """
     level = country['regional_level']
     iso3 = country['iso3']
     GID_level = 'GID_{}'.format(level)
 
+    path_country = os.path.join(DATA_INTERMEDIATE, iso3)
+
     filename = 'population_lookup_level_{}.csv'.format(level)
-    path_output = os.path.join(DATA_INTERMEDIATE, iso3, filename)
+    path_output = get_country_path(iso3, filename, resolution_km)
+
+    path_settlements = get_country_path(iso3, 'settlements.tif', resolution_km)
 
-    if os.path.exists(path_output):
+    manifest = load_manifest(path_country)
+    step = 'population' if resolution_km == 1 else 'population_{}km'.format(resolution_km)
+    #populations are read from the cached array, so it is an input too
+    inputs = [path_settlements] + list(get_raster_cache_paths(path_settlements))
+    params = {
+        'level': int(level),
+        'boundaries': get_boundary_checksum(manifest, iso3, level),
+    }
+
+    if is_current(manifest, step, inputs, params, [path_output]):
         output = pd.read_csv(path_output).to_dict('records')
         return output
 
-    filename = 'settlements.tif'
-    path_settlements = os.path.join(DATA_INTERMEDIATE, iso3, filename)
-
-    filename = 'regions_{}_{}.shp'.format(level, iso3)
-    folder = os.path.join(DATA_INTERMEDIATE, iso3, 'regions')
-    regions = gpd.read_file(os.path.join(folder, filename), crs='epsg:4326')
+    regions = load_boundaries(iso3, level)
 
-    output = []
+    populations = calc_regional_population(regions['geometry'].values,
+        path_settlements)
 
-    for index, region in regions.iterrows():
+    areas_km = get_area(regions['geometry'])
 
-        area_km = get_area(region['geometry'])
+    output = []
 
-        population = find_population(region, path_settlements)
+    for (index, region), population, area_km in zip(
+        regions.iterrows(), populations, areas_km):
 
-        if not isinstance(population, float):
+        if np.isnan(population):
             continue
 
         if population > 0:
@@ -326,65 +845,405 @@ def create_pop_regional_lookup(country):
             'population': population,
             'area_m': area_km,
             'pop_density_km2': pop_density_km2,
+            'latitude': region['geometry'].centroid.y,
         })
 
     output_pandas = pd.DataFrame(output)
 
-    output_pandas.to_csv(path_output, index=False)
+    with atomic_output(path_output) as temp_path:
+        output_pandas.to_csv(temp_path, index=False)
+
+    record_step(manifest, step, inputs, params, [path_output])
+    save_manifest(path_country, manifest)
 
     return output
 
 
-def find_population(region, path_settlements):
+def create_pop_grid_lookup(country, zoom, resolution_km=1):
     """
+    Extract population data for the quadkey tiles covering a country.
+
+    The country outline is burned into a mask once, and the cached
+    settlement raster is summed over tiles by index arithmetic, without
+    any per-tile geometry. Tiles on a border hold only the population and
+    area of pixels inside the country.
+
+    Parameters
+    ----------
+    country : dict
+        Country information as returned by `find_country_list`.
+    zoom : int
+        Zoom level of the quadkey tiles.
+    resolution_km : int
+        Resolution of the settlement layer pyramid level to use.
 
     """
-    with rasterio.open(path_settlements) as src:
+    iso3 = country['iso3']
 
-        affine = src.transform
-        array = src.read(1)
-        array[array <= 0] = 0
+    path_country = os.path.join(DATA_INTERMEDIATE, iso3)
+
+    filename = 'population_lookup_grid_z{}.csv'.format(zoom)
+    path_output = get_country_path(iso3, filename, resolution_km)
+
+    path_settlements = get_country_path(iso3, 'settlements.tif', resolution_km)
+
+    manifest = load_manifest(path_country)
+    step = os.path.splitext(os.path.basename(path_output))[0]
+    inputs = [path_settlements] + list(get_raster_cache_paths(path_settlements))
+    params = {
+        'zoom': int(zoom),
+        'boundaries': get_boundary_checksum(manifest, iso3, 0),
+    }
+
+    if is_current(manifest, step, inputs, params, [path_output]):
+        output = pd.read_csv(path_output).to_dict('records')
+        return output
+
+    outline = load_boundaries(iso3, 0)
+
+    array, affine = load_raster(path_settlements)
+
+    mask = rasterize(((geometry, 1) for geometry in outline['geometry']),
+        out_shape=array.shape, transform=affine, fill=0, dtype='uint8')
+
+    grid = aggregate_raster_to_quadkeys(array, affine, zoom, mask=mask)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pop_density_km2 = np.where(grid['population'] > 0,
+            grid['population'] / grid['area_km2'], 0)
+
+    output_pandas = pd.DataFrame({
+        'iso3': iso3,
+        'regions': format_quadkeys(grid['quadkey'], zoom),
+        'population': grid['population'],
+        'area_m': grid['area_km2'],
+        'pop_density_km2': pop_density_km2,
+        'latitude': grid['latitude'],
+    })
+
+    with atomic_output(path_output) as temp_path:
+        output_pandas.to_csv(temp_path, index=False)
+
+    record_step(manifest, step, inputs, params, [path_output])
+    save_manifest(path_country, manifest)
+
+    return output_pandas.to_dict('records')
+
+
+def calc_regional_population(geometries, path_settlements,
+    fractional_coverage=True, small_region_pixels=4, supersample=10,
+    block_rows=1024):
+    """
+    Sum the population of every region from one read of the cached raster.
+
+    All regions are burned into a single label array, and populations are
+    summed per label with a bincount over each block of rows. A pixel belongs to a region when
+    its centre lies inside it, and NaN pixels are left out, as in rasterstats.
+
+    Regions covering fewer than `small_region_pixels` pixels can instead be
+    weighted by the fraction of each pixel they cover, estimated on a grid
+    `supersample` times finer than the raster.
+
+    Parameters
+    ----------
+    geometries : list of shapely geometries
+        Region boundaries in the CRS of the raster.
+    path_settlements : string
+        Path of the population raster.
+    fractional_coverage : bool
+        Whether to use fractional coverage for small regions.
+    small_region_pixels : int
+        Pixel count below which a region is weighted by fractional coverage.
+    supersample : int
+        Subdivisions of each pixel side for fractional coverage.
+    block_rows : int
+        Number of raster rows read at a time.
+
+    Returns
+    -------
+    population : numpy.ndarray
+        Population of each region, which is NaN where a region covers no
+        pixel centre that is not NaN and fractional coverage is not used.
+
+    """
+    array, affine = load_raster(path_settlements)
+
+    labels = rasterize(
+        ((geometry, idx + 1) for idx, geometry in enumerate(geometries)),
+        out_shape=array.shape, transform=affine, fill=0, dtype='int32')
+
+    number_of_labels = len(geometries) + 1
+    population = np.zeros(number_of_labels)
+    valid_pixels = np.zeros(number_of_labels, dtype=np.int64)
 
-        population = [d['sum'] for d in zonal_stats(
-            region['geometry'], array, stats=['sum'], affine=affine)][0]
+    #negative and NaN values are zeroed a block at a time, so the mapped
+    #raster is never copied whole
+    for start in range(0, array.shape[0], block_rows):
+        block = array[start:start + block_rows]
+        block_labels = labels[start:start + block_rows].ravel()
+        population += np.bincount(block_labels, weights=np.fmax(block, 0).ravel(),
+            minlength=number_of_labels)
+        valid_pixels += np.bincount(block_labels[~np.isnan(block).ravel()],
+            minlength=number_of_labels)
+
+    population = population[1:]
+    pixels = np.bincount(labels.ravel(), minlength=number_of_labels)[1:]
+
+    population[valid_pixels[1:] == 0] = np.nan
+
+    if fractional_coverage:
+        for idx in np.flatnonzero(pixels < small_region_pixels):
+            population[idx] = calc_fractional_population(geometries[idx],
+                array, affine, supersample)
 
     return population
 
 
-def get_area(modeling_region_geom):
+def calc_fractional_population(geometry, array, affine, supersample):
     """
-    Return the area in square km.
+    Sum the population of a region, weighting each pixel by the fraction
+    of it covered by the region.
+
+    Parameters
+    ----------
+    geometry : shapely geometry
+        Region boundary in the CRS of the raster.
+    array : numpy.ndarray
+        Population raster values, where negative values count as zero and
+        NaN values are left out.
+    affine : affine.Affine
+        Transform of the raster.
+    supersample : int
+        Subdivisions of each pixel side used to estimate coverage.
+
+    Returns
+    -------
+    population : float
+        Population of the region, or NaN if it covers no pixel which is not
+        NaN.
 
     """
-    project = pyproj.Transformer.from_crs('epsg:4326', 'epsg:3857', always_xy=True).transform
-    new_geom = transform(project, modeling_region_geom)
-    area_km = new_geom.area / 1e6
+    minx, miny, maxx, maxy = geometry.bounds
+    col_start, row_start = ~affine * (minx, maxy)
+    col_end, row_end = ~affine * (maxx, miny)
+
+    row_start, col_start = max(int(math.floor(row_start)), 0), max(int(math.floor(col_start)), 0)
+    row_end = min(int(math.ceil(row_end)), array.shape[0])
+    col_end = min(int(math.ceil(col_end)), array.shape[1])
+
+    height, width = row_end - row_start, col_end - col_start
+
+    if height <= 0 or width <= 0:
+        return np.nan
+
+    fine_transform = (affine * Affine.translation(col_start, row_start) *
+        Affine.scale(1 / supersample))
+
+    covered = rasterize([(geometry, 1)],
+        out_shape=(height * supersample, width * supersample),
+        transform=fine_transform, fill=0, dtype='uint8')
+
+    fraction = covered.reshape(height, supersample, width, supersample).mean(axis=(1, 3))
+
+    window = array[row_start:row_end, col_start:col_end]
+
+    if not ((fraction > 0) & ~np.isnan(window)).any():
+        return np.nan
+
+    population = (np.fmax(window, 0) * fraction).sum()
+
+    return float(population)
+
+
+def get_area(geometries):
+    """
+    Return the area of every geometry in square km.
+
+    Geometries are projected in one call to the equal-area EASE-Grid 2.0
+    projection (EPSG:6933). Web Mercator inflated areas, and so deflated
+    population densities, by 1 / cos(latitude)^2.
+
+    Parameters
+    ----------
+    geometries : geopandas.GeoSeries
+        Geometries with a CRS set, assumed WGS84 if missing.
+
+    Returns
+    -------
+    area_km : numpy.ndarray
+        Area of each geometry in km^2.
+
+    """
+    if geometries.crs is None:
+        geometries = geometries.set_crs('epsg:4326')
+
+    area_km = geometries.to_crs(AREA_CRS).area.values / 1e6
 
     return area_km
 
 
+def process_country(country, resolution_km=1, grid_zoom=None):
+    """
+    Run all preprocessing steps for one country.
+
+    Parameters
+    ----------
+    country : dict
+        Country information as returned by `find_country_list`.
+    resolution_km : int
+        Resolution of the settlement layer pyramid level to use.
+    grid_zoom : int
+        If given, population is aggregated to quadkey tiles at this zoom
+        level instead of administrative regions.
+
+    Returns
+    -------
+    path_output : string
+        Path of the country's population lookup.
+
+    """
+    process_settlement_layer(country, resolution_km)
+
+    if grid_zoom is not None:
+        create_pop_grid_lookup(country, grid_zoom, resolution_km)
+        filename = 'population_lookup_grid_z{}.csv'.format(grid_zoom)
+        return get_country_path(country['iso3'], filename, resolution_km)
+
+    create_pop_regional_lookup(country, resolution_km)
+
+    filename = 'population_lookup_level_{}.csv'.format(country['regional_level'])
+
+    return get_country_path(country['iso3'], filename, resolution_km)
+
+
+def process_countries(countries, workers, resolution_km=1, grid_zoom=None):
+    """
+    Preprocess countries in parallel, largest first.
+
+    Countries are independent, so they are spread over a pool of worker
+    processes. Starting with the largest countries avoids a long tail of
+    one large country running alone at the end. A failed country is
+    reported rather than stopping the run.
+
+    Parameters
+    ----------
+    countries : list of dicts
+        Country information as returned by `find_country_list`.
+    workers : int
+        Number of worker processes. A single worker runs in this process.
+    resolution_km : int
+        Resolution of the settlement layer pyramid level to use.
+    grid_zoom : int
+        If given, zoom level of the quadkey tiles used instead of regions.
+
+    Returns
+    -------
+    paths : list of strings
+        Population lookup paths of the completed countries.
+    failures : list of tuples
+        ISO3 code and error message of each failed country.
+
+    """
+    countries = sorted(countries, key=lambda country: country['area'], reverse=True)
+
+    paths = []
+    failures = []
+
+    if workers <= 1:
+        for country in tqdm(countries):
+            try:
+                paths.append(process_country(country, resolution_km, grid_zoom))
+            except Exception as error:
+                failures.append((country['iso3'], repr(error)))
+        return paths, failures
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        futures = {executor.submit(process_country, country, resolution_km,
+            grid_zoom): country
+            for country in countries}
+
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            try:
+                paths.append(future.result())
+            except Exception as error:
+                failures.append((futures[future]['iso3'], repr(error)))
+
+    return paths, failures
+
+
+def merge_lookups(paths, path_output):
+    """
+    Merge country population lookups into one global lookup.
+
+    Countries without any regions leave empty lookups, which are skipped.
+    If no country has any regions, the global lookup holds only the
+    column names.
+
+    Parameters
+    ----------
+    paths : list of strings
+        Paths of the country population lookups.
+    path_output : string
+        Path of the global population lookup.
+
+    Returns
+    -------
+    skipped : list of tuples
+        Path and reason of each lookup which was not merged.
+
+    """
+    lookups = []
+    skipped = []
+
+    for path in sorted(paths):
+        try:
+            lookup = pd.read_csv(path)
+        except pd.errors.EmptyDataError:
+            skipped.append((path, 'empty file'))
+            continue
+
+        if len(lookup) == 0:
+            skipped.append((path, 'no regions'))
+            continue
+
+        lookups.append(lookup)
+
+    if lookups:
+        output = pd.concat(lookups, ignore_index=True)
+    else:
+        output = pd.DataFrame(columns=LOOKUP_COLUMNS)
+
+    with atomic_output(path_output) as temp_path:
+        output.to_csv(temp_path, index=False)
+
+    return skipped
+
+
 if __name__ == '__main__':
 
     countries = find_country_list([])#[:2] #['Africa']
 
-    output = []
-
-    for country in tqdm(countries):
+    partition_boundaries(countries)
 
-        print('-Working on {}: {}'.format(country['country_name'], country['iso3']))
+    create_tiled_settlement_layer()
 
-        process_country_shapes(country)
+    create_settlement_pyramid()
 
-        process_regions(country)
+    workers = CONFIG.getint('preprocess', 'workers', fallback=os.cpu_count())
+    resolution_km, grid_zoom = get_geography(CONFIG)
 
-        process_settlement_layer(country)
+    paths, failures = process_countries(countries, workers, resolution_km, grid_zoom)
 
-        results = create_pop_regional_lookup(country)
+    for iso3, error in failures:
+        print('Failed to process {}: {}'.format(iso3, error))
 
-        output = output + results
+    path_output = get_population_lookup_path(DATA_INTERMEDIATE, resolution_km,
+        grid_zoom)
+    skipped = merge_lookups(paths, path_output)
 
-    path_output = os.path.join(DATA_INTERMEDIATE, 'global_regional_population_lookup.csv')
-    output = pd.DataFrame(output)
-    output.to_csv(path_output, index=False)
+    for path, reason in skipped:
+        print('Skipped {}: {}'.format(path, reason))
 
-    print('Preprocessing complete')
+    print('Preprocessing complete ({} of {} countries)'.format(
+        len(paths), len(countries)))
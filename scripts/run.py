@@ -8,10 +8,14 @@ December 2020
 """
 import configparser
 import os
+import numpy as np
 import pandas as pd
 
-from globalsat.sim import system_capacity
+from globalsat.sim import system_capacity, generate_log_normal_dist_value
+from globalsat.stats import StreamingSummary
+from globalsat.density import calc_latitude_capacity, lookup_latitude_values
 from inputs import parameters, lut
+from geography import get_geography, get_population_lookup_path
 
 CONFIG = configparser.ConfigParser()
 CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
@@ -20,6 +24,8 @@ BASE_PATH = CONFIG['file_locations']['base_path']
 INTERMEDIATE = os.path.join(BASE_PATH, 'intermediate')
 RESULTS = os.path.join(BASE_PATH, '..', 'results')
 
+LATITUDE_RESOLUTION = 0.5 #Height of the latitude bands in degrees
+
 
 def process_capacity_data(data, constellations):
     """
@@ -68,9 +74,10 @@ def process_mean_results(data, capacity, constellation, scenario, parameters):
     """
     Process results.
 
-    """
-    output = []
+    Regions may be administrative regions or grid cells, and are processed
+    as whole columns.
 
+    """
     adoption_rate = scenario[1]
     overbooking_factor = parameters[constellation.lower()]['overbooking_factor']
     constellation_capacity = capacity[constellation]
@@ -79,32 +86,98 @@ def process_mean_results(data, capacity, constellation, scenario, parameters):
     number_of_satellites = constellation_capacity['number_of_satellites']
     satellite_coverage_area = constellation_capacity['satellite_coverage_area']
 
-    for idx, item in data.iterrows():
-
-        users_per_km2 = item['pop_density_km2'] * (adoption_rate / 100)
-
-        active_users_km2 = users_per_km2 / overbooking_factor
-
-        if active_users_km2 > 0:
-            per_user_capacity = max_capacity / active_users_km2
-        else:
-            per_user_capacity = 0
-
-        output.append({
-            'scenario': scenario[0],
-            'constellation': constellation,
-            'number_of_satellites': number_of_satellites,
-            'satellite_coverage_area': satellite_coverage_area,
-            'iso3': item['iso3'],
-            'GID_id': item['regions'],
-            'population': item['population'],
-            'area_m': item['area_m'],
-            'pop_density_km2': item['pop_density_km2'],
-            'adoption_rate': adoption_rate,
-            'users_per_km2': users_per_km2,
-            'active_users_km2': active_users_km2,
-            'per_user_capacity': per_user_capacity,
-        })
+    users_per_km2 = data['pop_density_km2'].values * (adoption_rate / 100)
+
+    active_users_km2 = users_per_km2 / overbooking_factor
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_user_capacity = np.where(active_users_km2 > 0,
+            max_capacity / active_users_km2, 0)
+
+    output = pd.DataFrame({
+        'scenario': scenario[0],
+        'constellation': constellation,
+        'number_of_satellites': number_of_satellites,
+        'satellite_coverage_area': satellite_coverage_area,
+        'iso3': data['iso3'].values,
+        'GID_id': data['regions'].values,
+        'population': data['population'].values,
+        'area_m': data['area_m'].values,
+        'pop_density_km2': data['pop_density_km2'].values,
+        'adoption_rate': adoption_rate,
+        'users_per_km2': users_per_km2,
+        'active_users_km2': active_users_km2,
+        'per_user_capacity': per_user_capacity,
+    })
+
+    return output
+
+
+def process_latitude_capacity(constellations, parameters, lut):
+    """
+    Process capacity by latitude band for each constellation at its full size.
+
+    """
+    output = {}
+
+    for constellation in constellations:
+
+        params = parameters[constellation.lower()]
+
+        random_variations = generate_log_normal_dist_value(
+            params['dl_frequency'],
+            params['mu'],
+            params['sigma'],
+            params['seed_value'],
+            params['iterations']
+        )
+
+        output[constellation] = calc_latitude_capacity(
+            params['number_of_satellites'], params, lut,
+            LATITUDE_RESOLUTION, random_variations
+        )
+
+    return output
+
+
+def process_latitude_results(data, latitude_capacity, constellation, scenario, parameters):
+    """
+    Process results using the capacity at the latitude of each region.
+
+    """
+    adoption_rate = scenario[1]
+    overbooking_factor = parameters[constellation.lower()]['overbooking_factor']
+    constellation_capacity = latitude_capacity[constellation]
+
+    capacity_kmsq = lookup_latitude_values(data['latitude'].values,
+        constellation_capacity['capacity_kmsq'], LATITUDE_RESOLUTION)
+    satellite_density = lookup_latitude_values(data['latitude'].values,
+        constellation_capacity['density'], LATITUDE_RESOLUTION)
+
+    users_per_km2 = data['pop_density_km2'].values * (adoption_rate / 100)
+
+    active_users_km2 = users_per_km2 / overbooking_factor
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_user_capacity = np.where(active_users_km2 > 0,
+            capacity_kmsq / active_users_km2, 0)
+
+    output = pd.DataFrame({
+        'scenario': scenario[0],
+        'constellation': constellation,
+        'iso3': data['iso3'].values,
+        'GID_id': data['regions'].values,
+        'population': data['population'].values,
+        'area_m': data['area_m'].values,
+        'pop_density_km2': data['pop_density_km2'].values,
+        'latitude': data['latitude'].values,
+        'satellite_density_km2': satellite_density,
+        'capacity_kmsq': capacity_kmsq,
+        'adoption_rate': adoption_rate,
+        'users_per_km2': users_per_km2,
+        'active_users_km2': active_users_km2,
+        'per_user_capacity': per_user_capacity,
+    })
 
     return output
 
@@ -175,7 +248,18 @@ if __name__ == '__main__':
         ('high', 2),
     ]
 
+    SUMMARY_METRICS = [
+        'path_loss',
+        'received_power',
+        'cnr',
+        'spectral_efficiency',
+        'channel_capacity',
+        'aggregate_capacity',
+        'capacity_kmsq',
+    ]
+
     results = []
+    summary = StreamingSummary(SUMMARY_METRICS)
 
     ##generate simulation results for all constellation satellite densities
     for constellation, params in parameters.items():
@@ -183,18 +267,26 @@ if __name__ == '__main__':
 
             data = system_capacity(constellation, number_of_satellites, params, lut)
 
+            summary.update(constellation, data)
+
             results = results + data
 
     results = pd.DataFrame(results)
 
+    if not os.path.exists(RESULTS):
+        os.makedirs(RESULTS)
+
     path = os.path.join(RESULTS, 'sim_results.csv')
     results.to_csv(path, index=False)
 
+    path = os.path.join(RESULTS, 'sim_summary.csv')
+    pd.DataFrame(summary.to_records()).to_csv(path, index=False)
+
     ##process global results
     capacity = process_capacity_data(results, CONSTELLATIONS)
 
-    path = os.path.join(INTERMEDIATE, 'global_regional_population_lookup.csv')
-    global_data = pd.read_csv(path)
+    path_lookup = get_population_lookup_path(INTERMEDIATE, *get_geography(CONFIG))
+    global_data = pd.read_csv(path_lookup)
 
     all_results = []
 
@@ -202,12 +294,10 @@ if __name__ == '__main__':
 
         for scenario in SCENARIO:
 
-            output = process_mean_results(global_data, capacity, constellation,
-                          scenario, parameters)
+            all_results.append(process_mean_results(global_data, capacity,
+                constellation, scenario, parameters))
 
-            all_results = all_results + output
-
-    all_results = pd.DataFrame(all_results)
+    all_results = pd.concat(all_results)
 
     if not os.path.exists(RESULTS):
         os.makedirs(RESULTS)
@@ -215,9 +305,27 @@ if __name__ == '__main__':
     path = os.path.join(RESULTS, 'global_results.csv')
     all_results.to_csv(path, index=False)
 
+    ##process latitude-aware results
+    if 'latitude' in global_data.columns:
+
+        latitude_capacity = process_latitude_capacity(CONSTELLATIONS, parameters, lut)
+
+        all_results = []
+
+        for constellation in CONSTELLATIONS:
+
+            for scenario in SCENARIO:
+
+                all_results.append(process_latitude_results(global_data,
+                    latitude_capacity, constellation, scenario, parameters))
+
+        all_results = pd.concat(all_results)
+
+        path = os.path.join(RESULTS, 'global_latitude_results.csv')
+        all_results.to_csv(path, index=False)
+
     ##process stochastic results
-    path = os.path.join(INTERMEDIATE, 'global_regional_population_lookup.csv')
-    global_data = pd.read_csv(path)#[:1]
+    global_data = pd.read_csv(path_lookup)#[:1]
 
     all_results = []
 
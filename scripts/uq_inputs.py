@@ -3,6 +3,27 @@ import pandas as pd
 from random import gauss
 from inputs import parameters, lut
 
+#Standard deviation of each parameter perturbed in the uncertainty quantification.
+uq_perturbations = {
+    'altitude_km': 5,
+    'dl_frequency': 0.1,
+    'antenna_diameter': 0.2,
+    'antenna_efficiency': 0.1,
+    'receiver_gain': 5,
+    'earth_atmospheric_losses': 3,
+    'all_other_losses': 0.2,
+    'satellite_launch_cost': 10000000,
+    'ground_station_cost': 5000000,
+    'spectrum_cost': 20000000,
+    'regulation_fees': 2000000,
+    'digital_infrastructure_cost': 1000000,
+    'ground_station_energy': 1000000,
+    'subscriber_acquisition': 10000000,
+    'staff_costs': 10000000,
+    'research_development': 1000000,
+    'maintenance': 1000000,
+}
+
 def uq_inputs_generator():
 
     uq_parameters = []
@@ -18,32 +39,32 @@ def uq_inputs_generator():
             mu = item['mu']
             sigma = item['sigma']
             total_area_earth_km_sq = item["total_area_earth_km_sq"]
-            altitude_km = gauss(item["altitude_km"], 5)
-            dl_frequency_Hz = gauss(item["dl_frequency"], 0.1)
+            altitude_km = gauss(item["altitude_km"], uq_perturbations["altitude_km"])
+            dl_frequency_Hz = gauss(item["dl_frequency"], uq_perturbations["dl_frequency"])
             dl_bandwidth_Hz = item["dl_bandwidth"]
             speed_of_light = item["speed_of_light"]
-            antenna_diameter_m = gauss(item["antenna_diameter"], 0.2)
-            antenna_efficiency = gauss(item["antenna_efficiency"], 0.1)
+            antenna_diameter_m = gauss(item["antenna_diameter"], uq_perturbations["antenna_diameter"])
+            antenna_efficiency = gauss(item["antenna_efficiency"], uq_perturbations["antenna_efficiency"])
             power_dBw = item["power"]
-            receiver_gain_dB = gauss(item["receiver_gain"], 5)
-            earth_atmospheric_losses_dB = gauss(item["earth_atmospheric_losses"], 3)
-            all_other_losses_dB = gauss(item["all_other_losses"], 0.2)
+            receiver_gain_dB = gauss(item["receiver_gain"], uq_perturbations["receiver_gain"])
+            earth_atmospheric_losses_dB = gauss(item["earth_atmospheric_losses"], uq_perturbations["earth_atmospheric_losses"])
+            all_other_losses_dB = gauss(item["all_other_losses"], uq_perturbations["all_other_losses"])
             number_of_channels = item["number_of_channels"]
             polarization = item["polarization"]
             fuel_mass_kg = item["fuel_mass"]
             fuel_mass_1_kg = item["fuel_mass_1"]
             fuel_mass_2_kg = item["fuel_mass_2"]
             fuel_mass_3_kg = item["fuel_mass_3"]
-            satellite_launch_cost = gauss(item["satellite_launch_cost"], 10000000)
-            ground_station_cost = gauss(item["ground_station_cost"], 5000000)
-            spectrum_cost = gauss(item["spectrum_cost"], 20000000)
-            regulation_fees = gauss(item["regulation_fees"], 2000000)
-            digital_infrastructure_cost = gauss(item["digital_infrastructure_cost"], 1000000)
-            ground_station_energy = gauss(item["ground_station_energy"], 1000000)
-            subscriber_acquisition = gauss(item["subscriber_acquisition"], 10000000)
-            staff_costs = gauss(item["staff_costs"], 10000000)
-            research_development = gauss(item["research_development"], 1000000)
-            maintenance = gauss(item["maintenance"], 1000000)
+            satellite_launch_cost = gauss(item["satellite_launch_cost"], uq_perturbations["satellite_launch_cost"])
+            ground_station_cost = gauss(item["ground_station_cost"], uq_perturbations["ground_station_cost"])
+            spectrum_cost = gauss(item["spectrum_cost"], uq_perturbations["spectrum_cost"])
+            regulation_fees = gauss(item["regulation_fees"], uq_perturbations["regulation_fees"])
+            digital_infrastructure_cost = gauss(item["digital_infrastructure_cost"], uq_perturbations["digital_infrastructure_cost"])
+            ground_station_energy = gauss(item["ground_station_energy"], uq_perturbations["ground_station_energy"])
+            subscriber_acquisition = gauss(item["subscriber_acquisition"], uq_perturbations["subscriber_acquisition"])
+            staff_costs = gauss(item["staff_costs"], uq_perturbations["staff_costs"])
+            research_development = gauss(item["research_development"], uq_perturbations["research_development"])
+            maintenance = gauss(item["maintenance"], uq_perturbations["maintenance"])
             discount_rate = item["discount_rate"]
             assessment_period_year = item["assessment_period"]
 
@@ -88,4 +109,8 @@ def uq_inputs_generator():
     df.to_csv("uq_parameters.csv")
             
     return df.shape
-uq_inputs_generator()
\ No newline at end of file
+
+
+if __name__ == '__main__':
+
+    uq_inputs_generator()
\ No newline at end of file
@@ -9,7 +9,6 @@ December 2022
 from __future__ import division
 import configparser
 import os
-import math
 from numpy import savez_compressed
 import pandas as pd
 
@@ -17,82 +16,81 @@ import globalsat.sim as gb
 from inputs import lut
 from cost import cost_model
 
-#Import the data.
+#Map the uq_parameters.csv columns to the simulation parameter names.
+UQ_COLUMNS = {
+    'dl_frequency_Hz': 'dl_frequency',
+    'dl_bandwidth_Hz': 'dl_bandwidth',
+    'antenna_diameter_m': 'antenna_diameter',
+    'power_dBw': 'power',
+    'receiver_gain_dB': 'receiver_gain',
+    'earth_atmospheric_losses_dB': 'earth_atmospheric_losses',
+    'all_other_losses_dB': 'all_other_losses',
+}
 
-df = pd.read_csv("uq_parameters.csv")
-uq_dict = df.to_dict('records') #Convert the csv to list
 
-results = []
-for item in uq_dict:
-    constellation = item["constellation"]
+def process_uq_results(data):
+    """
+    Evaluate all uncertainty quantification samples for one constellation.
 
-    number_of_satellites = item["number_of_satellites"]
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        UQ parameter samples for a single constellation.
 
-    random_variations = gb.generate_log_normal_dist_value(
-        item['dl_frequency_Hz'],
-        item['mu'],
-        item['sigma'],
-        item['seed_value'],
-        item['iterations'])
-
-    distance, satellite_coverage_area_km = gb.calc_geographic_metrics(
-                                           item["number_of_satellites"], item)
-
-    path_loss = 20*math.log10(distance) + 20*math.log10(item['dl_frequency_Hz']/1e9) + 92.45
+    Returns
+    -------
+    results : pandas.DataFrame
+        Capacity, cost and emissions results for each sample.
 
-    losses = gb.calc_losses(item["earth_atmospheric_losses_dB"], 
-                     item["all_other_losses_dB"])
+    """
+    item = data.rename(columns=UQ_COLUMNS)
+    params = {column: item[column].values for column in item.columns}
+    first = item.iloc[0]
 
-    antenna_gain = gb.calc_antenna_gain(item["speed_of_light"],
-                           item["antenna_diameter_m"], item["dl_frequency_Hz"],
-                           item["antenna_efficiency"]) 
+    constellation = first["constellation"]
 
-    eirp = gb.calc_eirp(item["power_dBw"], antenna_gain)
+    number_of_satellites = params["number_of_satellites"]
 
-    noise = gb.calc_noise()
-
-    received_power = gb.calc_received_power(eirp, path_loss, 
-                             item["receiver_gain_dB"], losses)
-
-    cnr = gb.calc_cnr(received_power, noise)
-
-    spectral_efficiency = gb.calc_spectral_efficiency(cnr, lut)
-            
-    channel_capacity = gb.calc_capacity(spectral_efficiency, item["dl_bandwidth_Hz"])
+    random_variations = gb.generate_log_normal_dist_value(
+        first['dl_frequency'],
+        first['mu'],
+        first['sigma'],
+        first['seed_value'],
+        len(item))
 
-    agg_capacity = gb.calc_agg_capacity(channel_capacity, 
-                   item["number_of_channels"], item["polarization"])
+    distance, satellite_coverage_area_km = gb.calc_geographic_metrics(
+                                           number_of_satellites, params)
 
-    sat_capacity = gb.single_satellite_capacity(item["dl_bandwidth_Hz"],
-                   spectral_efficiency, item["number_of_channels"], 
-                   item["polarization"])
+    link_budget = gb.calc_link_budget(distance, params, random_variations, lut)
 
-    emission_dict = gb.calc_per_sat_emission(item["constellation"], item["fuel_mass_kg"],
-                    item["fuel_mass_1_kg"], item["fuel_mass_2_kg"], item["fuel_mass_3_kg"])
+    emission_dict = gb.calc_per_sat_emission(constellation, params["fuel_mass_kg"],
+                    params["fuel_mass_1_kg"], params["fuel_mass_2_kg"], params["fuel_mass_3_kg"])
 
-    total_cost_ownership = cost_model(item["satellite_launch_cost"], item["ground_station_cost"], 
-                           item["spectrum_cost"], item["regulation_fees"], 
-                           item["digital_infrastructure_cost"], item["ground_station_energy"], 
-                           item["subscriber_acquisition"], item["staff_costs"], 
-                           item["research_development"], item["maintenance"], 
-                           item["discount_rate"], item["assessment_period_year"])             
+    total_cost_ownership = cost_model(params["satellite_launch_cost"], params["ground_station_cost"],
+                           params["spectrum_cost"], params["regulation_fees"],
+                           params["digital_infrastructure_cost"], params["ground_station_energy"],
+                           params["subscriber_acquisition"], params["staff_costs"],
+                           params["research_development"], params["maintenance"],
+                           first["discount_rate"], first["assessment_period_year"])
+    sat_capacity = link_budget['capacity_per_single_satellite']
     cost_per_capacity = total_cost_ownership / sat_capacity* number_of_satellites
 
-    results.append({"constellation": constellation, 
+    results = pd.DataFrame({"constellation": constellation,
                     "signal_path": distance,
                     "satellite_coverage_area_km": satellite_coverage_area_km,
-                    "path_loss": path_loss,
-                    "losses": losses,
-                    "antenna_gain": antenna_gain,
-                    "eirp_dB": eirp,
-                    "noise": noise,
-                    "received_power_dB": received_power,
-                    "cnr": cnr,
-                    "spectral_efficiency": spectral_efficiency,
-                    "channel_capacity": channel_capacity,
-                    "agg_capacity": agg_capacity,
+                    "path_loss": link_budget['path_loss'],
+                    "random_variation": link_budget['random_variation'],
+                    "losses": link_budget['losses'],
+                    "antenna_gain": link_budget['antenna_gain'],
+                    "eirp_dB": link_budget['eirp'],
+                    "noise": link_budget['noise'],
+                    "received_power_dB": link_budget['received_power'],
+                    "cnr": link_budget['cnr'],
+                    "spectral_efficiency": link_budget['spectral_efficiency'],
+                    "channel_capacity": link_budget['channel_capacity'],
+                    "agg_capacity": link_budget['aggregate_capacity'],
                     "capacity_per_single_satellite": sat_capacity,
-                    "capacity_per_area_mbps/sqkm": agg_capacity/item["coverage_area_per_sat_sqkm"],
+                    "capacity_per_area_mbps/sqkm": link_budget['aggregate_capacity']/params["coverage_area_per_sat_sqkm"],
                     "total_cost_ownership": total_cost_ownership,
                     "cost_per_capacity": cost_per_capacity,
                     "aluminium_oxide_emissions_t":emission_dict['alumina_emission']/1000,
@@ -104,9 +102,23 @@ for item in uq_dict:
                     "total_emissions_t": ((emission_dict['alumina_emission'])
                                        + (emission_dict['sulphur_emission'])
                                        + (emission_dict['carbon_emission'])
-                                       + (emission_dict['cfc_gases']) 
+                                       + (emission_dict['cfc_gases'])
                                        + (emission_dict['particulate_matter'])
-                                       + (emission_dict['photo_oxidation']))/1000})
+                                       + (emission_dict['photo_oxidation']))/1000},
+                    index=data.index)
+
+    return results
+
+
+if __name__ == '__main__':
+
+    #Import the data.
+    df = pd.read_csv("uq_parameters.csv")
+
+    results = []
+    for constellation, data in df.groupby("constellation", sort=False):
+
+        results.append(process_uq_results(data))
 
-    df = pd.DataFrame.from_dict(results)
-    df.to_csv("uq_results.csv")
\ No newline at end of file
+    df = pd.concat(results).sort_index()
+    df.to_csv("uq_results.csv")
@@ -0,0 +1,162 @@
+"""
+Global sensitivity analysis for Globalsat.
+
+Estimates Sobol indices of capacity, total cost of ownership and emissions
+with respect to the inputs perturbed in uq_inputs.py.
+
+Written by Bonface Osoro & Ed Oughton.
+
+December 2022
+
+"""
+import configparser
+import os
+import numpy as np
+import pandas as pd
+
+from globalsat.sensitivity import generate_saltelli_samples, calc_sobol_indices
+import globalsat.sim as gb
+from globalsat.stats import StreamingSummary
+from inputs import parameters, lut
+from uq_inputs import uq_perturbations
+from cost import cost_model
+
+CONFIG = configparser.ConfigParser()
+CONFIG.read(os.path.join(os.path.dirname(__file__), 'script_config.ini'))
+BASE_PATH = CONFIG['file_locations']['base_path']
+
+RESULTS = os.path.join(BASE_PATH, '..', 'results')
+
+OUTPUTS = [
+    'capacity_per_single_satellite',
+    'total_cost_ownership',
+    'emissions_per_capacity',
+]
+
+
+def uq_model(samples, names, params, lut):
+    """
+    Evaluate the UQ model for a batch of samples in one vectorized pass.
+
+    Parameters
+    ----------
+    samples : numpy.ndarray
+        Array of shape (number of samples, number of inputs).
+    names : list
+        Parameter name of each column in `samples`.
+    params : dict
+        Contains all simulation parameters, used for any input not sampled.
+        The stochastic path loss component is given by the
+        'log_random_variation' input, the log of the lognormal draw.
+    lut : list of tuples
+        Lookup table for CNR to spectral efficiency.
+
+    Returns
+    -------
+    results : dict
+        Contains an array of length number of samples for each output.
+
+    """
+    item = dict(params)
+    item.update({name: samples[:, idx] for idx, name in enumerate(names)})
+
+    distance, satellite_coverage_area_km = gb.calc_geographic_metrics(
+        item['number_of_satellites'], item)
+
+    random_variations = np.exp(item['log_random_variation'])
+
+    link_budget = gb.calc_link_budget(distance, item, random_variations, lut)
+
+    sat_capacity = link_budget['capacity_per_single_satellite']
+
+    total_cost_ownership = cost_model(item['satellite_launch_cost'],
+        item['ground_station_cost'], item['spectrum_cost'], item['regulation_fees'],
+        item['digital_infrastructure_cost'], item['ground_station_energy'],
+        item['subscriber_acquisition'], item['staff_costs'],
+        item['research_development'], item['maintenance'],
+        item['discount_rate'], item['assessment_period'])
+
+    emission_dict = gb.calc_per_sat_emission(item['name'], item['fuel_mass'],
+        item['fuel_mass_1'], item['fuel_mass_2'], item['fuel_mass_3'])
+    total_emissions = sum(emission_dict.values())
+
+    results = {
+        'capacity_per_single_satellite': sat_capacity,
+        'total_cost_ownership': total_cost_ownership,
+        'emissions_per_capacity': total_emissions / sat_capacity,
+    }
+
+    return results
+
+
+def process_sensitivity(constellation, params, n, seed_value, summary=None):
+    """
+    Run a Saltelli design for one constellation and find the Sobol indices.
+
+    If a StreamingSummary is given, the outputs of the two independent base
+    samples are added to it.
+
+    """
+    names = list(uq_perturbations.keys())
+    means = [params[name] for name in names]
+    stds = [uq_perturbations[name] for name in names]
+
+    #sample the normal distribution underlying the random path loss variation
+    normal_mean, normal_std = gb.calc_log_normal_params(params['mu'], params['sigma'])
+    names.append('log_random_variation')
+    means.append(normal_mean)
+    stds.append(normal_std)
+
+    samples = generate_saltelli_samples(means, stds, n, seed_value)
+
+    results = uq_model(samples, names, params, lut)
+
+    if summary is not None:
+        summary.update(params['name'],
+            {metric: values[:2 * n] for metric, values in results.items()})
+
+    output = []
+
+    for metric in OUTPUTS:
+
+        indices = calc_sobol_indices(results[metric], n, len(names),
+            seed_value=seed_value)
+
+        for idx, name in enumerate(names):
+            output.append({
+                'constellation': params['name'],
+                'metric': metric,
+                'parameter': name,
+                'S1': indices['S1'][idx],
+                'S1_conf': indices['S1_conf'][idx],
+                'ST': indices['ST'][idx],
+                'ST_conf': indices['ST_conf'][idx],
+            })
+
+    return output
+
+
+if __name__ == '__main__':
+
+    N = 4096 #Number of base samples, giving N * (d + 2) evaluations
+
+    all_results = []
+    summary = StreamingSummary(OUTPUTS)
+
+    for constellation, params in parameters.items():
+
+        output = process_sensitivity(constellation, params, N,
+            params['seed_value'], summary)
+
+        all_results = all_results + output
+
+    all_results = pd.DataFrame(all_results)
+
+    if not os.path.exists(RESULTS):
+        os.makedirs(RESULTS)
+
+    path = os.path.join(RESULTS, 'sobol_indices.csv')
+    all_results.to_csv(path, index=False)
+
+    path = os.path.join(RESULTS, 'uq_summary.csv')
+    pd.DataFrame(summary.to_records()).to_csv(path, index=False)
@@ -49,6 +49,7 @@ setup(
     ],
     install_requires=[
         'numpy>=1.16.4',
+        'scipy>=1.8',
     ],
     entry_points={
         'console_scripts': [
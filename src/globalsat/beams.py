@@ -0,0 +1,189 @@
+"""
+Globalsat beam scheduler.
+
+Allocates each satellite's channel bandwidth across the regions in its
+footprint, rather than spreading aggregate capacity evenly over the
+coverage area. Regions ask for the bandwidth needed to carry their demand
+at their own spectral efficiency, and each satellite shares its bandwidth
+either in proportion to demand or by max-min fair water-filling.
+
+All satellites are scheduled in one pass over the satellite and region
+pairs, sorted by satellite, using segment sums instead of a loop.
+
+"""
+import numpy as np
+
+from globalsat.sim import calc_capacity
+
+
+def _segment_starts(satellite):
+    """
+    Find the start of each satellite's segment in pairs sorted by satellite.
+
+    """
+    return np.flatnonzero(np.r_[True, satellite[1:] != satellite[:-1]])
+
+
+def allocate_proportional(satellite, demand, resource):
+    """
+    Share each satellite's resource in proportion to demand.
+
+    Parameters
+    ----------
+    satellite : numpy.ndarray
+        Satellite index of each pair.
+    demand : numpy.ndarray
+        Resource requested by each pair.
+    resource : numpy.ndarray
+        Resource available on each satellite.
+
+    Returns
+    -------
+    allocation : numpy.ndarray
+        Resource allocated to each pair, never above its demand.
+
+    """
+    satellite = np.asarray(satellite)
+    demand = np.asarray(demand, dtype=float)
+
+    total_demand = np.bincount(satellite, weights=demand, minlength=len(resource))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.minimum(1, np.asarray(resource, dtype=float) / total_demand)
+
+    return demand * np.nan_to_num(share, nan=1)[satellite]
+
+
+def allocate_water_filling(satellite, demand, resource):
+    """
+    Share each satellite's resource by max-min fair water-filling.
+
+    Each satellite serves every pair up to a common level L, so pairs asking
+    for less than L are served in full and all others receive L, with L
+    chosen to use all of the resource where demand exceeds it.
+
+    Parameters
+    ----------
+    satellite : numpy.ndarray
+        Satellite index of each pair.
+    demand : numpy.ndarray
+        Resource requested by each pair.
+    resource : numpy.ndarray
+        Resource available on each satellite.
+
+    Returns
+    -------
+    allocation : numpy.ndarray
+        Resource allocated to each pair, never above its demand.
+
+    """
+    satellite = np.asarray(satellite)
+    demand = np.asarray(demand, dtype=float)
+    resource = np.asarray(resource, dtype=float)
+
+    if len(demand) == 0:
+        return demand.copy()
+
+    order = np.lexsort((demand, satellite))
+    sorted_satellite = satellite[order]
+    sorted_demand = demand[order]
+
+    starts = _segment_starts(sorted_satellite)
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(order)]))
+    position = np.arange(len(order)) - starts[segment]
+    size = np.bincount(segment)[segment]
+
+    #resource used if the level were set at each pair's demand
+    cumulative = np.cumsum(sorted_demand)
+    served_before = cumulative - sorted_demand - (cumulative - sorted_demand)[starts][segment]
+    used_at_level = served_before + (size - position) * sorted_demand
+
+    #the level lies below the first demand which would overrun the resource
+    available = resource[sorted_satellite]
+    overrun = used_at_level > available
+    first_overrun = np.full(len(starts), len(order))
+    np.minimum.at(first_overrun, segment[overrun], np.flatnonzero(overrun))
+
+    level = np.full(len(starts), np.inf)
+    limited = first_overrun < len(order)
+    idx = first_overrun[limited]
+    level[limited] = (available[idx] - served_before[idx]) / (size[idx] - position[idx])
+
+    allocation = np.empty(len(order))
+    allocation[order] = np.minimum(sorted_demand, level[segment])
+
+    return allocation
+
+
+def schedule_beams(region, satellite, demand_mbps, spectral_efficiency, params,
+    number_of_regions, users=None, method='water_filling'):
+    """
+    Allocate satellite bandwidth to regions and calculate served capacity.
+
+    Each satellite has `number_of_channels * polarization` channels of
+    `dl_bandwidth`. A pair of a region and its serving satellite requests
+    the bandwidth needed for its demand at its spectral efficiency.
+
+    Parameters
+    ----------
+    region : numpy.ndarray
+        Region index of each region and satellite pair.
+    satellite : numpy.ndarray
+        Satellite index of each pair.
+    demand_mbps : numpy.ndarray
+        Demand carried by each pair in Mbps.
+    spectral_efficiency : numpy.ndarray
+        Spectral efficiency of each pair in bps/Hz.
+    params : dict
+        Contains 'dl_bandwidth', 'number_of_channels' and 'polarization'.
+    number_of_regions : int
+        Number of regions.
+    users : numpy.ndarray
+        Number of users in each region, used for per-user capacity.
+    method : string
+        Either 'water_filling' or 'proportional'.
+
+    Returns
+    -------
+    results : dict
+        Contains 'bandwidth_hz' and 'served_mbps' for each pair, and
+        'region_served_mbps' and, if users are given, 'per_user_mbps' for
+        each region.
+
+    """
+    allocators = {
+        'water_filling': allocate_water_filling,
+        'proportional': allocate_proportional,
+    }
+    if method not in allocators:
+        raise ValueError('Did not recognise beam allocation method {}'.format(method))
+
+    satellite = np.asarray(satellite)
+    spectral_efficiency = np.asarray(spectral_efficiency, dtype=float)
+
+    number_of_satellites = satellite.max() + 1 if len(satellite) else 0
+    bandwidth = (params['dl_bandwidth'] * params['number_of_channels'] *
+        params['polarization'])
+    resource = np.full(number_of_satellites, float(bandwidth))
+
+    #pairs without a usable link cannot be served
+    demand_hz = np.asarray(demand_mbps, dtype=float) * 1e6
+    requested_hz = np.divide(demand_hz, spectral_efficiency,
+        out=np.zeros_like(demand_hz), where=spectral_efficiency > 0)
+
+    bandwidth_hz = allocators[method](satellite, requested_hz, resource)
+    served_mbps = calc_capacity(spectral_efficiency, bandwidth_hz)
+
+    results = {
+        'bandwidth_hz': bandwidth_hz,
+        'served_mbps': served_mbps,
+        'region_served_mbps': np.bincount(region, weights=served_mbps,
+            minlength=number_of_regions),
+    }
+
+    if users is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_user = results['region_served_mbps'] / np.asarray(users, dtype=float)
+        results['per_user_mbps'] = np.where(np.asarray(users) > 0, per_user, 0)
+
+    return results
@@ -0,0 +1,177 @@
+"""
+Globalsat cost model.
+
+Vectorized total cost of ownership for arrays of cost samples.
+
+"""
+import numpy as np
+from functools import lru_cache
+
+
+def calc_capex(satellite_launch_cost, ground_station_cost, spectrum_cost,
+    regulation_fees, digital_infrastructure_cost):
+    """
+    Calculate the capital expenditure.
+
+    Parameters
+    ----------
+    satellite_launch_cost : float or numpy.ndarray
+        Cost of building and launching the satellites.
+    ground_station_cost : float or numpy.ndarray
+        Cost of the ground stations.
+    spectrum_cost : float or numpy.ndarray
+        Cost of the spectrum licenses.
+    regulation_fees : float or numpy.ndarray
+        Regulatory fees.
+    digital_infrastructure_cost : float or numpy.ndarray
+        Cost of the digital infrastructure.
+
+    Returns
+    -------
+    capex : float or numpy.ndarray
+        The capital expenditure.
+
+    """
+    capex = satellite_launch_cost + ground_station_cost + spectrum_cost \
+            + regulation_fees + digital_infrastructure_cost
+
+    return capex
+
+
+def calc_opex(ground_station_energy, subscriber_acquisition, staff_costs,
+    research_development, maintenance):
+    """
+    Calculate the annual operating expenditure.
+
+    Parameters
+    ----------
+    ground_station_energy : float or numpy.ndarray
+        Annual energy cost of the ground stations.
+    subscriber_acquisition : float or numpy.ndarray
+        Annual subscriber acquisition cost.
+    staff_costs : float or numpy.ndarray
+        Annual staff costs.
+    research_development : float or numpy.ndarray
+        Annual research and development costs.
+    maintenance : float or numpy.ndarray
+        Annual maintenance costs.
+
+    Returns
+    -------
+    opex : float or numpy.ndarray
+        The annual operating expenditure.
+
+    """
+    opex = ground_station_energy + subscriber_acquisition + staff_costs \
+           + research_development + maintenance
+
+    return opex
+
+
+@lru_cache(maxsize=None)
+def calc_discount_factors(discount_rate, assessment_period):
+    """
+    Find the discount factor for each year of the assessment period.
+
+    Results are cached for each (discount rate, assessment period) pair
+    and returned as a read-only array.
+
+    Parameters
+    ----------
+    discount_rate : float
+        Discount rate in percent.
+    assessment_period : int
+        Number of years assessed. The first year is undiscounted.
+
+    Returns
+    -------
+    discount_factors : numpy.ndarray
+        Array of length assessment_period.
+
+    """
+    years = np.arange(0, int(assessment_period))
+
+    discount_factors = 1 / ((discount_rate / 100) + 1)**years
+    discount_factors.setflags(write=False)
+
+    return discount_factors
+
+
+def calc_npv(cash_flows, discount_rate):
+    """
+    Calculate the net present value of annual cash flows.
+
+    Parameters
+    ----------
+    cash_flows : numpy.ndarray
+        Array of shape (..., years), with one row of annual cash flows
+        per sample.
+    discount_rate : float
+        Discount rate in percent.
+
+    Returns
+    -------
+    npv : float or numpy.ndarray
+        The net present value of each row.
+
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+
+    discount_factors = calc_discount_factors(discount_rate, cash_flows.shape[-1])
+
+    npv = cash_flows @ discount_factors
+
+    return npv
+
+
+def calc_total_cost_ownership(capex, opex, discount_rate, assessment_period):
+    """
+    Calculate the total cost of ownership (TCO) with a constant annual opex.
+
+    Parameters
+    ----------
+    capex : float or numpy.ndarray
+        The capital expenditure.
+    opex : float or numpy.ndarray
+        The annual operating expenditure.
+    discount_rate : float
+        Discount rate in percent.
+    assessment_period : int
+        Number of years assessed.
+
+    Returns
+    -------
+    total_cost_ownership : float or numpy.ndarray
+        The total cost of ownership.
+
+    """
+    annuity_factor = calc_discount_factors(discount_rate, assessment_period).sum()
+
+    total_cost_ownership = capex + opex * annuity_factor
+
+    return total_cost_ownership
+
+
+def calc_total_cost_ownership_cash_flows(capex, opex_cash_flows, discount_rate):
+    """
+    Calculate the total cost of ownership (TCO) with an opex which varies
+    by year.
+
+    Parameters
+    ----------
+    capex : float or numpy.ndarray
+        The capital expenditure of each sample.
+    opex_cash_flows : numpy.ndarray
+        Array of shape (samples, years) of annual operating expenditure.
+    discount_rate : float
+        Discount rate in percent.
+
+    Returns
+    -------
+    total_cost_ownership : numpy.ndarray
+        The total cost of ownership of each sample.
+
+    """
+    total_cost_ownership = capex + calc_npv(opex_cash_flows, discount_rate)
+
+    return total_cost_ownership
@@ -0,0 +1,163 @@
+"""
+Globalsat constellation density model.
+
+Satellite density by latitude for inclined Walker shells. Satellites in
+circular orbits spend more time near the latitude of their inclination,
+so density rises from the equator towards the inclination and is zero
+beyond the coverage edge. Densities are precomputed as latitude band
+lookup tables, and regions are joined to them by centroid latitude.
+
+"""
+import numpy as np
+from functools import lru_cache
+
+from globalsat.footprint import calc_coverage_half_angle
+from globalsat.geometry import calc_latitude_bands, find_latitude_band
+from globalsat.sim import calc_link_budget
+
+
+@lru_cache(maxsize=None)
+def calc_latitude_density(number_of_satellites, inclination_deg, resolution,
+    coverage_half_angle_deg=0):
+    """
+    Calculate the satellite density in each latitude band.
+
+    The fraction of time a circular orbit of inclination i spends south of
+    latitude lat is 1/2 + arcsin(sin(lat) / sin(i)) / pi. Integrating this
+    over each band avoids the singularity in density at the inclination.
+
+    If a coverage half angle is given, each band's satellites are spread
+    over all bands within that angle, in proportion to band area, so that
+    regions beyond the inclination are served by satellites near it.
+
+    Results are cached and returned as a read-only array.
+
+    Parameters
+    ----------
+    number_of_satellites : int
+        Number of satellites in the shell.
+    inclination_deg : float
+        Orbital inclination in degrees.
+    resolution : float
+        Height of each latitude band in degrees.
+    coverage_half_angle_deg : float
+        Earth central angle of a satellite's coverage in degrees.
+
+    Returns
+    -------
+    density : numpy.ndarray
+        Satellites per km^2 in each band of `calc_latitude_bands(resolution)`.
+
+    """
+    bands = calc_latitude_bands(resolution)
+
+    sin_inclination = np.sin(np.radians(min(inclination_deg, 180 - inclination_deg)))
+    ratio = np.sin(np.radians(bands['latitude_edges'])) / sin_inclination
+    time_fraction = 0.5 + np.arcsin(np.clip(ratio, -1, 1)) / np.pi
+
+    satellites = number_of_satellites * np.diff(time_fraction)
+    band_area = bands['band_area_km2']
+
+    #window of bands within the coverage half angle of each band
+    width = int(round(coverage_half_angle_deg / resolution))
+    idx = np.arange(len(band_area))
+    lower = np.maximum(idx - width, 0)
+    upper = np.minimum(idx + width, len(band_area) - 1) + 1
+
+    def window_sum(values):
+        cumulative = np.concatenate([[0], np.cumsum(values)])
+        return cumulative[upper] - cumulative[lower]
+
+    #each band's satellites cover the window area around it, and the
+    #density of a band sums the contributions of all windows containing it
+    density = window_sum(satellites / window_sum(band_area))
+    density.setflags(write=False)
+
+    return density
+
+
+def calc_latitude_capacity(number_of_satellites, params, lut, resolution,
+    random_variations):
+    """
+    Calculate the capacity per km^2 in each latitude band.
+
+    The link budget is evaluated once per band and random variation, and
+    averaged over the random variations.
+
+    Parameters
+    ----------
+    number_of_satellites : int
+        Number of satellites in the constellation.
+    params : dict
+        Contains all simulation parameters, including 'inclination_deg'
+        and 'min_elevation_deg'.
+    lut : list of tuples
+        Lookup table for CNR to spectral efficiency.
+    resolution : float
+        Height of each latitude band in degrees.
+    random_variations : numpy.ndarray
+        Stochastic path loss components in dB.
+
+    Returns
+    -------
+    results : dict
+        Contains arrays for each latitude band of 'latitude', 'density',
+        'distance', 'satellite_coverage_area', 'aggregate_capacity' and
+        'capacity_kmsq'. Bands without coverage have zero capacity.
+
+    """
+    half_angle = calc_coverage_half_angle(params['altitude_km'],
+        params['min_elevation_deg'])
+
+    density = calc_latitude_density(number_of_satellites,
+        params['inclination_deg'], resolution, float(half_angle))
+
+    covered = density > 0
+
+    with np.errstate(divide='ignore'):
+        satellite_coverage_area = 1 / density
+
+    mean_distance_between_assets = np.sqrt(satellite_coverage_area[covered]) / 2
+    distance = np.sqrt(mean_distance_between_assets**2 + params['altitude_km']**2)
+
+    link_budget = calc_link_budget(distance[:, np.newaxis], params,
+        random_variations, lut)
+
+    aggregate_capacity = np.zeros(len(density))
+    aggregate_capacity[covered] = link_budget['aggregate_capacity'].mean(axis=1)
+
+    all_distance = np.full(len(density), np.inf)
+    all_distance[covered] = distance
+
+    results = {
+        'latitude': calc_latitude_bands(resolution)['latitude'],
+        'density': density,
+        'distance': all_distance,
+        'satellite_coverage_area': satellite_coverage_area,
+        'aggregate_capacity': aggregate_capacity,
+        'capacity_kmsq': aggregate_capacity * density,
+    }
+
+    return results
+
+
+def lookup_latitude_values(latitudes, values, resolution):
+    """
+    Join latitude band values to locations by latitude.
+
+    Parameters
+    ----------
+    latitudes : array_like
+        Latitude of each location, such as region centroids, in degrees.
+    values : numpy.ndarray
+        Value for each band of `calc_latitude_bands(resolution)`.
+    resolution : float
+        Height of each latitude band in degrees.
+
+    Returns
+    -------
+    location_values : numpy.ndarray
+        Value of the band containing each location.
+
+    """
+    return np.asarray(values)[find_latitude_band(latitudes, resolution)]
@@ -0,0 +1,141 @@
+"""
+Globalsat launch emissions model.
+
+Emission factors are held as a vehicle x fuel x compound coefficient
+tensor, so the emissions of any batch of launches are a single product
+with an array of fuel masses. Adding a launch vehicle only requires an
+entry in `VEHICLE_EMISSION_FACTORS`.
+
+"""
+import numpy as np
+
+
+FUELS = ['kerosene', 'hypergolic', 'solid', 'cryogenic']
+
+COMPOUNDS = [
+    'alumina_emission',
+    'sulphur_emission',
+    'carbon_emission',
+    'cfc_gases',
+    'particulate_matter',
+    'photo_oxidation',
+]
+
+#Kilograms of each compound emitted per kilogram of fuel burnt, in the
+#order of COMPOUNDS.
+VEHICLE_EMISSION_FACTORS = {
+    'soyuz_fg': {
+        'kerosene': [0.05, 0.001*0.7, 0.352, (0.016 + 0.003 + 0.001)*0.7,
+                     0.001*0.22 + 0.05, 0.528*0.0456 + 0.001],
+        'hypergolic': [0.001, 0.001*0.7, 0.252, (0.016 + 0.003 + 0.001)*0.7,
+                       0.001*0.22 + 0.001, 0.378*0.0456 + 0.001],
+    },
+    'falcon_9': {
+        'kerosene': [0.05, 0.001*0.7, 0.352, (0.016 + 0.003 + 0.001)*0.7,
+                     0.001*0.22 + 0.05, 0.528*0.0456 + 0.001],
+    },
+    'falcon_heavy': {
+        'kerosene': [0.05, 0.001*0.7, 0.352, (0.016 + 0.003 + 0.001)*0.7,
+                     0.001*0.22 + 0.05, 0.528*0.0456 + 0.001],
+    },
+    'ariane': {
+        'hypergolic': [0.001, 0.001*0.7, 0.252, (0.016 + 0.003 + 0.001)*0.7,
+                       0.001*0.22 + 0.001, 0.378*0.0456 + 0.001],
+        'solid': [0.33, 0.005*0.7 + 0.15*0.88, 0.108, (0.08 + 0.015 + 0.005 + 0.15)*0.7,
+                  0.005*0.22 + 0.33, 0.162*0.0456 + 0.005],
+        'cryogenic': [0, 0.001*0.7, 0, (0.016 + 0.003 + 0.001)*0.7,
+                      0.001*0.22, 0.001],
+    },
+}
+
+VEHICLES = list(VEHICLE_EMISSION_FACTORS.keys())
+
+
+def build_emission_tensor(vehicle_emission_factors, fuels, compounds):
+    """
+    Build the vehicle x fuel x compound emission factor tensor.
+
+    Parameters
+    ----------
+    vehicle_emission_factors : dict
+        Emission factors by vehicle and fuel, listed in the order of compounds.
+    fuels : list
+        Fuel types, giving the order of the second axis.
+    compounds : list
+        Emitted compounds, giving the order of the third axis.
+
+    Returns
+    -------
+    tensor : numpy.ndarray
+        Array of shape (vehicles, fuels, compounds). Fuels a vehicle does not
+        burn have zero emission factors.
+
+    """
+    tensor = np.zeros((len(vehicle_emission_factors), len(fuels), len(compounds)))
+
+    for idx, factors in enumerate(vehicle_emission_factors.values()):
+        for fuel, values in factors.items():
+            tensor[idx, fuels.index(fuel)] = values
+
+    tensor.setflags(write=False)
+
+    return tensor
+
+
+EMISSION_TENSOR = build_emission_tensor(VEHICLE_EMISSION_FACTORS, FUELS, COMPOUNDS)
+
+
+def calc_emissions(vehicles, fuel_masses):
+    """
+    Calculate the emissions of a batch of launches.
+
+    Parameters
+    ----------
+    vehicles : string or array_like
+        Launch vehicle name, or one name per launch.
+    fuel_masses : array_like
+        Array of shape (..., fuels) with the kilograms of each fuel type
+        burnt, in the order of FUELS.
+
+    Returns
+    -------
+    emissions : numpy.ndarray
+        Array of shape (..., compounds) with the kilograms of each compound
+        emitted, in the order of COMPOUNDS.
+
+    """
+    fuel_masses = np.asarray(fuel_masses, dtype=float)
+
+    if isinstance(vehicles, str):
+        return fuel_masses @ EMISSION_TENSOR[VEHICLES.index(vehicles)]
+
+    names, inverse = np.unique(np.asarray(vehicles), return_inverse=True)
+    vehicle_idx = np.array([VEHICLES.index(name) for name in names])[inverse]
+    vehicle_idx = vehicle_idx.reshape(np.shape(vehicles))
+
+    emissions = np.einsum('...f,...fc->...c', fuel_masses, EMISSION_TENSOR[vehicle_idx])
+
+    return emissions
+
+
+def emissions_to_dict(emissions):
+    """
+    Split an emissions array into a dict keyed by compound.
+
+    Parameters
+    ----------
+    emissions : numpy.ndarray
+        Array of shape (..., compounds).
+
+    Returns
+    -------
+    emission_dict : dict
+        Contains the emissions of each compound, as a float for a single
+        launch or an array for a batch.
+
+    """
+    emission_dict = {
+        compound: emissions[..., idx][()] for idx, compound in enumerate(COMPOUNDS)
+    }
+
+    return emission_dict
@@ -0,0 +1,117 @@
+"""
+Globalsat fleet lifetime model.
+
+Simulates deployment, retirement and replacement of satellites over a
+multi-year horizon, together with the launches and emissions required.
+All constellations and uncertainty samples are stepped through time at
+once as array operations.
+
+"""
+import numpy as np
+
+
+def generate_deployment_schedule(number_of_satellites, deployment_years, horizon_years):
+    """
+    Spread the initial deployment of each constellation evenly over its
+    deployment period.
+
+    Parameters
+    ----------
+    number_of_satellites : array_like
+        Size of each constellation.
+    deployment_years : array_like
+        Number of years taken to deploy each constellation.
+    horizon_years : int
+        Number of years simulated.
+
+    Returns
+    -------
+    deployment : numpy.ndarray
+        Array of shape (horizon_years, constellations) of new satellites
+        deployed each year.
+
+    """
+    number_of_satellites = np.asarray(number_of_satellites, dtype=float)
+    deployment_years = np.asarray(deployment_years)
+
+    years = np.arange(horizon_years)[:, np.newaxis]
+
+    deployment = np.where(years < deployment_years,
+        number_of_satellites / deployment_years, 0)
+
+    return deployment
+
+
+def simulate_fleet(deployment, lifetimes, satellites_per_launch, emissions_per_launch):
+    """
+    Simulate satellite launches, retirements and emissions by year.
+
+    Every retired satellite is replaced in the year it retires, so each
+    constellation is maintained at its deployed size.
+
+    Parameters
+    ----------
+    deployment : numpy.ndarray
+        Array of shape (years, ...) of new satellites deployed each year.
+        The trailing dimensions are typically (constellations, samples).
+    lifetimes : array_like
+        Satellite lifetime in whole years, broadcastable to the trailing
+        dimensions of `deployment`.
+    satellites_per_launch : array_like
+        Satellites carried by each launch, broadcastable to the trailing
+        dimensions of `deployment`.
+    emissions_per_launch : array_like
+        Array of shape (..., compounds) of emissions per launch, with
+        leading dimensions broadcastable to the trailing dimensions of
+        `deployment`.
+
+    Returns
+    -------
+    results : dict
+        Contains arrays of shape (years, ...) for 'satellites_launched',
+        'satellites_retired', 'on_orbit' and 'launches', and arrays of shape
+        (years, ..., compounds) for 'emissions' and 'cumulative_emissions'.
+
+    """
+    deployment = np.asarray(deployment, dtype=float)
+    lifetimes = np.asarray(lifetimes)
+    satellites_per_launch = np.asarray(satellites_per_launch, dtype=float)
+    emissions_per_launch = np.asarray(emissions_per_launch, dtype=float)
+
+    if (lifetimes < 1).any():
+        raise ValueError('Satellite lifetimes must be at least one year')
+
+    batch_shape = np.broadcast_shapes(deployment.shape[1:], lifetimes.shape,
+        satellites_per_launch.shape, emissions_per_launch.shape[:-1])
+    years = deployment.shape[0]
+
+    deployment = np.broadcast_to(deployment, (years,) + batch_shape)
+    lifetimes = np.broadcast_to(lifetimes, batch_shape).astype(int)
+
+    launched = np.zeros((years,) + batch_shape)
+    retired = np.zeros((years,) + batch_shape)
+
+    for year in range(years):
+
+        launch_year = year - lifetimes
+
+        retiring = np.take_along_axis(
+            launched, np.maximum(launch_year, 0)[np.newaxis], axis=0)[0]
+
+        retired[year] = np.where(launch_year >= 0, retiring, 0)
+        launched[year] = deployment[year] + retired[year]
+
+    launches = launched / satellites_per_launch
+
+    emissions = launches[..., np.newaxis] * emissions_per_launch
+
+    results = {
+        'satellites_launched': launched,
+        'satellites_retired': retired,
+        'on_orbit': np.cumsum(launched - retired, axis=0),
+        'launches': launches,
+        'emissions': emissions,
+        'cumulative_emissions': np.cumsum(emissions, axis=0),
+    }
+
+    return results
@@ -0,0 +1,195 @@
+"""
+Globalsat footprint geometry.
+
+Closed-form coverage geometry of a satellite on a spherical Earth, given
+its altitude and the minimum elevation angle of user terminals. Every
+function broadcasts over arrays of altitudes and elevation masks, so
+design sweeps are single array operations.
+
+Over the coverage cap, the squared slant range d^2 = R^2 + r^2 - 2Rr cos(x)
+is linear in the cap area 2 pi R^2 (1 - cos(x)), so for users spread
+uniformly over the footprint d^2 is uniform between the squared altitude
+and the squared maximum slant range.
+
+"""
+import numpy as np
+from functools import lru_cache
+
+from globalsat.geometry import EARTH_RADIUS_EQUATOR_KM
+
+
+def calc_coverage_half_angle(altitude_km, min_elevation_deg):
+    """
+    Calculate the Earth central angle between a satellite's sub-satellite
+    point and the edge of its coverage.
+
+    Parameters
+    ----------
+    altitude_km : float or numpy.ndarray
+        Satellite altitude in km.
+    min_elevation_deg : float or numpy.ndarray
+        Minimum elevation angle of a user terminal in degrees.
+
+    Returns
+    -------
+    half_angle : float or numpy.ndarray
+        Earth central angle in degrees.
+
+    """
+    elevation = np.radians(min_elevation_deg)
+    ratio = EARTH_RADIUS_EQUATOR_KM / (EARTH_RADIUS_EQUATOR_KM + altitude_km)
+
+    half_angle = np.degrees(np.arccos(ratio * np.cos(elevation)) - elevation)
+
+    return half_angle
+
+
+def calc_max_slant_range(altitude_km, min_elevation_deg):
+    """
+    Calculate the slant range to a user at the edge of coverage.
+
+    Parameters
+    ----------
+    altitude_km : float or numpy.ndarray
+        Satellite altitude in km.
+    min_elevation_deg : float or numpy.ndarray
+        Minimum elevation angle of a user terminal in degrees.
+
+    Returns
+    -------
+    max_slant_range : float or numpy.ndarray
+        Slant range in km.
+
+    """
+    elevation = np.radians(min_elevation_deg)
+    radius = EARTH_RADIUS_EQUATOR_KM
+
+    max_slant_range = (np.sqrt((radius + altitude_km)**2 -
+        (radius * np.cos(elevation))**2) - radius * np.sin(elevation))
+
+    return max_slant_range
+
+
+def calc_cap_area(altitude_km, min_elevation_deg):
+    """
+    Calculate the surface area of a satellite's coverage cap.
+
+    Parameters
+    ----------
+    altitude_km : float or numpy.ndarray
+        Satellite altitude in km.
+    min_elevation_deg : float or numpy.ndarray
+        Minimum elevation angle of a user terminal in degrees.
+
+    Returns
+    -------
+    cap_area : float or numpy.ndarray
+        Area in km^2.
+
+    """
+    half_angle = np.radians(calc_coverage_half_angle(altitude_km, min_elevation_deg))
+
+    cap_area = 2 * np.pi * EARTH_RADIUS_EQUATOR_KM**2 * (1 - np.cos(half_angle))
+
+    return cap_area
+
+
+def calc_slant_range_quantiles(altitude_km, min_elevation_deg, quantiles):
+    """
+    Calculate quantiles of the slant range for users spread uniformly
+    over the coverage cap.
+
+    Parameters
+    ----------
+    altitude_km : float or numpy.ndarray
+        Satellite altitude in km.
+    min_elevation_deg : float or numpy.ndarray
+        Minimum elevation angle of a user terminal in degrees.
+    quantiles : float or numpy.ndarray
+        Quantiles between 0 and 1.
+
+    Returns
+    -------
+    slant_range : numpy.ndarray
+        Slant ranges in km, with a trailing axis over quantiles if
+        `quantiles` is an array.
+
+    """
+    altitude_km = np.asarray(altitude_km, dtype=float)[..., np.newaxis]
+    max_slant_range = calc_max_slant_range(altitude_km,
+        np.asarray(min_elevation_deg)[..., np.newaxis])
+
+    quantiles = np.asarray(quantiles, dtype=float)
+
+    slant_range = np.sqrt(altitude_km**2 +
+        np.atleast_1d(quantiles) * (max_slant_range**2 - altitude_km**2))
+
+    return slant_range if quantiles.ndim else slant_range[..., 0]
+
+
+def calc_mean_slant_range(altitude_km, min_elevation_deg):
+    """
+    Calculate the mean slant range for users spread uniformly over the
+    coverage cap.
+
+    Parameters
+    ----------
+    altitude_km : float or numpy.ndarray
+        Satellite altitude in km.
+    min_elevation_deg : float or numpy.ndarray
+        Minimum elevation angle of a user terminal in degrees.
+
+    Returns
+    -------
+    mean_slant_range : float or numpy.ndarray
+        Slant range in km.
+
+    """
+    max_slant_range = calc_max_slant_range(altitude_km, min_elevation_deg)
+
+    mean_slant_range = (2 / 3) * (max_slant_range**3 - altitude_km**3) / (
+        max_slant_range**2 - altitude_km**2)
+
+    return mean_slant_range
+
+
+@lru_cache(maxsize=None)
+def calc_footprint_table(altitudes_km, min_elevations_deg):
+    """
+    Build a table of footprint geometry over altitudes and elevation masks.
+
+    Tables are cached per grid and all arrays are read-only.
+
+    Parameters
+    ----------
+    altitudes_km : tuple of floats
+        Satellite altitudes in km.
+    min_elevations_deg : tuple of floats
+        Minimum elevation angles of user terminals in degrees.
+
+    Returns
+    -------
+    table : dict
+        Contains 'altitude_km', 'min_elevation_deg', and arrays of shape
+        (altitudes, elevations) for 'coverage_half_angle_deg',
+        'cap_area_km2', 'max_slant_range_km' and 'mean_slant_range_km'.
+
+    """
+    altitude = np.asarray(altitudes_km, dtype=float)
+    elevation = np.asarray(min_elevations_deg, dtype=float)
+
+    grid_altitude, grid_elevation = np.meshgrid(altitude, elevation, indexing='ij')
+
+    table = {
+        'altitude_km': altitude,
+        'min_elevation_deg': elevation,
+        'coverage_half_angle_deg': calc_coverage_half_angle(grid_altitude, grid_elevation),
+        'cap_area_km2': calc_cap_area(grid_altitude, grid_elevation),
+        'max_slant_range_km': calc_max_slant_range(grid_altitude, grid_elevation),
+        'mean_slant_range_km': calc_mean_slant_range(grid_altitude, grid_elevation),
+    }
+
+    for values in table.values():
+        values.setflags(write=False)
+
+    return table
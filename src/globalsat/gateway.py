@@ -0,0 +1,229 @@
+"""
+Globalsat gateway flow model.
+
+Models regions, satellites and gateways as a flow network, where traffic
+from each region passes through a visible satellite, limited by its user
+link capacity, and down a feeder link to a gateway, limited by feeder and
+gateway capacity. The maximum flow gives the demand that can be served in
+each region.
+
+Regions which see the same set of satellites are interchangeable in the
+network, so they are merged into one node and their served demand is
+split in proportion to demand. Scenarios which differ only in demand
+reuse the residual graph of the previous solution, so each scenario only
+augments the flow already found. Adoption scenarios should therefore be
+solved on one model in increasing order of demand.
+
+The run script estimates capacity per area without placing gateways, so
+it does not build this network. The model is for studies which have
+gateway sites and region to satellite visibility, such as from
+`globalsat.visibility`.
+
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import maximum_flow
+
+#capacity of unlimited edges, leaving headroom for sums of int32 flows
+UNLIMITED_UNITS = np.iinfo(np.int32).max // 4
+
+
+def group_regions(cell, satellite, number_of_regions, number_of_satellites, seed_value=0):
+    """
+    Group regions which see exactly the same set of satellites.
+
+    Parameters
+    ----------
+    cell : numpy.ndarray
+        Region index of each visible region and satellite pair.
+    satellite : numpy.ndarray
+        Satellite index of each visible pair.
+    number_of_regions : int
+        Number of regions.
+    number_of_satellites : int
+        Number of satellites.
+    seed_value : int
+        Seed for the random weights used to hash satellite sets.
+
+    Returns
+    -------
+    group : numpy.ndarray
+        Group index of each region.
+    group_cell : numpy.ndarray
+        Group index of each distinct visible pair.
+    group_satellite : numpy.ndarray
+        Satellite index of each distinct visible pair.
+
+    """
+    #each set is hashed as a wrapping sum of random 64-bit weights
+    weights = np.random.default_rng(seed_value).integers(
+        0, 2**63, size=number_of_satellites, dtype=np.uint64)
+
+    pairs = np.unique(np.stack([cell, satellite], axis=1), axis=0)
+
+    signature = np.zeros(number_of_regions, dtype=np.uint64)
+    np.add.at(signature, pairs[:, 0], weights[pairs[:, 1]])
+
+    _, first, group = np.unique(signature, return_index=True, return_inverse=True)
+    group = group.ravel()
+
+    representative = np.isin(pairs[:, 0], first)
+    group_cell = group[pairs[representative, 0]]
+    group_satellite = pairs[representative, 1]
+
+    return group, group_cell, group_satellite
+
+
+class GatewayFlowModel:
+    """
+    Served demand per region under user link, feeder link and gateway limits.
+
+    Capacities and demand are rounded down to whole multiples of `unit`,
+    as the max-flow solver works on integers. Every value must be below
+    `UNLIMITED_UNITS` units, the capacity of the unlimited edges from
+    regions to their visible satellites.
+
+    Parameters
+    ----------
+    region_satellite : tuple of numpy.ndarray
+        Region and satellite index of each visible pair, such as the 'cell'
+        and 'satellite' arrays of `globalsat.visibility.find_visible_satellites`.
+    number_of_regions : int
+        Number of regions.
+    satellite_capacity : numpy.ndarray
+        User link capacity of each satellite in Mbps.
+    satellite_gateway : tuple of numpy.ndarray
+        Satellite and gateway index of each feeder link.
+    feeder_capacity : float or numpy.ndarray
+        Capacity of each feeder link in Mbps.
+    gateway_capacity : numpy.ndarray
+        Capacity of each gateway in Mbps.
+    unit : float
+        Flow quantum in Mbps.
+
+    """
+    def __init__(self, region_satellite, number_of_regions, satellite_capacity,
+        satellite_gateway, feeder_capacity, gateway_capacity, unit=1.0):
+        self.unit = unit
+
+        number_of_satellites = len(satellite_capacity)
+        number_of_gateways = len(gateway_capacity)
+
+        self.group, group_cell, group_satellite = group_regions(
+            region_satellite[0], region_satellite[1], number_of_regions,
+            number_of_satellites)
+        number_of_groups = self.group.max() + 1 if number_of_regions else 0
+
+        #nodes are the source, groups, satellite inputs and outputs, gateways
+        #and the sink, with each satellite split to carry its capacity
+        group_node = 1 + np.arange(number_of_groups)
+        satellite_in = 1 + number_of_groups + np.arange(number_of_satellites)
+        satellite_out = satellite_in + number_of_satellites
+        gateway_node = 1 + number_of_groups + 2 * number_of_satellites + \
+            np.arange(number_of_gateways)
+        self.sink = 1 + number_of_groups + 2 * number_of_satellites + number_of_gateways
+        self.number_of_nodes = self.sink + 1
+        self.group_node = group_node
+
+        feeder_satellite, feeder_gateway = satellite_gateway
+        feeder_capacity = np.broadcast_to(feeder_capacity, np.shape(feeder_satellite))
+
+        rows = np.concatenate([
+            group_node[group_cell],
+            satellite_in,
+            satellite_out[feeder_satellite],
+            gateway_node,
+        ])
+        cols = np.concatenate([
+            satellite_in[group_satellite],
+            satellite_out,
+            gateway_node[feeder_gateway],
+            np.full(number_of_gateways, self.sink),
+        ])
+        #regions can send all their demand to any visible satellite
+        capacity = np.concatenate([
+            np.full(len(group_cell), UNLIMITED_UNITS),
+            self._to_units(satellite_capacity),
+            self._to_units(feeder_capacity),
+            self._to_units(gateway_capacity),
+        ])
+
+        self.network = csr_matrix((capacity, (rows, cols)),
+            shape=(self.number_of_nodes, self.number_of_nodes), dtype=np.int32)
+
+        self.source_demand = None
+        self.flow = None
+
+
+    def _to_units(self, values):
+        """
+        Convert capacities in Mbps to whole flow units.
+
+        """
+        units = np.floor(np.asarray(values, dtype=float) / self.unit)
+
+        if np.any(~np.isfinite(units)) or np.any(units >= UNLIMITED_UNITS):
+            raise ValueError('Values up to {} Mbps exceed {} flow units of {} Mbps, '
+                'use a larger unit'.format(np.max(values), UNLIMITED_UNITS, self.unit))
+        if np.any(units < 0):
+            raise ValueError('Capacities and demand must not be negative')
+
+        return units.astype(np.int32)
+
+
+    def _capacity(self, source_demand):
+        """
+        Build the capacity matrix with the given demand on source edges.
+
+        """
+        source_edges = csr_matrix(
+            (source_demand, (np.zeros(len(source_demand), dtype=int), self.group_node)),
+            shape=self.network.shape, dtype=np.int32)
+
+        return (self.network + source_edges).tocsr()
+
+
+    def solve(self, demand):
+        """
+        Calculate the served demand in each region.
+
+        If the demand of every region group is at least that of the previous
+        call, the previous flow remains feasible and only the residual graph
+        is searched for further flow.
+
+        Parameters
+        ----------
+        demand : numpy.ndarray
+            Demand of each region in Mbps.
+
+        Returns
+        -------
+        served : numpy.ndarray
+            Served demand of each region in Mbps.
+
+        """
+        demand = np.asarray(demand, dtype=float)
+        group_demand = np.bincount(self.group, weights=demand,
+            minlength=len(self.group_node))
+        source_demand = self._to_units(group_demand)
+
+        capacity = self._capacity(source_demand)
+
+        if self.flow is not None and (source_demand >= self.source_demand).all():
+            #flow f is skew-symmetric, so the residual capacity is c - f
+            residual = (capacity - self.flow).tocsr()
+            residual.eliminate_zeros()
+            flow = self.flow + maximum_flow(residual, 0, self.sink,
+                method='dinic').flow
+        else:
+            flow = maximum_flow(capacity, 0, self.sink, method='dinic').flow
+
+        self.flow = flow.tocsr()
+        self.source_demand = source_demand
+
+        group_served = np.asarray(self.flow[0, self.group_node].todense()).ravel()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(group_demand > 0, group_served * self.unit / group_demand, 0)
+
+        return demand * np.minimum(share, 1)[self.group]
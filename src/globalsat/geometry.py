@@ -0,0 +1,161 @@
+"""
+Globalsat Earth geometry.
+
+Latitude band tables on the WGS84 ellipsoid, computed in one array pass
+and cached per resolution.
+
+"""
+import numpy as np
+from functools import lru_cache
+
+
+EARTH_RADIUS_EQUATOR_KM = 6378.137
+EARTH_RADIUS_POLES_KM = 6356.752
+
+
+def calc_radius_at_latitude(latitude):
+    """
+    Calculate the geocentric radius of the Earth at the given latitudes.
+
+    Parameters
+    ----------
+    latitude : float or numpy.ndarray
+        Geodetic latitude in degrees.
+
+    Returns
+    -------
+    radius : float or numpy.ndarray
+        Distance from the centre of the Earth to the surface in km.
+
+    """
+    a = EARTH_RADIUS_EQUATOR_KM
+    b = EARTH_RADIUS_POLES_KM
+
+    cos_lat = np.cos(np.radians(latitude))
+    sin_lat = np.sin(np.radians(latitude))
+
+    numerator = (a**2 * cos_lat)**2 + (b**2 * sin_lat)**2
+    denominator = (a * cos_lat)**2 + (b * sin_lat)**2
+
+    radius = np.sqrt(numerator / denominator)
+
+    return radius
+
+
+def calc_area_from_equator(latitude):
+    """
+    Calculate the surface area of the ellipsoid between the equator and
+    the given latitudes, over all longitudes.
+
+    Parameters
+    ----------
+    latitude : float or numpy.ndarray
+        Geodetic latitude in degrees. Southern latitudes give negative areas.
+
+    Returns
+    -------
+    area : float or numpy.ndarray
+        Surface area in km^2.
+
+    """
+    b = EARTH_RADIUS_POLES_KM
+    e = np.sqrt(1 - (b / EARTH_RADIUS_EQUATOR_KM)**2)
+
+    sin_lat = np.sin(np.radians(latitude))
+
+    area = np.pi * b**2 * (
+        sin_lat / (1 - (e * sin_lat)**2) +
+        np.arctanh(e * sin_lat) / e
+    )
+
+    return area
+
+
+def calc_latitude_steps(interval):
+    """
+    List latitudes from the equator to the pole at a given interval.
+
+    Parameters
+    ----------
+    interval : float
+        Step between latitudes in degrees, which need not divide 90.
+
+    Returns
+    -------
+    latitude : numpy.ndarray
+        Latitudes 0, interval, 2 * interval and so on, up to at most 90.
+
+    """
+    #the tolerance keeps 90 when rounding leaves the last step just above it
+    number_of_steps = int(np.floor(90 / interval + 1e-9)) + 1
+
+    return np.minimum(np.arange(number_of_steps) * interval, 90)
+
+
+@lru_cache(maxsize=None)
+def calc_latitude_bands(resolution):
+    """
+    Build the latitude band table for a given resolution.
+
+    Tables are cached per resolution and all arrays are read-only.
+
+    Parameters
+    ----------
+    resolution : float
+        Height of each latitude band in degrees. Must divide 180 degrees.
+
+    Returns
+    -------
+    bands : dict
+        Contains 'latitude' (band centres), 'latitude_edges', 'radius_km',
+        'band_area_km2' and 'cumulative_area_km2' (from the south pole to the
+        top of each band).
+
+    """
+    number_of_bands = int(round(180 / resolution))
+
+    if not np.isclose(number_of_bands * resolution, 180):
+        raise ValueError('Resolution must divide 180 degrees, got {}'.format(resolution))
+
+    edges = np.linspace(-90, 90, number_of_bands + 1)
+    latitude = (edges[:-1] + edges[1:]) / 2
+
+    area_from_equator = calc_area_from_equator(edges)
+    cumulative_area = area_from_equator[1:] - area_from_equator[0]
+
+    bands = {
+        'latitude': latitude,
+        'latitude_edges': edges,
+        'radius_km': calc_radius_at_latitude(latitude),
+        'band_area_km2': np.diff(area_from_equator),
+        'cumulative_area_km2': cumulative_area,
+    }
+
+    for values in bands.values():
+        values.setflags(write=False)
+
+    return bands
+
+
+def find_latitude_band(latitude, resolution):
+    """
+    Find the index of the latitude band containing each latitude.
+
+    Parameters
+    ----------
+    latitude : float or numpy.ndarray
+        Latitude in degrees.
+    resolution : float
+        Height of each latitude band in degrees.
+
+    Returns
+    -------
+    idx : int or numpy.ndarray
+        Index into the arrays returned by `calc_latitude_bands`.
+
+    """
+    number_of_bands = int(round(180 / resolution))
+
+    idx = np.floor((np.asarray(latitude) + 90) / resolution).astype(int)
+
+    return np.clip(idx, 0, number_of_bands - 1)
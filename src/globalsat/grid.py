@@ -0,0 +1,413 @@
+"""
+Globalsat quadkey grid.
+
+Aggregates a population raster into the Web Mercator quadkey tiles used by
+web maps, as a regular hierarchical alternative to administrative regions.
+Tiles at zoom z split the map into 2^z by 2^z squares, and each tile is
+identified by the integer interleaving the bits of its column and row, so
+the parent of a tile is its key shifted right by two bits.
+
+Raster pixels are assigned to tiles through a lookup per raster row and
+per raster column, and tile sums come from one bincount, so no polygon
+operations are needed. Tile areas are the summed ellipsoidal areas of
+their pixels.
+
+Coarser copies of a population raster, for quick exploratory runs, sum
+square blocks of pixels so that totals are preserved.
+
+"""
+import os
+import numpy as np
+
+from globalsat.geometry import calc_area_from_equator
+
+#latitude at which the square Web Mercator map ends
+MAX_LATITUDE = np.degrees(np.arctan(np.sinh(np.pi)))
+
+#resolutions in km of the population raster pyramid
+PYRAMID_RESOLUTIONS_KM = [1, 5, 10, 25]
+
+
+def _spread_bits(values):
+    """
+    Move the lower 32 bits of each value to the even bit positions.
+
+    """
+    values = np.asarray(values, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+
+    for shift, mask in [
+        (16, 0x0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333),
+        (1, 0x5555555555555555),
+    ]:
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+
+    return values
+
+
+def _compact_bits(values):
+    """
+    Gather the even bits of each value into the lower 32 bits.
+
+    """
+    values = np.asarray(values, dtype=np.uint64) & np.uint64(0x5555555555555555)
+
+    for shift, mask in [
+        (1, 0x3333333333333333),
+        (2, 0x0F0F0F0F0F0F0F0F),
+        (4, 0x00FF00FF00FF00FF),
+        (8, 0x0000FFFF0000FFFF),
+        (16, 0x00000000FFFFFFFF),
+    ]:
+        values = (values | (values >> np.uint64(shift))) & np.uint64(mask)
+
+    return values
+
+
+def encode_quadkeys(column, row):
+    """
+    Encode tile columns and rows as integer quadkeys.
+
+    Parameters
+    ----------
+    column : numpy.ndarray
+        Tile column, counted east from 180 degrees west.
+    row : numpy.ndarray
+        Tile row, counted south from the top of the map.
+
+    Returns
+    -------
+    quadkey : numpy.ndarray
+        Integer quadkey of each tile.
+
+    """
+    return _spread_bits(column) | (_spread_bits(row) << np.uint64(1))
+
+
+def decode_quadkeys(quadkey):
+    """
+    Decode integer quadkeys into tile columns and rows.
+
+    Parameters
+    ----------
+    quadkey : numpy.ndarray
+        Integer quadkey of each tile.
+
+    Returns
+    -------
+    column : numpy.ndarray
+        Tile column of each quadkey.
+    row : numpy.ndarray
+        Tile row of each quadkey.
+
+    """
+    quadkey = np.asarray(quadkey, dtype=np.uint64)
+
+    column = _compact_bits(quadkey).astype(np.int64)
+    row = _compact_bits(quadkey >> np.uint64(1)).astype(np.int64)
+
+    return column, row
+
+
+def format_quadkeys(quadkey, zoom):
+    """
+    Write integer quadkeys as the usual strings of base 4 digits.
+
+    Parameters
+    ----------
+    quadkey : numpy.ndarray
+        Integer quadkey of each tile.
+    zoom : int
+        Zoom level of the tiles, giving the number of digits.
+
+    Returns
+    -------
+    keys : numpy.ndarray
+        Quadkey string of each tile.
+
+    """
+    quadkey = np.asarray(quadkey, dtype=np.uint64)
+    shifts = np.arange(2 * (zoom - 1), -1, -2, dtype=np.uint64)
+
+    digits = ((quadkey[:, None] >> shifts) & np.uint64(3)).astype(np.uint8)
+
+    characters = (digits + ord('0')).view('S1').reshape(len(quadkey), zoom)
+
+    return characters.view('S{}'.format(max(zoom, 1))).ravel().astype(str)
+
+
+def calc_parent_quadkeys(quadkey, zoom, parent_zoom):
+    """
+    Find the tile containing each tile at a coarser zoom level.
+
+    Parameters
+    ----------
+    quadkey : numpy.ndarray
+        Integer quadkey of each tile.
+    zoom : int
+        Zoom level of the tiles.
+    parent_zoom : int
+        Zoom level of the parents, no greater than `zoom`.
+
+    Returns
+    -------
+    parent : numpy.ndarray
+        Integer quadkey of each parent tile.
+
+    """
+    if parent_zoom > zoom:
+        raise ValueError('Parent zoom {} is finer than zoom {}'.format(
+            parent_zoom, zoom))
+
+    return np.asarray(quadkey, dtype=np.uint64) >> np.uint64(2 * (zoom - parent_zoom))
+
+
+def calc_tile_column(longitude, zoom):
+    """
+    Find the tile column containing each longitude.
+
+    Parameters
+    ----------
+    longitude : numpy.ndarray
+        Longitude in degrees.
+    zoom : int
+        Zoom level of the tiles.
+
+    """
+    tiles = 2**zoom
+
+    column = np.floor((np.asarray(longitude, dtype=float) + 180) / 360 * tiles)
+
+    return np.clip(column, 0, tiles - 1).astype(np.int64)
+
+
+def calc_tile_row(latitude, zoom):
+    """
+    Find the tile row containing each latitude.
+
+    Latitudes beyond the edge of the map are placed in the first or last
+    row.
+
+    Parameters
+    ----------
+    latitude : numpy.ndarray
+        Latitude in degrees.
+    zoom : int
+        Zoom level of the tiles.
+
+    """
+    tiles = 2**zoom
+
+    latitude = np.clip(np.asarray(latitude, dtype=float), -MAX_LATITUDE, MAX_LATITUDE)
+    mercator_y = np.arcsinh(np.tan(np.radians(latitude)))
+
+    row = np.floor((1 - mercator_y / np.pi) / 2 * tiles)
+
+    return np.clip(row, 0, tiles - 1).astype(np.int64)
+
+
+def calc_tile_latitude(row, zoom):
+    """
+    Calculate the latitude of the top edge of each tile row.
+
+    Parameters
+    ----------
+    row : numpy.ndarray
+        Tile row, where row 2^zoom gives the bottom edge of the map.
+    zoom : int
+        Zoom level of the tiles.
+
+    """
+    mercator_y = np.pi * (1 - 2 * np.asarray(row, dtype=float) / 2**zoom)
+
+    return np.degrees(np.arctan(np.sinh(mercator_y)))
+
+
+def aggregate_raster_to_quadkeys(array, affine, zoom, mask=None, nodata=None,
+    block_rows=1024):
+    """
+    Sum a population raster over the quadkey tiles it covers.
+
+    Each pixel is assigned to the tile containing its centre. The raster
+    must be north up in degrees, as the tile of a pixel is found from its
+    row and its column separately.
+
+    Parameters
+    ----------
+    array : numpy.ndarray
+        Population of each pixel. May be a read-only memory map.
+    affine : affine.Affine
+        Transform of the raster.
+    zoom : int
+        Zoom level of the tiles.
+    mask : numpy.ndarray
+        Whether each pixel is included, such as the pixels inside a country.
+        All pixels are included if not given.
+    nodata : float
+        Pixel value to exclude.
+    block_rows : int
+        Number of raster rows read at a time.
+
+    Returns
+    -------
+    grid : dict
+        Contains 'quadkey', 'population', 'area_km2' (the area of included
+        pixels) and 'latitude' (the tile centre) for each tile with at least
+        one included pixel.
+
+    """
+    number_of_rows, number_of_columns = array.shape
+
+    if affine.b != 0 or affine.d != 0 or affine.e >= 0:
+        raise ValueError('Raster must be north up without rotation')
+
+    #tile and pixel area of each raster row, and tile of each raster column
+    top = affine.f + affine.e * np.arange(number_of_rows + 1)
+    row_tile = calc_tile_row((top[:-1] + top[1:]) / 2, zoom)
+    row_area = np.abs(np.diff(calc_area_from_equator(top))) * abs(affine.a) / 360
+
+    west = affine.c + affine.a * (np.arange(number_of_columns) + 0.5)
+    column_tile = calc_tile_column(west, zoom)
+
+    #tiles are counted in a dense local window of the raster's extent
+    first_row, first_column = row_tile.min(), column_tile.min()
+    window_columns = column_tile.max() - first_column + 1
+    number_of_tiles = (row_tile.max() - first_row + 1) * window_columns
+
+    local_column = column_tile - first_column
+
+    population = np.zeros(number_of_tiles)
+    area = np.zeros(number_of_tiles)
+    pixels = np.zeros(number_of_tiles, dtype=np.int64)
+
+    for start in range(0, number_of_rows, block_rows):
+        stop = min(start + block_rows, number_of_rows)
+        values = np.asarray(array[start:stop])
+
+        include = np.isfinite(values)
+        if nodata is not None:
+            include &= values != nodata
+        if mask is not None:
+            include &= np.asarray(mask[start:stop], dtype=bool)
+
+        rows, columns = np.nonzero(include)
+        tile = (row_tile[start + rows] - first_row) * window_columns + \
+            local_column[columns]
+
+        population += np.bincount(tile, weights=np.maximum(values[rows, columns], 0),
+            minlength=number_of_tiles)
+        area += np.bincount(tile, weights=row_area[start + rows],
+            minlength=number_of_tiles)
+        pixels += np.bincount(tile, minlength=number_of_tiles)
+
+    covered = np.flatnonzero(pixels)
+    tile_row = first_row + covered // window_columns
+    tile_column = first_column + covered % window_columns
+
+    latitude = (calc_tile_latitude(tile_row, zoom) +
+        calc_tile_latitude(tile_row + 1, zoom)) / 2
+
+    return {
+        'quadkey': encode_quadkeys(tile_column, tile_row),
+        'population': population[covered],
+        'area_km2': area[covered],
+        'latitude': latitude,
+    }
+
+
+def coarsen_grid(grid, zoom, parent_zoom):
+    """
+    Sum a quadkey grid into the tiles of a coarser zoom level.
+
+    Parameters
+    ----------
+    grid : dict
+        Grid as returned by `aggregate_raster_to_quadkeys`.
+    zoom : int
+        Zoom level of the grid.
+    parent_zoom : int
+        Zoom level of the coarser grid.
+
+    Returns
+    -------
+    grid : dict
+        Grid with the same fields at `parent_zoom`.
+
+    """
+    parent, index = np.unique(calc_parent_quadkeys(grid['quadkey'], zoom,
+        parent_zoom), return_inverse=True)
+    index = index.ravel()
+
+    _, row = decode_quadkeys(parent)
+
+    return {
+        'quadkey': parent,
+        'population': np.bincount(index, weights=grid['population'],
+            minlength=len(parent)),
+        'area_km2': np.bincount(index, weights=grid['area_km2'],
+            minlength=len(parent)),
+        'latitude': (calc_tile_latitude(row, parent_zoom) +
+            calc_tile_latitude(row + 1, parent_zoom)) / 2,
+    }
+
+
+def get_pyramid_filename(filename, resolution_km):
+    """
+    Name a file derived from a pyramid level of the population raster.
+
+    Parameters
+    ----------
+    filename : string
+        Name of the file at 1 km resolution, which is kept as it is.
+    resolution_km : int
+        Resolution in km, one of `PYRAMID_RESOLUTIONS_KM`.
+
+    Returns
+    -------
+    filename : string
+        Name suffixed with the resolution, such as 'settlements_5km.tif'.
+
+    """
+    if resolution_km not in PYRAMID_RESOLUTIONS_KM:
+        raise ValueError('Resolution must be one of {} km, got {}'.format(
+            PYRAMID_RESOLUTIONS_KM, resolution_km))
+
+    if resolution_km == 1:
+        return filename
+
+    name, extension = os.path.splitext(filename)
+
+    return '{}_{}km{}'.format(name, resolution_km, extension)
+
+
+def aggregate_blocks(array, factor):
+    """
+    Sum a population raster over square blocks of pixels.
+
+    Negative and missing values count as zero, and edges which do not fill
+    a whole block are padded with zeros, so the total population is
+    preserved.
+
+    Parameters
+    ----------
+    array : numpy.ndarray
+        Two dimensional array of pixel populations.
+    factor : int
+        Block side in pixels.
+
+    Returns
+    -------
+    aggregated : numpy.ndarray
+        Population of each block.
+
+    """
+    rows = -(-array.shape[0] // factor)
+    cols = -(-array.shape[1] // factor)
+
+    padded = np.zeros((rows * factor, cols * factor), dtype=np.float64)
+    padded[:array.shape[0], :array.shape[1]] = array
+    padded[~(padded > 0)] = 0
+
+    return padded.reshape(rows, factor, cols, factor).sum(axis=(1, 3))
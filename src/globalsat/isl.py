@@ -0,0 +1,462 @@
+"""
+Globalsat inter-satellite link network.
+
+Builds the +Grid topology of a Walker constellation, where each satellite
+links to its two neighbours in the same plane and the satellites in the
+same slot of the two adjacent planes. Each time step is a sparse graph of
+satellites and gateways weighted by propagation delay, and latency from
+every satellite to its nearest gateway comes from one multi-source
+Dijkstra search.
+
+Routes are cached by the inter-satellite link topology and the gateways,
+as gateway links come and go with elevation at almost every step. While
+the inter-satellite links are unchanged, latency is re-evaluated along
+the cached shortest path tree with the current link lengths, treating
+tree links which no longer exist as broken. If any link then offers a
+shorter path, the tree is repaired by relaxing links from these latencies
+instead of searching again from scratch.
+
+"""
+import numpy as np
+from collections import OrderedDict
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from globalsat.visibility import calc_ground_positions, find_visible_satellites
+
+SPEED_OF_LIGHT_KM_S = 299792.458
+
+
+def build_grid_edges(elements):
+    """
+    Build the +Grid inter-satellite links of a Walker constellation.
+
+    Parameters
+    ----------
+    elements : dict
+        Orbital elements as returned by
+        `globalsat.orbits.generate_walker_constellation`.
+
+    Returns
+    -------
+    edges : numpy.ndarray
+        Array of shape (links, 2) of satellite indices, with each link
+        listed once.
+    cross_plane : numpy.ndarray
+        Whether each link joins satellites in adjacent planes.
+
+    """
+    plane, slot = elements['plane'], elements['slot']
+    number_of_planes = plane.max() + 1
+    satellites_per_plane = slot.max() + 1
+
+    index = plane * satellites_per_plane + slot
+    next_in_plane = plane * satellites_per_plane + (slot + 1) % satellites_per_plane
+    next_plane = ((plane + 1) % number_of_planes) * satellites_per_plane + slot
+
+    edges = np.concatenate([
+        np.stack([index, next_in_plane], axis=1),
+        np.stack([index, next_plane], axis=1),
+    ])
+    cross_plane = np.repeat([False, True], len(index))
+
+    #small shells would otherwise list the same link twice or link to itself
+    edges, first = np.unique(np.sort(edges, axis=1), axis=0, return_index=True)
+    cross_plane = cross_plane[first]
+    distinct = edges[:, 0] != edges[:, 1]
+
+    return edges[distinct], cross_plane[distinct]
+
+
+def build_snapshot_graph(satellite_positions, edges, cross_plane,
+    gateway_positions, min_elevation_deg, max_latitude_deg=None):
+    """
+    Build the network graph of satellites and gateways at one time step.
+
+    Nodes are the satellites followed by the gateways. Gateways link to
+    every satellite above their elevation mask.
+
+    Parameters
+    ----------
+    satellite_positions : numpy.ndarray
+        Array of shape (satellites, 3) of ECEF coordinates in km.
+    edges : numpy.ndarray
+        Inter-satellite links as returned by `build_grid_edges`.
+    cross_plane : numpy.ndarray
+        Whether each link joins adjacent planes, from `build_grid_edges`.
+    gateway_positions : numpy.ndarray
+        Array of shape (gateways, 3) of ECEF coordinates in km.
+    min_elevation_deg : float
+        Minimum elevation angle of a gateway antenna in degrees.
+    max_latitude_deg : float
+        If given, links between planes are switched off when either
+        satellite is beyond this latitude.
+
+    Returns
+    -------
+    graph : scipy.sparse.csr_matrix
+        Symmetric adjacency matrix weighted by propagation delay in seconds.
+
+    """
+    satellite_positions = np.asarray(satellite_positions, dtype=float)
+    number_of_satellites = len(satellite_positions)
+    number_of_nodes = number_of_satellites + len(gateway_positions)
+
+    source, target = edges[:, 0], edges[:, 1]
+
+    if max_latitude_deg is not None:
+        sin_latitude = np.abs(satellite_positions[:, 2] /
+            np.linalg.norm(satellite_positions, axis=1))
+        polar = sin_latitude > np.sin(np.radians(max_latitude_deg))
+        active = ~(cross_plane & (polar[source] | polar[target]))
+        source, target = source[active], target[active]
+
+    delay = np.linalg.norm(satellite_positions[source] -
+        satellite_positions[target], axis=1) / SPEED_OF_LIGHT_KM_S
+
+    visibility = find_visible_satellites(gateway_positions, satellite_positions,
+        min_elevation_deg)
+
+    source = np.concatenate([source, number_of_satellites + visibility['cell']])
+    target = np.concatenate([target, visibility['satellite']])
+    delay = np.concatenate([delay, visibility['slant_range'] / SPEED_OF_LIGHT_KM_S])
+
+    graph = csr_matrix(
+        (np.concatenate([delay, delay]),
+        (np.concatenate([source, target]), np.concatenate([target, source]))),
+        shape=(number_of_nodes, number_of_nodes))
+    graph.sort_indices()
+
+    return graph
+
+
+def is_shortest_path_latency(graph, latency, rtol=1e-9):
+    """
+    Check that no link offers a shorter path than the given latencies.
+
+    Latencies summed along a tree are lengths of real paths, so they are
+    shortest path lengths exactly when latency[u] <= latency[v] + w(u, v)
+    holds for every link (u, v).
+
+    Parameters
+    ----------
+    graph : scipy.sparse.csr_matrix
+        Adjacency matrix weighted by delay.
+    latency : numpy.ndarray
+        Latency of each node in seconds, infinite where unreachable.
+    rtol : float
+        Relative tolerance for rounding in the summed delays.
+
+    """
+    edges = graph.tocoo()
+
+    through_neighbour = latency[edges.col] + edges.data
+
+    with np.errstate(invalid='ignore'):
+        shorter = latency[edges.row] > through_neighbour * (1 + rtol)
+
+    return not shorter.any()
+
+
+def calc_tree_latency(graph, predecessors):
+    """
+    Calculate the latency from each node to the root of its shortest path
+    tree, using the current link delays of the graph.
+
+    Sums along the tree are found by pointer jumping, which takes a number
+    of array passes logarithmic in the depth of the tree.
+
+    Parameters
+    ----------
+    graph : scipy.sparse.csr_matrix
+        Adjacency matrix weighted by delay. Tree links missing from the
+        graph are treated as infinitely long.
+    predecessors : numpy.ndarray
+        Parent of each node, the node itself for roots and negative where
+        unreachable.
+
+    Returns
+    -------
+    latency : numpy.ndarray
+        Latency of each node in seconds, infinite where unreachable or
+        below a missing link.
+
+    """
+    nodes = np.arange(len(predecessors))
+    has_parent = (predecessors >= 0) & (predecessors != nodes)
+
+    latency = np.zeros(len(predecessors))
+    delay = np.asarray(graph[predecessors[has_parent], nodes[has_parent]]).ravel()
+    #delays are positive, so a zero is a link which is not in the graph
+    latency[has_parent] = np.where(delay > 0, delay, np.inf)
+
+    ancestor = np.where(has_parent, predecessors, nodes)
+    while (ancestor != ancestor[ancestor]).any():
+        latency = latency + latency[ancestor]
+        ancestor = ancestor[ancestor]
+
+    return latency
+
+
+def repair_latency(graph, latency, gateway_nodes, max_passes=64, rtol=1e-12):
+    """
+    Improve latencies to the nearest gateway by relaxing every link until
+    no link offers a shorter path.
+
+    Starting latencies must be lengths of real paths or infinite, such as
+    those of an earlier shortest path tree, and each pass relaxes all links
+    at once. Nodes whose routes did not change settle immediately, so the
+    number of passes follows the depth of the changed part of the tree.
+
+    Parameters
+    ----------
+    graph : scipy.sparse.csr_matrix
+        Adjacency matrix weighted by delay.
+    latency : numpy.ndarray
+        Starting latency of each node in seconds.
+    gateway_nodes : numpy.ndarray
+        Node indices of the gateways.
+    max_passes : int
+        Number of passes after which the repair gives up.
+    rtol : float
+        Relative improvement below which a latency is considered settled.
+
+    Returns
+    -------
+    latency : numpy.ndarray
+        Shortest latency of each node, or None if the repair did not settle
+        within `max_passes`.
+    predecessors : numpy.ndarray
+        Next node towards the nearest gateway, the node itself for gateways
+        and -1 where no gateway can be reached.
+
+    """
+    number_of_nodes = graph.shape[0]
+    rows = np.repeat(np.arange(number_of_nodes), np.diff(graph.indptr))
+    starts = graph.indptr[:-1][np.diff(graph.indptr) > 0]
+    linked = np.diff(graph.indptr) > 0
+
+    latency = np.array(latency, dtype=float)
+    latency[gateway_nodes] = 0
+
+    for _ in range(max_passes):
+        through_neighbour = latency[graph.indices] + graph.data
+        best = np.full(number_of_nodes, np.inf)
+        best[linked] = np.minimum.reduceat(through_neighbour, starts)
+
+        improved = best < latency * (1 - rtol)
+        if not improved.any():
+            break
+        latency[improved] = best[improved]
+    else:
+        return None, None
+
+    #each node points to a neighbour on one of its shortest paths
+    through_neighbour = latency[graph.indices] + graph.data
+    on_path = through_neighbour <= latency[rows] * (1 + 1e-9)
+    first = np.where(on_path, np.arange(len(rows)), len(rows))
+    choice = np.full(number_of_nodes, len(rows))
+    choice[linked] = np.minimum.reduceat(first, starts)
+
+    predecessors = np.full(number_of_nodes, -1)
+    reachable = (choice < len(rows)) & np.isfinite(latency)
+    predecessors[reachable] = graph.indices[choice[reachable]]
+    predecessors[gateway_nodes] = gateway_nodes
+
+    return latency, predecessors
+
+
+class IslRouter:
+    """
+    Shortest paths to the nearest gateway, cached by network topology.
+
+    Parameters
+    ----------
+    max_cached_topologies : int
+        Number of distinct topologies kept in the cache.
+    max_repair_passes : int
+        Number of relaxation passes tried before searching from scratch.
+
+    """
+    def __init__(self, max_cached_topologies=64, max_repair_passes=64):
+        self.max_cached_topologies = max_cached_topologies
+        self.max_repair_passes = max_repair_passes
+        self.routes = OrderedDict()
+        self.searches = 0
+        self.reuses = 0
+        self.repairs = 0
+
+
+    def _topology_key(self, graph, gateway_nodes):
+        """
+        Describe the inter-satellite links and gateways of a graph, leaving
+        out gateway links.
+
+        """
+        is_gateway = np.zeros(graph.shape[0], dtype=bool)
+        is_gateway[gateway_nodes] = True
+
+        rows = np.repeat(np.arange(graph.shape[0]), np.diff(graph.indptr))
+        satellite_link = ~(is_gateway[rows] | is_gateway[graph.indices])
+
+        return (graph.shape, gateway_nodes.tobytes(),
+            rows[satellite_link].tobytes(),
+            graph.indices[satellite_link].tobytes())
+
+
+    def _store(self, key, predecessors):
+        """
+        Cache the shortest path tree of a topology.
+
+        """
+        self.routes[key] = predecessors
+        self.routes.move_to_end(key)
+
+        if len(self.routes) > self.max_cached_topologies:
+            self.routes.popitem(last=False)
+
+
+    def calc_latency_to_gateway(self, graph, gateway_nodes):
+        """
+        Calculate the latency from every node to its nearest gateway.
+
+        A cached tree for the same inter-satellite links is re-evaluated
+        first and kept if it is still a shortest path tree. Otherwise it is
+        repaired from its latencies, and a new search is only run if the
+        repair does not settle.
+
+        Parameters
+        ----------
+        graph : scipy.sparse.csr_matrix
+            Snapshot graph as returned by `build_snapshot_graph`.
+        gateway_nodes : numpy.ndarray
+            Node indices of the gateways.
+
+        Returns
+        -------
+        latency : numpy.ndarray
+            Latency of each node in seconds, infinite where no gateway can
+            be reached.
+
+        """
+        gateway_nodes = np.asarray(gateway_nodes)
+        key = self._topology_key(graph, gateway_nodes)
+
+        if key in self.routes:
+            self.routes.move_to_end(key)
+            unreachable = self.routes[key] < 0
+            latency = calc_tree_latency(graph, self.routes[key])
+            latency[unreachable] = np.inf
+            latency[gateway_nodes] = 0
+
+            if is_shortest_path_latency(graph, latency):
+                self.reuses += 1
+                return latency
+
+            latency, predecessors = repair_latency(graph, latency,
+                gateway_nodes, self.max_repair_passes)
+
+            if latency is not None:
+                self.repairs += 1
+                self._store(key, predecessors)
+                return latency
+
+        latency, predecessors, _ = dijkstra(graph, indices=gateway_nodes,
+            min_only=True, return_predecessors=True)
+        self.searches += 1
+
+        #roots keep their own index, so they are not marked unreachable
+        predecessors[gateway_nodes] = gateway_nodes
+        predecessors[np.isinf(latency)] = -1
+        self._store(key, predecessors)
+
+        return latency
+
+
+def calc_region_latency(region_positions, satellite_positions,
+    satellite_latency, min_elevation_deg):
+    """
+    Calculate the latency from each region to its nearest gateway, through
+    the best visible satellite.
+
+    Parameters
+    ----------
+    region_positions : numpy.ndarray
+        Array of shape (regions, 3) of ECEF coordinates in km.
+    satellite_positions : numpy.ndarray
+        Array of shape (satellites, 3) of ECEF coordinates in km.
+    satellite_latency : numpy.ndarray
+        Latency from each satellite to its nearest gateway in seconds.
+    min_elevation_deg : float
+        Minimum elevation angle of a user terminal in degrees.
+
+    Returns
+    -------
+    latency : numpy.ndarray
+        Latency of each region in seconds, infinite where no route exists.
+
+    """
+    visibility = find_visible_satellites(region_positions, satellite_positions,
+        min_elevation_deg)
+
+    latency = np.full(len(region_positions), np.inf)
+    np.minimum.at(latency, visibility['cell'],
+        visibility['slant_range'] / SPEED_OF_LIGHT_KM_S +
+        satellite_latency[visibility['satellite']])
+
+    return latency
+
+
+def calc_latency_distribution(elements, positions, region_latitude,
+    region_longitude, gateway_latitude, gateway_longitude, min_elevation_deg,
+    max_latitude_deg=None, router=None):
+    """
+    Calculate region to gateway latency at every time step.
+
+    Parameters
+    ----------
+    elements : dict
+        Orbital elements of the constellation.
+    positions : numpy.ndarray
+        Array of shape (times, satellites, 3) of satellite ECEF coordinates
+        in km, such as returned by `globalsat.orbits.propagate_to_memmap`.
+    region_latitude, region_longitude : array_like
+        Region coordinates in degrees.
+    gateway_latitude, gateway_longitude : array_like
+        Gateway coordinates in degrees.
+    min_elevation_deg : float
+        Minimum elevation angle of user terminals and gateways in degrees.
+    max_latitude_deg : float
+        Latitude beyond which links between planes are switched off.
+    router : IslRouter
+        Router holding cached routes. A new one is used if not given.
+
+    Returns
+    -------
+    latency : numpy.ndarray
+        Array of shape (times, regions) of one-way latency in seconds.
+
+    """
+    router = router if router is not None else IslRouter()
+
+    edges, cross_plane = build_grid_edges(elements)
+    region_positions = calc_ground_positions(region_latitude, region_longitude)
+    gateway_positions = calc_ground_positions(gateway_latitude, gateway_longitude)
+
+    number_of_satellites = positions.shape[1]
+    gateway_nodes = number_of_satellites + np.arange(len(gateway_positions))
+
+    latency = np.empty((len(positions), len(region_positions)))
+
+    for t in range(len(positions)):
+        satellite_positions = np.asarray(positions[t], dtype=float)
+
+        graph = build_snapshot_graph(satellite_positions, edges, cross_plane,
+            gateway_positions, min_elevation_deg, max_latitude_deg)
+
+        node_latency = router.calc_latency_to_gateway(graph, gateway_nodes)
+
+        latency[t] = calc_region_latency(region_positions, satellite_positions,
+            node_latency[:number_of_satellites], min_elevation_deg)
+
+    return latency
@@ -0,0 +1,177 @@
+"""
+Globalsat orbit propagation.
+
+Generates Walker-delta constellations and computes satellite positions
+for all satellites and time steps as arrays. Long simulations are
+processed in time chunks and written to a memory-mapped file.
+
+"""
+import numpy as np
+
+from globalsat.geometry import EARTH_RADIUS_EQUATOR_KM
+
+EARTH_MU = 398600.4418 #Earth's gravitational parameter in km^3/s^2
+EARTH_ROTATION_RATE = 7.2921159e-5 #Earth's rotation rate in rad/s
+EARTH_J2 = 1.08262668e-3 #Earth's second zonal harmonic
+
+
+def generate_walker_constellation(number_of_planes, satellites_per_plane, phasing,
+    inclination_deg, altitude_km):
+    """
+    Generate the orbital elements of a Walker-delta constellation i:t/p/f.
+
+    Parameters
+    ----------
+    number_of_planes : int
+        Number of equally spaced orbital planes (p).
+    satellites_per_plane : int
+        Number of equally spaced satellites in each plane (t / p).
+    phasing : int
+        Relative phasing between adjacent planes (f), from 0 to p - 1.
+    inclination_deg : float
+        Orbital inclination in degrees (i).
+    altitude_km : float
+        Altitude of the circular orbits in km.
+
+    Returns
+    -------
+    elements : dict
+        Contains an array with one value per satellite for 'plane', 'slot',
+        'raan' (rad), 'mean_anomaly' (rad, at time zero), 'inclination'
+        (rad), 'semi_major_axis' (km) and 'mean_motion' (rad/s).
+
+    """
+    total_satellites = number_of_planes * satellites_per_plane
+
+    plane, slot = np.divmod(np.arange(total_satellites), satellites_per_plane)
+
+    semi_major_axis = EARTH_RADIUS_EQUATOR_KM + altitude_km
+
+    elements = {
+        'plane': plane,
+        'slot': slot,
+        'raan': 2 * np.pi * plane / number_of_planes,
+        'mean_anomaly': 2 * np.pi * (slot / satellites_per_plane +
+            phasing * plane / total_satellites),
+        'inclination': np.full(total_satellites, np.radians(inclination_deg)),
+        'semi_major_axis': np.full(total_satellites, float(semi_major_axis)),
+        'mean_motion': np.full(total_satellites,
+            np.sqrt(EARTH_MU / semi_major_axis**3)),
+    }
+
+    return elements
+
+
+def calc_ecef_positions(elements, times, gmst_at_epoch=0):
+    """
+    Calculate Earth-fixed positions of satellites in circular orbits.
+
+    Parameters
+    ----------
+    elements : dict
+        Orbital elements as returned by `generate_walker_constellation`.
+    times : array_like
+        Seconds since the epoch of the elements.
+    gmst_at_epoch : float
+        Greenwich sidereal angle at the epoch in radians.
+
+    Returns
+    -------
+    positions : numpy.ndarray
+        Array of shape (times, satellites, 3) of ECEF coordinates in km.
+
+    """
+    times = np.asarray(times, dtype=float)[:, np.newaxis]
+
+    argument_of_latitude = elements['mean_anomaly'] + elements['mean_motion'] * times
+
+    #rotating the node by the Earth's rotation gives Earth-fixed coordinates
+    node = elements['raan'] - (gmst_at_epoch + EARTH_ROTATION_RATE * times)
+
+    return orbital_to_ecef(elements['semi_major_axis'], argument_of_latitude,
+        node, elements['inclination'])
+
+
+def orbital_to_ecef(radius, argument_of_latitude, node, inclination):
+    """
+    Convert positions within orbital planes to Cartesian coordinates.
+
+    Parameters
+    ----------
+    radius : numpy.ndarray
+        Distance from the centre of the Earth in km.
+    argument_of_latitude : numpy.ndarray
+        Angle from the ascending node within the orbital plane in radians.
+    node : numpy.ndarray
+        Longitude of the ascending node in the output frame in radians.
+    inclination : numpy.ndarray
+        Orbital inclination in radians.
+
+    Returns
+    -------
+    positions : numpy.ndarray
+        Array with a trailing axis of length 3 holding x, y and z in km.
+
+    """
+    cos_u, sin_u = np.cos(argument_of_latitude), np.sin(argument_of_latitude)
+    cos_node, sin_node = np.cos(node), np.sin(node)
+    cos_i, sin_i = np.cos(inclination), np.sin(inclination)
+
+    positions = np.stack([
+        radius * (cos_node * cos_u - sin_node * sin_u * cos_i),
+        radius * (sin_node * cos_u + cos_node * sin_u * cos_i),
+        radius * (sin_u * sin_i) * np.ones_like(cos_node),
+    ], axis=-1)
+
+    return positions
+
+
+def propagate_to_memmap(elements, duration, step, path, gmst_at_epoch=0,
+    max_chunk_bytes=2**26, dtype=np.float32):
+    """
+    Propagate a constellation over a time grid into a memory-mapped array.
+
+    Time steps are computed in chunks of at most `max_chunk_bytes` of working
+    memory, so the full output never needs to fit in memory.
+
+    Parameters
+    ----------
+    elements : dict
+        Orbital elements as returned by `generate_walker_constellation`.
+    duration : float
+        Simulated period in seconds.
+    step : float
+        Time step in seconds.
+    path : string
+        Path of the .npy file to write.
+    gmst_at_epoch : float
+        Greenwich sidereal angle at the epoch in radians.
+    max_chunk_bytes : int
+        Maximum size of each chunk of positions computed in memory.
+    dtype : numpy.dtype
+        Data type of the stored coordinates.
+
+    Returns
+    -------
+    positions : numpy.memmap
+        Array of shape (times, satellites, 3) of ECEF coordinates in km,
+        opened read-only.
+
+    """
+    times = np.arange(0, duration + step / 2, step)
+    number_of_satellites = len(elements['raan'])
+
+    chunk_size = max(1, max_chunk_bytes // (number_of_satellites * 3 * 8))
+
+    positions = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+        shape=(len(times), number_of_satellites, 3))
+
+    for start in range(0, len(times), chunk_size):
+        chunk = times[start:start + chunk_size]
+        positions[start:start + len(chunk)] = calc_ecef_positions(
+            elements, chunk, gmst_at_epoch)
+
+    positions.flush()
+    del positions
+
+    return np.load(path, mmap_mode='r')
@@ -0,0 +1,129 @@
+"""
+Variance-based global sensitivity analysis for Globalsat.
+
+Implements Saltelli sampling and Sobol first-order and total-effect
+indices with bootstrap confidence intervals.
+
+"""
+import numpy as np
+from statistics import NormalDist
+
+
+def generate_saltelli_samples(means, stds, n, seed_value=None):
+    """
+    Generate a Saltelli sample design for normally distributed inputs.
+
+    Two independent base matrices A and B are drawn, and for each input
+    i a matrix AB_i is formed by taking A with column i replaced by the
+    corresponding column of B.
+
+    Parameters
+    ----------
+    means : array_like
+        Mean of each of the d inputs.
+    stds : array_like
+        Standard deviation of each of the d inputs.
+    n : int
+        Number of base samples.
+    seed_value : int
+        Starting point for pseudo-random number generator.
+
+    Returns
+    -------
+    samples : numpy.ndarray
+        Array of shape (n * (d + 2), d), ordered as A, B, AB_1 ... AB_d.
+
+    """
+    means = np.asarray(means, dtype=float)
+    stds = np.asarray(stds, dtype=float)
+    d = means.size
+
+    rng = np.random.default_rng(seed_value)
+    base = means + stds * rng.standard_normal((2, n, d))
+    a, b = base[0], base[1]
+
+    ab = np.repeat(a[np.newaxis], d, axis=0)
+    columns = np.arange(d)
+    ab[columns, :, columns] = b[:, columns].T
+
+    samples = np.concatenate([a, b, ab.reshape(d * n, d)])
+
+    return samples
+
+
+def calc_sobol_indices(y, n, d, num_resamples=100, conf_level=0.95,
+    seed_value=None):
+    """
+    Estimate Sobol first-order and total-effect indices.
+
+    First-order indices use the Saltelli (2010) estimator and total-effect
+    indices the Jansen (1999) estimator. Confidence intervals are found by
+    bootstrapping the base samples.
+
+    Parameters
+    ----------
+    y : array_like
+        Model outputs for a design from `generate_saltelli_samples`.
+    n : int
+        Number of base samples.
+    d : int
+        Number of inputs.
+    num_resamples : int
+        Number of bootstrap resamples.
+    conf_level : float
+        Confidence level of the reported intervals.
+    seed_value : int
+        Starting point for pseudo-random number generator.
+
+    Returns
+    -------
+    indices : dict
+        Contains 'S1', 'S1_conf', 'ST' and 'ST_conf' arrays of length d.
+        Indices are NaN if the output has no variance.
+
+    """
+    y = np.asarray(y, dtype=float)
+
+    if y.size != n * (d + 2):
+        raise ValueError('Expected {} outputs, got {}'.format(n * (d + 2), y.size))
+
+    #centring leaves the indices unchanged but reduces estimator variance
+    y = y - y.mean()
+
+    y_a = y[:n]
+    y_b = y[n:2 * n]
+    y_ab = y[2 * n:].reshape(d, n).T
+
+    s1, st = _sobol_estimators(y_a, y_b, y_ab)
+
+    rng = np.random.default_rng(seed_value)
+    r = rng.integers(0, n, (num_resamples, n))
+    s1_boot, st_boot = _sobol_estimators(y_a[r], y_b[r], y_ab[r])
+
+    z = NormalDist().inv_cdf(0.5 + conf_level / 2)
+
+    indices = {
+        'S1': s1,
+        'S1_conf': z * s1_boot.std(axis=0, ddof=1),
+        'ST': st,
+        'ST_conf': z * st_boot.std(axis=0, ddof=1),
+    }
+
+    return indices
+
+
+def _sobol_estimators(y_a, y_b, y_ab):
+    """
+    Apply the first-order and total-effect estimators along the sample axis.
+
+    `y_a` and `y_b` have shape (..., n) and `y_ab` has shape (..., n, d).
+
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.concatenate([y_a, y_b], axis=-1).var(axis=-1)[..., np.newaxis]
+
+        diff = y_a[..., np.newaxis] - y_ab
+        s1 = (y_b[..., np.newaxis] * -diff).mean(axis=-2) / variance
+        st = 0.5 * (diff**2).mean(axis=-2) / variance
+
+    return s1, st
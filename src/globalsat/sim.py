@@ -11,6 +11,17 @@ import numpy as np
 from itertools import tee
 from collections import OrderedDict
 
+from globalsat.emissions import FUELS, calc_emissions, emissions_to_dict
+
+#Launch vehicle of each constellation, and the calc_per_sat_emission
+#argument (0 for fuel_mass, 1 to 3 for fuel_mass_1 to fuel_mass_3) holding
+#the mass of each fuel type it burns.
+CONSTELLATION_VEHICLES = {
+    'Starlink': ('falcon_9', {'kerosene': 0}),
+    'Kuiper': ('ariane', {'hypergolic': 1, 'solid': 2, 'cryogenic': 3}),
+    'OneWeb': ('soyuz_fg', {'hypergolic': 1, 'kerosene': 2}),
+}
+
 
 def system_capacity(constellation, number_of_satellites, params, lut):
     """
@@ -47,61 +58,110 @@ def system_capacity(constellation, number_of_satellites, params, lut):
             params['iterations']
         )
 
+    link_budget = calc_link_budget(distance, params, random_variations, lut)
+
     for i in range(0, params['iterations']):
 
-        path_loss, random_variation = calc_free_space_path_loss(
-            distance, params, i, random_variations
-        )
+        results.append({
+            'constellation': constellation,
+            'number_of_satellites': number_of_satellites,
+            'distance': distance,
+            'satellite_coverage_area': satellite_coverage_area_km,
+            'iteration': i,
+            'path_loss': link_budget['path_loss'][i],
+            'random_variation': link_budget['random_variation'][i],
+            'antenna_gain': link_budget['antenna_gain'],
+            'eirp': link_budget['eirp'],
+            'received_power': link_budget['received_power'][i],
+            'noise': link_budget['noise'],
+            'cnr': link_budget['cnr'][i],
+            'spectral_efficiency': link_budget['spectral_efficiency'][i],
+            'channel_capacity': link_budget['channel_capacity'][i],
+            'aggregate_capacity': link_budget['aggregate_capacity'][i],
+            'capacity_kmsq': link_budget['aggregate_capacity'][i] / satellite_coverage_area_km,
+            'capacity_per_single_satellite': link_budget['capacity_per_single_satellite'][i],
+        })
 
-        antenna_gain = calc_antenna_gain(
-            params['speed_of_light'],
-            params['antenna_diameter'],
-            params['dl_frequency'],
-            params['antenna_efficiency']
-        )
+    return results
 
-        eirp = calc_eirp(params['power'], antenna_gain)
 
-        losses = calc_losses(params['earth_atmospheric_losses'], params['all_other_losses'])
+def calc_link_budget(distance, params, random_variations, lut):
+    """
+    Calculate the link budget and capacity for a batch of samples.
 
-        noise = calc_noise()
+    Every parameter may be a scalar or an array of per-sample values, and
+    all inputs are broadcast against each other. This is the single code
+    path used by both the satellite density sweep and the uncertainty
+    quantification.
 
-        received_power = calc_received_power(eirp, path_loss, params['receiver_gain'], losses)
+    Parameters
+    ----------
+    distance : float or numpy.ndarray
+        Distance between transmitter and receiver in km.
+    params : dict
+        Contains all simulation parameters.
+    random_variations : numpy.ndarray
+        Stochastic path loss component of each sample in dB.
+    lut : list of tuples
+        Lookup table for CNR to spectral efficiency.
 
-        cnr = calc_cnr(received_power, noise)
+    Returns
+    -------
+    link_budget : dict
+        Contains the link budget metrics, with an array of per-sample values
+        for every metric which depends on the sampled inputs.
 
-        spectral_efficiency = calc_spectral_efficiency(cnr, lut)
+    """
+    random_variations = np.asarray(random_variations, dtype=float)
 
-        channel_capacity = calc_capacity(spectral_efficiency, params['dl_bandwidth'])
+    path_loss, random_variation = calc_free_space_path_loss(
+        distance, params, np.arange(random_variations.size), random_variations
+    )
 
-        agg_capacity = calc_agg_capacity(channel_capacity, params['number_of_channels'],
-                       params['polarization'])
+    antenna_gain = calc_antenna_gain(
+        params['speed_of_light'],
+        params['antenna_diameter'],
+        params['dl_frequency'],
+        params['antenna_efficiency']
+    )
 
-        sat_capacity = single_satellite_capacity(params['dl_bandwidth'],
-                       spectral_efficiency, params['number_of_channels'],
-                       params['polarization'])
+    eirp = calc_eirp(params['power'], antenna_gain)
 
-        results.append({
-            'constellation': constellation,
-            'number_of_satellites': number_of_satellites,
-            'distance': distance,
-            'satellite_coverage_area': satellite_coverage_area_km,
-            'iteration': i,
-            'path_loss': path_loss,
-            'random_variation': random_variation,
-            'antenna_gain': antenna_gain,
-            'eirp': eirp,
-            'received_power': received_power,
-            'noise': noise,
-            'cnr': cnr,
-            'spectral_efficiency': spectral_efficiency,
-            'channel_capacity': channel_capacity,
-            'aggregate_capacity': agg_capacity,
-            'capacity_kmsq': agg_capacity / satellite_coverage_area_km,
-            'capacity_per_single_satellite': sat_capacity,
-        })
+    losses = calc_losses(params['earth_atmospheric_losses'], params['all_other_losses'])
 
-    return results
+    noise = calc_noise()
+
+    received_power = calc_received_power(eirp, path_loss, params['receiver_gain'], losses)
+
+    cnr = calc_cnr(received_power, noise)
+
+    spectral_efficiency = calc_spectral_efficiency_batch(cnr, lut)
+
+    channel_capacity = calc_capacity(spectral_efficiency, params['dl_bandwidth'])
+
+    agg_capacity = calc_agg_capacity(channel_capacity, params['number_of_channels'],
+                   params['polarization'])
+
+    sat_capacity = single_satellite_capacity(params['dl_bandwidth'],
+                   spectral_efficiency, params['number_of_channels'],
+                   params['polarization'])
+
+    link_budget = {
+        'path_loss': path_loss,
+        'random_variation': random_variation,
+        'antenna_gain': antenna_gain,
+        'eirp': eirp,
+        'losses': losses,
+        'received_power': received_power,
+        'noise': noise,
+        'cnr': cnr,
+        'spectral_efficiency': spectral_efficiency,
+        'channel_capacity': channel_capacity,
+        'aggregate_capacity': agg_capacity,
+        'capacity_per_single_satellite': sat_capacity,
+    }
+
+    return link_budget
 
 
 def calc_geographic_metrics(number_of_satellites, params):
@@ -111,14 +171,14 @@ def calc_geographic_metrics(number_of_satellites, params):
 
     Parameters
     ----------
-    number_of_satellites : int
+    number_of_satellites : int or numpy.ndarray
         Number of satellites in the contellation being simulated.
     params : dict
         Contains all simulation parameters.
 
     Returns
     -------
-    distance : float
+    distance : float or numpy.ndarray
         The distance between the transmitter and reciever in km.
     satellite_coverage_area_km : float
         The area which each satellite covers on Earth's surface in km.
@@ -130,9 +190,9 @@ def calc_geographic_metrics(number_of_satellites, params):
 
     satellite_coverage_area_km = (area_of_earth_covered / number_of_satellites) #/ 1000
 
-    mean_distance_between_assets = math.sqrt((1 / network_density)) / 2
+    mean_distance_between_assets = np.sqrt((1 / network_density)) / 2
 
-    distance = math.sqrt(((mean_distance_between_assets)**2) + ((params['altitude_km'])**2))
+    distance = np.sqrt(((mean_distance_between_assets)**2) + ((params['altitude_km'])**2))
 
     return distance, satellite_coverage_area_km
 
@@ -147,27 +207,27 @@ def calc_free_space_path_loss(distance, params, i, random_variations):
 
     Parameters
     ----------
-    distance : float
-        Distance between transmitter and receiver in metres.
+    distance : float or numpy.ndarray
+        Distance between transmitter and receiver in km.
     params : dict
         Contains all simulation parameters.
-    i : int
-        Iteration number.
+    i : int or numpy.ndarray
+        Iteration number, or an array of iteration numbers.
     random_variation : list
         List of random variation components.
 
     Returns
     -------
-    path_loss : float
+    path_loss : float or numpy.ndarray
         The free space path loss over the given distance.
-    random_variation : float
+    random_variation : float or numpy.ndarray
         Stochastic component.
     """
     frequency_MHz = params['dl_frequency'] / 1e6
 
-    path_loss = 20*math.log10(distance) + 20*math.log10(frequency_MHz) + 32.44
+    path_loss = 20*np.log10(distance) + 20*np.log10(frequency_MHz) + 32.44
 
-    random_variation = random_variations[i]
+    random_variation = np.asarray(random_variations)[i]
 
     return path_loss + random_variation, random_variation
 
@@ -207,14 +267,39 @@ def generate_log_normal_dist_value(frequency, mu, sigma, seed_value, draws):
         frequency_seed_value = seed_value * frequency * 100
         np.random.seed(int(str(frequency_seed_value)[:2]))
 
-    normal_std = np.sqrt(np.log10(1 + (sigma/mu)**2))
-    normal_mean = np.log10(mu) - normal_std**2 / 2
+    normal_mean, normal_std = calc_log_normal_params(mu, sigma)
 
     random_variation  = np.random.lognormal(normal_mean, normal_std, draws)
 
     return random_variation
 
 
+def calc_log_normal_params(mu, sigma):
+    """
+    Find the mean and standard deviation of the normal distribution
+    underlying the lognormal random variation.
+
+    Parameters
+    ----------
+    mu : int
+        Mean of the desired distribution.
+    sigma : int
+        Standard deviation of the desired distribution.
+
+    Returns
+    -------
+    normal_mean : float
+        Mean of the underlying normal distribution.
+    normal_std : float
+        Standard deviation of the underlying normal distribution.
+
+    """
+    normal_std = np.sqrt(np.log10(1 + (sigma/mu)**2))
+    normal_mean = np.log10(mu) - normal_std**2 / 2
+
+    return normal_mean, normal_std
+
+
 def calc_antenna_gain(c, d, f, n):
     """
     Calculates the antenna gain.
@@ -240,7 +325,7 @@ def calc_antenna_gain(c, d, f, n):
     lambda_wavelength = c / f
 
     #Calculate antenna_gain
-    antenna_gain = 10 * (math.log10(n*((np.pi*d) / lambda_wavelength)**2))
+    antenna_gain = 10 * (np.log10(n*((np.pi*d) / lambda_wavelength)**2))
 
     return antenna_gain
 
@@ -426,6 +511,44 @@ def calc_spectral_efficiency(cnr, lut):
             return spectral_efficiency
 
 
+def calc_spectral_efficiency_batch(cnr, lut):
+    """
+    Given an array of cnr values, find the spectral efficiency of each.
+
+    Gives the same result as `calc_spectral_efficiency` for every value.
+
+    Parameters
+    ----------
+    cnr : numpy.ndarray
+        Carrier-to-Noise Ratio (CNR) in dB.
+    lut : list of tuples
+        Lookup table for CNR to spectral efficiency.
+
+    Returns
+    -------
+    spectral_efficiency : numpy.ndarray
+        The number of bits per Hertz able to be transmitted.
+
+    """
+    cnr = np.asarray(cnr, dtype=float)
+    lut_cnr = np.array([value[0] for value in lut])
+    lut_se = np.array([value[1] for value in lut])
+
+    #match the first lut interval which contains each cnr value
+    within = ((cnr[..., np.newaxis] >= lut_cnr[:-1]) &
+              (cnr[..., np.newaxis] < lut_cnr[1:]))
+    spectral_efficiency = lut_se[:-1][np.argmax(within, axis=-1)]
+
+    #calc_spectral_efficiency tests the lut limits after the first interval
+    limits = ~within[..., 0]
+    spectral_efficiency = np.where(limits & (cnr >= lut_cnr[-1]), lut_se[-1],
+        spectral_efficiency)
+    spectral_efficiency = np.where(limits & (cnr < lut_cnr[0]), lut_se[0],
+        spectral_efficiency)
+
+    return spectral_efficiency
+
+
 def calc_capacity(spectral_efficiency, dl_bandwidth):
     """
     Calculate the channel capacity.
@@ -551,20 +674,18 @@ def calc_per_sat_emission(name, fuel_mass, fuel_mass_1, fuel_mass_2, fuel_mass_3
     -------
     al, sul, cb, cfc, pm, phc: dict.
     """
+    if name not in CONSTELLATION_VEHICLES:
+        raise ValueError('Invalid Constellation name: {}'.format(name))
 
-    if name == 'Starlink':
-        emission_dict = falcon_9(fuel_mass)  # Emission per satellite
+    vehicle, fuel_arguments = CONSTELLATION_VEHICLES[name]
 
-    elif name == 'Kuiper':
-        fm_hyp, fm_sod, fm_cry = fuel_mass_1, fuel_mass_2, fuel_mass_3
-        emission_dict = ariane(fm_hyp, fm_sod, fm_cry)
+    fuel_mass_args = (fuel_mass, fuel_mass_1, fuel_mass_2, fuel_mass_3)
 
-    elif name == 'OneWeb':
-        fm_hyp, fm_ker = fuel_mass_1, fuel_mass_2
-        emission_dict = soyuz_fg(fm_hyp, fm_ker)
+    fuel_masses = np.zeros(np.broadcast(*fuel_mass_args).shape + (len(FUELS),))
+    for fuel, argument in fuel_arguments.items():
+        fuel_masses[..., FUELS.index(fuel)] = fuel_mass_args[argument]
 
-    else:
-        print('Invalid Constellation name')
+    emission_dict = emissions_to_dict(calc_emissions(vehicle, fuel_masses))
 
     return emission_dict
 
@@ -586,25 +707,7 @@ def soyuz_fg(hypergolic, kerosene):
         A dict containing all estimated emissions.
 
     """
-    emissions_dict = {}
-
-    emissions_dict['alumina_emission'] = (hypergolic*1*0.001) + (kerosene*1*0.05)
-
-    emissions_dict['sulphur_emission'] = (hypergolic*0.7*0.001) + (kerosene*0.7*0.001)
-
-    emissions_dict['carbon_emission'] = (hypergolic*0.252*1) + (kerosene*0.352*1)
-
-    emissions_dict['cfc_gases'] = (hypergolic*0.016*0.7) + (kerosene*0.016*0.7) \
-                                  + (hypergolic*0.003*0.7) + (kerosene*0.003*0.7) \
-                                  + (hypergolic*0.001*0.7) + (kerosene*0.001*0.7)
-
-    emissions_dict['particulate_matter'] = (hypergolic*0.001*0.22) + (kerosene *0.001*0.22) \
-                                           + (hypergolic*0.001*1) + (kerosene*0.05*1)
-
-    emissions_dict['photo_oxidation'] = (hypergolic*0.378*0.0456) + (kerosene *0.528*0.0456) \
-                                        + (hypergolic*0.001*1) + (kerosene*0.001*1)
-
-    return emissions_dict
+    return _vehicle_emissions('soyuz_fg', hypergolic=hypergolic, kerosene=kerosene)
 
 
 def falcon_9(kerosene):
@@ -622,22 +725,7 @@ def falcon_9(kerosene):
         particulate_matter, photo_oxidation: list.
 
     """
-    emission_dict = {}
-
-    emission_dict['alumina_emission'] = (kerosene*0.05)
-
-    emission_dict['sulphur_emission'] = (kerosene*0.001*0.7)
-
-    emission_dict['carbon_emission'] = (kerosene*0.352*1)
-
-    emission_dict['cfc_gases'] = (kerosene*0.016*0.7) + (kerosene*0.003*0.7) \
-                                 + (kerosene*0.001*0.7)
-
-    emission_dict['particulate_matter'] = (kerosene*0.001*0.22) + (kerosene*0.05*1)
-
-    emission_dict['photo_oxidation'] = (kerosene*0.0456*0.528) + (kerosene*0.001*1)
-
-    return emission_dict
+    return _vehicle_emissions('falcon_9', kerosene=kerosene)
 
 
 def falcon_heavy(kerosene):
@@ -655,22 +743,7 @@ def falcon_heavy(kerosene):
         particulate_matter, photo_oxidation: list.
 
     """
-    emission_dict = {}
-
-    emission_dict['alumina_emission'] = kerosene*0.05
-
-    emission_dict['sulphur_emission'] = (kerosene*0.001*0.7)
-
-    emission_dict['carbon_emission'] = (kerosene*0.352*1)
-
-    emission_dict['cfc_gases'] = (kerosene*0.016*0.7) + (kerosene*0.003*0.7) \
-                                 + (kerosene*0.001*0.7)
-
-    emission_dict['particulate_matter'] = (kerosene*0.001*0.22) + (kerosene*0.05*1)
-
-    emission_dict['photo_oxidation'] = (kerosene*0.0456*0.528) + (kerosene*0.001*1)
-
-    return emission_dict
+    return _vehicle_emissions('falcon_heavy', kerosene=kerosene)
 
 
 def ariane(hypergolic, solid, cryogenic):
@@ -692,27 +765,19 @@ def ariane(hypergolic, solid, cryogenic):
         particulate_matter, photo_oxidation: list.
 
     """
-    emission_dict = {}
-
-    emission_dict['alumina_emission'] = (solid*0.33*1) + (hypergolic*0.001*1)
-
-    emission_dict['sulphur_emission'] = (solid*0.005*0.7) + (cryogenic*0.001*0.7) \
-                                        + (hypergolic*0.001*0.7)+(solid*0.15*0.88)
+    return _vehicle_emissions('ariane', hypergolic=hypergolic, solid=solid,
+        cryogenic=cryogenic)
 
-    emission_dict['carbon_emission'] = (solid*0.108*1) + (hypergolic*0.252)
 
-    emission_dict['cfc_gases'] = (solid*0.08*0.7) + (cryogenic*0.016*0.7) \
-                                 + (hypergolic*0.016*0.7) + (solid*0.015*0.7) \
-                                 + (cryogenic*0.003*0.7) + (hypergolic*0.003*0.7) \
-                                 + (solid*0.005*0.7) + (cryogenic*0.001*0.7) \
-                                 + (hypergolic*0.001*0.7) + (solid*0.15*0.7)
+def _vehicle_emissions(vehicle, **fuel_masses):
+    """
+    Emissions dict for one vehicle given the mass of each fuel type burnt.
 
-    emission_dict['particulate_matter'] = (solid*0.005*0.22) + (cryogenic*0.001*0.22) \
-                                          + (hypergolic*0.001*0.22) + (solid*0.33*1) \
-                                          + (hypergolic*0.001*1)
+    """
+    shape = np.broadcast(*fuel_masses.values()).shape
 
-    emission_dict['photo_oxidation'] = (solid*0.162*0.0456) + (hypergolic*0.378*0.0456) \
-                                       + (solid*0.005*1) + (cryogenic*0.001*1) \
-                                       + (hypergolic*0.001*1)
+    masses = np.zeros(shape + (len(FUELS),))
+    for fuel, mass in fuel_masses.items():
+        masses[..., FUELS.index(fuel)] = mass
 
-    return emission_dict
+    return emissions_to_dict(calc_emissions(vehicle, masses))
@@ -0,0 +1,325 @@
+"""
+Streaming summary statistics for Globalsat.
+
+Online accumulators for simulation outputs which summarize arbitrarily
+many samples in constant memory. Accumulators built in separate workers
+can be merged, giving the same summary as a single pass over all samples.
+
+"""
+import math
+import numpy as np
+
+
+class RunningMoments:
+    """
+    Running count, mean, variance, minimum and maximum.
+
+    Batches are combined with the parallel form of Welford's algorithm
+    (Chan et al., 1979), which is also used to merge accumulators.
+
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+
+    def update(self, values):
+        """
+        Add a batch of values.
+
+        Parameters
+        ----------
+        values : array_like
+            Values to add. NaN values are ignored.
+
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+
+        if values.size == 0:
+            return
+
+        batch_mean = values.mean()
+
+        self._combine(values.size, batch_mean, ((values - batch_mean)**2).sum(),
+            values.min(), values.max())
+
+
+    def merge(self, other):
+        """
+        Merge another accumulator into this one.
+
+        Parameters
+        ----------
+        other : RunningMoments
+            Accumulator built over a different set of values.
+
+        """
+        if other.count == 0:
+            return
+
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+
+        total = self.count + count
+        delta = mean - self.mean
+
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta**2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+
+    def variance(self, ddof=1):
+        """
+        Return the variance, or NaN if fewer than ddof + 1 values were added.
+
+        """
+        if self.count <= ddof:
+            return math.nan
+
+        return self.m2 / (self.count - ddof)
+
+
+    def std(self, ddof=1):
+        """
+        Return the standard deviation.
+
+        """
+        return math.sqrt(self.variance(ddof))
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch.
+
+    Values are counted in logarithmically sized buckets (as in DDSketch,
+    Masson et al., 2019), so any quantile is returned within the given
+    relative accuracy. Bucket counts add, which makes merging exact.
+
+    Parameters
+    ----------
+    relative_accuracy : float
+        Maximum relative error of the returned quantiles.
+
+    """
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.zero_count = 0
+        self.positive = {}
+        self.negative = {}
+
+
+    def update(self, values):
+        """
+        Add a batch of values.
+
+        Parameters
+        ----------
+        values : array_like
+            Values to add. NaN values are ignored.
+
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+
+        self.count += values.size
+        self.zero_count += int((values == 0).sum())
+
+        self._add_buckets(self.positive, values[values > 0])
+        self._add_buckets(self.negative, -values[values < 0])
+
+
+    def _add_buckets(self, store, magnitudes):
+
+        if magnitudes.size == 0:
+            return
+
+        keys, counts = np.unique(
+            np.ceil(np.log(magnitudes) / self.log_gamma).astype(int),
+            return_counts=True
+        )
+
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one.
+
+        Parameters
+        ----------
+        other : QuantileSketch
+            Sketch with the same relative accuracy.
+
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('Cannot merge sketches with different relative accuracy')
+
+        self.count += other.count
+        self.zero_count += other.zero_count
+
+        for store, other_store in [(self.positive, other.positive),
+            (self.negative, other.negative)]:
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+
+
+    def quantile(self, q):
+        """
+        Return the estimated value at quantile q.
+
+        Parameters
+        ----------
+        q : float
+            Quantile between 0 and 1.
+
+        Returns
+        -------
+        value : float
+            Estimated quantile, or NaN if the sketch is empty.
+
+        """
+        if self.count == 0:
+            return math.nan
+
+        rank = q * (self.count - 1)
+        cumulative = 0
+
+        for key in sorted(self.negative, reverse=True):
+            cumulative += self.negative[key]
+            if cumulative > rank:
+                return -self._bucket_value(key)
+
+        cumulative += self.zero_count
+        if cumulative > rank:
+            return 0.0
+
+        for key in sorted(self.positive):
+            cumulative += self.positive[key]
+            if cumulative > rank:
+                return self._bucket_value(key)
+
+        return self._bucket_value(max(self.positive))
+
+
+    def _bucket_value(self, key):
+
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+
+class StreamingSummary:
+    """
+    Moments and quantile sketches for several metrics within groups,
+    such as constellations.
+
+    Parameters
+    ----------
+    metrics : list
+        Names of the metrics to summarize.
+    relative_accuracy : float
+        Relative accuracy of the quantile sketches.
+
+    """
+    def __init__(self, metrics, relative_accuracy=0.01):
+        self.metrics = list(metrics)
+        self.relative_accuracy = relative_accuracy
+        self.accumulators = {}
+
+
+    def update(self, group, data):
+        """
+        Add a batch of results for one group.
+
+        Parameters
+        ----------
+        group : string
+            Group the results belong to.
+        data : dict or pandas.DataFrame
+            Contains an array of values for each metric, or a list of
+            result dicts as returned by `system_capacity`.
+
+        """
+        if isinstance(data, list):
+            data = {metric: [item[metric] for item in data] for metric in self.metrics}
+
+        for metric in self.metrics:
+            moments, sketch = self._get(group, metric)
+            moments.update(data[metric])
+            sketch.update(data[metric])
+
+
+    def merge(self, other):
+        """
+        Merge another summary into this one.
+
+        Parameters
+        ----------
+        other : StreamingSummary
+            Summary built over a different set of results.
+
+        """
+        for (group, metric), (moments, sketch) in other.accumulators.items():
+            own_moments, own_sketch = self._get(group, metric)
+            own_moments.merge(moments)
+            own_sketch.merge(sketch)
+
+
+    def _get(self, group, metric):
+
+        key = (group, metric)
+
+        if key not in self.accumulators:
+            self.accumulators[key] = (
+                RunningMoments(),
+                QuantileSketch(self.relative_accuracy)
+            )
+
+        return self.accumulators[key]
+
+
+    def to_records(self, quantiles=(0.05, 0.5, 0.95)):
+        """
+        Produce the final summaries.
+
+        Parameters
+        ----------
+        quantiles : tuple
+            Quantiles to report.
+
+        Returns
+        -------
+        output : list of dicts
+            One record per group and metric.
+
+        """
+        output = []
+
+        for (group, metric), (moments, sketch) in self.accumulators.items():
+
+            record = {
+                'group': group,
+                'metric': metric,
+                'count': moments.count,
+                'mean': moments.mean,
+                'std': moments.std() if moments.count > 1 else math.nan,
+                'min': moments.min,
+                'max': moments.max,
+            }
+
+            for q in quantiles:
+                record['q{}'.format(round(q * 100))] = sketch.quantile(q)
+
+            output.append(record)
+
+        return output
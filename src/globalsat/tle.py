@@ -0,0 +1,240 @@
+"""
+Globalsat two-line element ingestion.
+
+Parses catalog files of two-line element sets into a structured NumPy
+array, with one row per object, and propagates all objects over a time
+grid at once using two-body motion with secular J2 perturbations. Parsed
+catalogs are cached next to the source file in .npy format.
+
+"""
+import os
+import numpy as np
+
+from globalsat.geometry import EARTH_RADIUS_EQUATOR_KM
+from globalsat.orbits import EARTH_MU, EARTH_J2, orbital_to_ecef
+
+
+TLE_DTYPE = np.dtype([
+    ('name', 'U24'),
+    ('catalog_number', 'i4'),
+    ('epoch', 'datetime64[us]'),
+    ('inclination', 'f8'), #degrees
+    ('raan', 'f8'), #degrees
+    ('eccentricity', 'f8'),
+    ('argument_of_perigee', 'f8'), #degrees
+    ('mean_anomaly', 'f8'), #degrees
+    ('mean_motion', 'f8'), #revolutions per day
+    ('bstar', 'f8'), #inverse Earth radii
+])
+
+TLE_LINE_LENGTH = 69
+
+J2000 = np.datetime64('2000-01-01T12:00:00', 'us')
+
+
+def _columns(lines, start, stop):
+    """
+    Read a fixed-width column from an array of lines as floats.
+
+    """
+    return np.ascontiguousarray(lines[:, start:stop]).view(
+        'S{}'.format(stop - start)).ravel().astype(float)
+
+
+def parse_tle_file(path):
+    """
+    Parse a file of two-line element sets into a catalog array.
+
+    Sets may be preceded by a name line, as in three-line catalog files.
+
+    Parameters
+    ----------
+    path : string
+        Path of the TLE file.
+
+    Returns
+    -------
+    catalog : numpy.ndarray
+        Structured array of `TLE_DTYPE` with one row per object.
+
+    """
+    with open(path, 'r') as source:
+        lines = [line.rstrip() for line in source if line.strip()]
+
+    names, line_1, line_2 = [], [], []
+    for idx, line in enumerate(lines):
+        if line.startswith('1 ') and idx + 1 < len(lines):
+            previous = lines[idx - 1] if idx > 0 else ''
+            has_name = not previous.startswith(('1 ', '2 '))
+            names.append(previous.strip() if has_name else '')
+            line_1.append(line.ljust(TLE_LINE_LENGTH)[:TLE_LINE_LENGTH])
+            line_2.append(lines[idx + 1].ljust(TLE_LINE_LENGTH)[:TLE_LINE_LENGTH])
+
+    #lines are read as one byte array per set, so columns are parsed in bulk
+    line_1 = np.frombuffer(''.join(line_1).encode('ascii'),
+        dtype='u1').reshape(-1, TLE_LINE_LENGTH)
+    line_2 = np.frombuffer(''.join(line_2).encode('ascii'),
+        dtype='u1').reshape(-1, TLE_LINE_LENGTH)
+
+    catalog = np.zeros(len(names), dtype=TLE_DTYPE)
+
+    catalog['name'] = names
+    catalog['catalog_number'] = _columns(line_1, 2, 7)
+
+    year = _columns(line_1, 18, 20).astype(int)
+    year = np.where(year < 57, 2000 + year, 1900 + year)
+    day = _columns(line_1, 20, 32)
+    catalog['epoch'] = ((year - 1970).astype('datetime64[Y]').astype('datetime64[us]') +
+        np.round((day - 1) * 86400e6).astype('timedelta64[us]'))
+
+    #the drag term has an implied leading decimal point and an exponent
+    catalog['bstar'] = (_columns(line_1, 53, 59) / 1e5 *
+        10**_columns(line_1, 59, 61))
+
+    catalog['inclination'] = _columns(line_2, 8, 16)
+    catalog['raan'] = _columns(line_2, 17, 25)
+    catalog['eccentricity'] = _columns(line_2, 26, 33) / 1e7
+    catalog['argument_of_perigee'] = _columns(line_2, 34, 42)
+    catalog['mean_anomaly'] = _columns(line_2, 43, 51)
+    catalog['mean_motion'] = _columns(line_2, 52, 63)
+
+    return catalog
+
+
+def load_tle_catalog(path):
+    """
+    Load a TLE catalog, using the cached parse if it is up to date.
+
+    The parsed catalog is saved alongside the source file with a .npy
+    extension, and is reused while it is newer than the source.
+
+    Parameters
+    ----------
+    path : string
+        Path of the TLE file.
+
+    Returns
+    -------
+    catalog : numpy.ndarray
+        Structured array of `TLE_DTYPE` with one row per object.
+
+    """
+    cache_path = os.path.splitext(path)[0] + '.npy'
+
+    if (os.path.exists(cache_path) and
+        os.path.getmtime(cache_path) >= os.path.getmtime(path)):
+        return np.load(cache_path)
+
+    catalog = parse_tle_file(path)
+    np.save(cache_path, catalog)
+
+    return catalog
+
+
+def solve_kepler(mean_anomaly, eccentricity, iterations=10):
+    """
+    Solve Kepler's equation for the eccentric anomaly by Newton's method.
+
+    Parameters
+    ----------
+    mean_anomaly : numpy.ndarray
+        Mean anomaly in radians.
+    eccentricity : numpy.ndarray
+        Orbital eccentricity, below 1.
+    iterations : int
+        Number of Newton iterations.
+
+    Returns
+    -------
+    eccentric_anomaly : numpy.ndarray
+        Eccentric anomaly in radians.
+
+    """
+    eccentric_anomaly = np.array(mean_anomaly, dtype=float)
+
+    for _ in range(iterations):
+        eccentric_anomaly = eccentric_anomaly - (
+            (eccentric_anomaly - eccentricity * np.sin(eccentric_anomaly) - mean_anomaly) /
+            (1 - eccentricity * np.cos(eccentric_anomaly)))
+
+    return eccentric_anomaly
+
+
+def calc_gmst(times):
+    """
+    Calculate the Greenwich mean sidereal angle.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        UTC times as datetime64 values.
+
+    Returns
+    -------
+    gmst : numpy.ndarray
+        Sidereal angle in radians.
+
+    """
+    days = (np.asarray(times, dtype='datetime64[us]') - J2000) / np.timedelta64(1, 'D')
+
+    return np.radians((280.46061837 + 360.98564736629 * days) % 360)
+
+
+def propagate_catalog(catalog, times, include_j2=True):
+    """
+    Propagate all catalog objects over a time grid.
+
+    Orbits follow two-body motion, with the secular drift of the node,
+    argument of perigee and mean anomaly due to J2 when `include_j2` is set.
+
+    Parameters
+    ----------
+    catalog : numpy.ndarray
+        Structured array of `TLE_DTYPE`.
+    times : numpy.ndarray
+        UTC times as datetime64 values.
+    include_j2 : bool
+        Whether to apply the secular J2 perturbations.
+
+    Returns
+    -------
+    positions : numpy.ndarray
+        Array of shape (times, objects, 3) of ECEF coordinates in km, as
+        used by `globalsat.visibility.calc_visibility`.
+
+    """
+    times = np.asarray(times, dtype='datetime64[us]')
+    elapsed = (times[:, np.newaxis] - catalog['epoch']) / np.timedelta64(1, 's')
+
+    eccentricity = catalog['eccentricity']
+    inclination = np.radians(catalog['inclination'])
+    mean_motion = catalog['mean_motion'] * 2 * np.pi / 86400
+    semi_major_axis = (EARTH_MU / mean_motion**2)**(1 / 3)
+
+    raan_rate = np.zeros(len(catalog))
+    perigee_rate = np.zeros(len(catalog))
+    anomaly_rate = mean_motion
+
+    if include_j2:
+        semi_latus_rectum = semi_major_axis * (1 - eccentricity**2)
+        factor = 0.75 * mean_motion * EARTH_J2 * (
+            EARTH_RADIUS_EQUATOR_KM / semi_latus_rectum)**2
+        cos_i = np.cos(inclination)
+        raan_rate = -2 * factor * cos_i
+        perigee_rate = factor * (5 * cos_i**2 - 1)
+        anomaly_rate = mean_motion + factor * np.sqrt(1 - eccentricity**2) * (3 * cos_i**2 - 1)
+
+    raan = np.radians(catalog['raan']) + raan_rate * elapsed
+    argument_of_perigee = np.radians(catalog['argument_of_perigee']) + perigee_rate * elapsed
+    mean_anomaly = np.radians(catalog['mean_anomaly']) + anomaly_rate * elapsed
+
+    eccentric_anomaly = solve_kepler(np.mod(mean_anomaly, 2 * np.pi), eccentricity)
+    true_anomaly = 2 * np.arctan2(
+        np.sqrt(1 + eccentricity) * np.sin(eccentric_anomaly / 2),
+        np.sqrt(1 - eccentricity) * np.cos(eccentric_anomaly / 2))
+    radius = semi_major_axis * (1 - eccentricity * np.cos(eccentric_anomaly))
+
+    node = raan - calc_gmst(times)[:, np.newaxis]
+
+    return orbital_to_ecef(radius, argument_of_perigee + true_anomaly, node,
+        inclination)
@@ -0,0 +1,170 @@
+"""
+Globalsat visibility engine.
+
+Finds the satellites above the elevation mask of each ground cell at each
+time step. A KD-tree is built over the satellite positions of each step,
+and all cells are queried in one batch within the maximum slant range, so
+the full cells x satellites distance matrix is never formed. Slant ranges
+of the visible pairs can be passed directly to `calc_link_budget`.
+
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from globalsat.geometry import EARTH_RADIUS_EQUATOR_KM
+
+
+def calc_ground_positions(latitude, longitude):
+    """
+    Calculate Earth-fixed positions of ground cells on a spherical Earth.
+
+    Parameters
+    ----------
+    latitude : array_like
+        Cell latitudes in degrees.
+    longitude : array_like
+        Cell longitudes in degrees.
+
+    Returns
+    -------
+    positions : numpy.ndarray
+        Array of shape (cells, 3) of ECEF coordinates in km.
+
+    """
+    lat = np.radians(np.asarray(latitude, dtype=float))
+    lon = np.radians(np.asarray(longitude, dtype=float))
+
+    positions = EARTH_RADIUS_EQUATOR_KM * np.stack([
+        np.cos(lat) * np.cos(lon),
+        np.cos(lat) * np.sin(lon),
+        np.sin(lat),
+    ], axis=-1)
+
+    return positions
+
+
+def find_visible_satellites(cell_positions, satellite_positions, min_elevation_deg):
+    """
+    Find all cell and satellite pairs above the elevation mask at one time.
+
+    Parameters
+    ----------
+    cell_positions : numpy.ndarray
+        Array of shape (cells, 3) of ground cell ECEF coordinates in km.
+    satellite_positions : numpy.ndarray
+        Array of shape (satellites, 3) of satellite ECEF coordinates in km.
+    min_elevation_deg : float
+        Minimum elevation angle of a user terminal in degrees.
+
+    Returns
+    -------
+    visibility : dict
+        Contains an array with one value per visible pair for 'cell',
+        'satellite', 'slant_range' (km) and 'elevation' (degrees).
+
+    """
+    cell_positions = np.asarray(cell_positions, dtype=float)
+    satellite_positions = np.asarray(satellite_positions, dtype=float)
+
+    #no satellite can be seen beyond the slant range of the highest one
+    #at the elevation mask, so only candidates within it are tested
+    elevation = np.radians(min_elevation_deg)
+    satellite_radius = np.linalg.norm(satellite_positions, axis=1).max()
+    ground_radius = np.linalg.norm(cell_positions, axis=1).min()
+    max_slant_range = (np.sqrt(satellite_radius**2 -
+        (ground_radius * np.cos(elevation))**2) - ground_radius * np.sin(elevation))
+
+    tree = cKDTree(satellite_positions)
+    candidates = tree.query_ball_point(cell_positions, max_slant_range)
+
+    counts = np.fromiter((len(c) for c in candidates), dtype=int,
+        count=len(candidates))
+    cell = np.repeat(np.arange(len(cell_positions)), counts)
+    satellite = np.fromiter((s for c in candidates for s in c), dtype=int,
+        count=counts.sum())
+
+    line_of_sight = satellite_positions[satellite] - cell_positions[cell]
+    slant_range = np.linalg.norm(line_of_sight, axis=1)
+    zenith = cell_positions[cell] / np.linalg.norm(cell_positions[cell],
+        axis=1)[:, np.newaxis]
+
+    sin_elevation = np.einsum('ij,ij->i', line_of_sight, zenith) / slant_range
+    pair_elevation = np.degrees(np.arcsin(np.clip(sin_elevation, -1, 1)))
+
+    visible = pair_elevation >= min_elevation_deg
+
+    visibility = {
+        'cell': cell[visible],
+        'satellite': satellite[visible],
+        'slant_range': slant_range[visible],
+        'elevation': pair_elevation[visible],
+    }
+
+    return visibility
+
+
+def calc_visibility(latitude, longitude, positions, min_elevation_deg):
+    """
+    Find all visible cell and satellite pairs over a propagated time grid.
+
+    Parameters
+    ----------
+    latitude : array_like
+        Cell latitudes in degrees.
+    longitude : array_like
+        Cell longitudes in degrees.
+    positions : numpy.ndarray
+        Array of shape (times, satellites, 3) of satellite ECEF coordinates
+        in km, such as returned by `globalsat.orbits.propagate_to_memmap`.
+    min_elevation_deg : float
+        Minimum elevation angle of a user terminal in degrees.
+
+    Returns
+    -------
+    visibility : dict
+        Contains an array with one value per visible pair for 'time_step',
+        'cell', 'satellite', 'slant_range' (km) and 'elevation' (degrees).
+
+    """
+    cell_positions = calc_ground_positions(latitude, longitude)
+
+    steps = [find_visible_satellites(cell_positions, positions[t], min_elevation_deg)
+        for t in range(len(positions))]
+
+    visibility = {
+        'time_step': np.repeat(np.arange(len(steps)),
+            [len(step['cell']) for step in steps]),
+    }
+    for key in ['cell', 'satellite', 'slant_range', 'elevation']:
+        visibility[key] = np.concatenate([step[key] for step in steps])
+
+    return visibility
+
+
+def calc_serving_slant_range(visibility, number_of_cells, number_of_time_steps):
+    """
+    Find the slant range to the nearest visible satellite of each cell.
+
+    Parameters
+    ----------
+    visibility : dict
+        Visible pairs as returned by `calc_visibility`.
+    number_of_cells : int
+        Number of ground cells.
+    number_of_time_steps : int
+        Number of time steps.
+
+    Returns
+    -------
+    slant_range : numpy.ndarray
+        Array of shape (times, cells) in km, which is infinite where no
+        satellite is visible.
+
+    """
+    slant_range = np.full(number_of_time_steps * number_of_cells, np.inf)
+
+    np.minimum.at(slant_range,
+        visibility['time_step'] * number_of_cells + visibility['cell'],
+        visibility['slant_range'])
+
+    return slant_range.reshape(number_of_time_steps, number_of_cells)
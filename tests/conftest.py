@@ -1,5 +1,11 @@
+import os
+import sys
 from pytest import fixture
 
+#scripts are imported by their tests as top-level modules, as they import
+#each other
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
 
 @fixture(scope='function')
 def setup_params():
@@ -0,0 +1,85 @@
+import warnings
+import numpy as np
+import pytest
+from globalsat.beams import (
+    allocate_proportional,
+    allocate_water_filling,
+    schedule_beams
+)
+
+
+def test_allocate_proportional():
+    """
+    Unit test for sharing resource in proportion to demand.
+
+    """
+    allocation = allocate_proportional([0, 0, 1, 1], [2, 6, 1, 1], [4, 10])
+
+    assert allocation.tolist() == [1, 3, 1, 1]
+
+
+def test_allocate_water_filling():
+    """
+    Unit test for max-min fair water-filling across satellites.
+
+    """
+    satellite = np.array([1, 0, 0, 0, 1, 2])
+    demand = np.array([5, 1, 8, 3, 1, 0])
+
+    allocation = allocate_water_filling(satellite, demand, [9, 20, 4])
+
+    #satellite 0 serves 1 and 3 fully and gives the remaining 5 to the last
+    assert allocation.tolist() == [5, 1, 5, 3, 1, 0]
+
+    #compare against a loop over satellites with bisection on the level
+    rng = np.random.default_rng(1)
+    satellite = rng.integers(0, 30, 500)
+    demand = rng.random(500) * 10
+    resource = rng.random(30) * 80
+
+    allocation = allocate_water_filling(satellite, demand, resource)
+
+    for s in range(30):
+        d = demand[satellite == s]
+        if d.sum() <= resource[s]:
+            assert np.allclose(allocation[satellite == s], d)
+            continue
+        low, high = 0, d.max()
+        for _ in range(100):
+            level = (low + high) / 2
+            low, high = (level, high) if np.minimum(d, level).sum() < resource[s] else (low, level)
+        assert np.allclose(allocation[satellite == s], np.minimum(d, level))
+
+
+def test_schedule_beams(setup_params):
+    """
+    Unit test for scheduling satellite bandwidth across regions.
+
+    """
+    region = np.array([0, 1, 2, 2])
+    satellite = np.array([0, 0, 0, 1])
+    spectral_efficiency = np.array([2.0, 4.0, 1.0, 0.0])
+
+    #each satellite has 2 x 0.25 GHz of bandwidth
+    results = schedule_beams(region, satellite, [2000, 400, 50, 100],
+        spectral_efficiency, setup_params, 4, users=[10, 4, 1, 0])
+
+    assert results['bandwidth_hz'].sum() <= 0.5e9 + 1e-3
+    assert results['served_mbps'][1:].tolist() == pytest.approx([400, 50, 0])
+    assert results['served_mbps'][0] == pytest.approx((0.5e9 - 0.15e9) * 2 / 1e6)
+    assert results['per_user_mbps'].tolist() == pytest.approx([70, 100, 50, 0])
+
+    proportional = schedule_beams(region, satellite, [2000, 400, 50, 100],
+        spectral_efficiency, setup_params, 4, method='proportional')
+    assert proportional['region_served_mbps'][1] < 400
+
+    #pairs without demand or without a usable link request nothing, quietly
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        idle = schedule_beams(region, satellite, [2000, 400, 50, 0],
+            spectral_efficiency, setup_params, 4)
+    assert idle['bandwidth_hz'][3] == 0
+
+    with pytest.raises(ValueError):
+        schedule_beams(region, satellite, [1, 1, 1, 1], spectral_efficiency,
+            setup_params, 4, method='round_robin')
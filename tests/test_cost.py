@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from globalsat.cost import (
+    calc_capex,
+    calc_opex,
+    calc_discount_factors,
+    calc_npv,
+    calc_total_cost_ownership,
+    calc_total_cost_ownership_cash_flows
+)
+
+
+def test_calc_capex():
+    """
+    Unit test for calculating the capital expenditure.
+
+    """
+    assert calc_capex(1, 2, 3, 4, 5) == 15
+
+    capex = calc_capex(np.array([1, 2]), 2, 3, 4, 5)
+
+    assert capex.tolist() == [15, 16]
+
+
+def test_calc_opex():
+    """
+    Unit test for calculating the operating expenditure.
+
+    """
+    assert calc_opex(1, 2, 3, 4, 5) == 15
+
+
+def test_calc_discount_factors():
+    """
+    Unit test for finding the discount factors.
+
+    """
+    discount_factors = calc_discount_factors(10, 3)
+
+    assert discount_factors.tolist() == pytest.approx([1, 1 / 1.1, 1 / 1.1**2])
+    assert calc_discount_factors(10, 3) is discount_factors
+
+    with pytest.raises(ValueError):
+        discount_factors[0] = 2
+
+
+def test_calc_npv():
+    """
+    Unit test for calculating the net present value.
+
+    """
+    cash_flows = np.array([[100, 110, 121], [0, 0, 121]])
+
+    assert calc_npv(cash_flows, 10).tolist() == pytest.approx([300, 100])
+
+
+def test_calc_total_cost_ownership():
+    """
+    Unit test for calculating the total cost of ownership.
+
+    """
+    capex = np.array([1000, 2000])
+    opex = np.array([100, 200])
+    discount_rate = 5
+    assessment_period = 5
+
+    #equivalent to discounting the opex of each year after the first
+    expected = capex + opex + sum(opex / (1.05**year) for year in range(1, 5))
+
+    result = calc_total_cost_ownership(capex, opex, discount_rate, assessment_period)
+
+    assert result.tolist() == pytest.approx(expected.tolist())
+
+    cash_flows = np.repeat(opex[:, np.newaxis], 5, axis=1)
+
+    result = calc_total_cost_ownership_cash_flows(capex, cash_flows, discount_rate)
+
+    assert result.tolist() == pytest.approx(expected.tolist())
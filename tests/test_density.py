@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from globalsat.geometry import calc_latitude_bands
+from globalsat.density import (
+    calc_latitude_density,
+    calc_latitude_capacity,
+    lookup_latitude_values
+)
+
+
+def test_calc_latitude_density():
+    """
+    Unit test for the satellite density in each latitude band.
+
+    """
+    bands = calc_latitude_bands(1.0)
+
+    density = calc_latitude_density(1000, 53, 1.0)
+
+    assert (density * bands['band_area_km2']).sum() == pytest.approx(1000)
+    assert density[90] < density[140]
+    assert (density[np.abs(bands['latitude']) > 53] == 0).all()
+    assert np.allclose(density, density[::-1])
+
+    assert calc_latitude_density(1000, 53, 1.0) is density
+
+    spread = calc_latitude_density(1000, 53, 1.0, 10)
+
+    assert (spread * bands['band_area_km2']).sum() == pytest.approx(1000)
+    assert spread[145] > 0
+    assert spread[155] == 0
+    assert spread.max() < density.max()
+
+    #retrograde orbits cover the same latitudes as their prograde equivalent
+    assert np.allclose(calc_latitude_density(1000, 97, 1.0),
+        calc_latitude_density(1000, 83, 1.0))
+
+
+def test_calc_latitude_capacity(setup_params, setup_lut):
+    """
+    Unit test for the capacity per km^2 in each latitude band.
+
+    """
+    setup_params['altitude_km'] = 550
+    setup_params['inclination_deg'] = 53
+    setup_params['min_elevation_deg'] = 25
+
+    results = calc_latitude_capacity(4000, setup_params, setup_lut, 1.0,
+        np.array([0, 1, 2]))
+
+    covered = results['density'] > 0
+
+    assert results['capacity_kmsq'].shape == (180,)
+    assert (results['capacity_kmsq'][~covered] == 0).all()
+    assert (results['capacity_kmsq'][covered] > 0).all()
+    assert np.isinf(results['distance'][~covered]).all()
+    assert (results['distance'][covered] > 550).all()
+
+
+def test_lookup_latitude_values():
+    """
+    Unit test for joining band values to locations by latitude.
+
+    """
+    values = np.arange(180)
+
+    assert lookup_latitude_values([-90, 0.5, 89.9, 90], values, 1.0).tolist() == [0, 90, 179, 179]
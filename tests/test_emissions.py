@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from globalsat.emissions import (
+    FUELS,
+    COMPOUNDS,
+    VEHICLES,
+    EMISSION_TENSOR,
+    build_emission_tensor,
+    calc_emissions,
+    emissions_to_dict
+)
+from globalsat.sim import falcon_9, ariane, calc_per_sat_emission
+
+
+def test_build_emission_tensor():
+    """
+    Unit test for building the emission factor tensor.
+
+    """
+    factors = {
+        'rocket_a': {'kerosene': [1, 2]},
+        'rocket_b': {'solid': [3, 4], 'kerosene': [5, 6]},
+    }
+
+    tensor = build_emission_tensor(factors, ['kerosene', 'solid'], ['co2', 'pm'])
+
+    assert tensor.shape == (2, 2, 2)
+    assert tensor[0].tolist() == [[1, 2], [0, 0]]
+    assert tensor[1].tolist() == [[5, 6], [3, 4]]
+
+    assert EMISSION_TENSOR.shape == (len(VEHICLES), len(FUELS), len(COMPOUNDS))
+
+
+def test_calc_emissions():
+    """
+    Unit test for calculating the emissions of a batch of launches.
+
+    """
+    fuel_masses = np.array([
+        [488370, 0, 0, 0],
+        [0, 10000, 480000, 184900],
+        [1000, 0, 0, 0],
+    ])
+
+    emissions = calc_emissions(['falcon_9', 'ariane', 'falcon_9'], fuel_masses)
+
+    assert emissions.shape == (3, len(COMPOUNDS))
+
+    expected = [falcon_9(488370), ariane(10000, 480000, 184900), falcon_9(1000)]
+
+    for row, emission_dict in zip(emissions, expected):
+        assert row.tolist() == pytest.approx(list(emission_dict.values()))
+
+    single = calc_emissions('falcon_9', fuel_masses[0])
+
+    assert single.tolist() == emissions[0].tolist()
+
+    emission_dict = emissions_to_dict(emissions)
+
+    assert emission_dict['carbon_emission'].tolist() == emissions[:, 2].tolist()
+
+
+def test_calc_per_sat_emission_batch():
+    """
+    Unit test for calculating emissions from arrays of fuel masses.
+
+    """
+    fuel_mass = np.array([488370, 244185])
+
+    results = calc_per_sat_emission('Starlink', fuel_mass, 0, 0, 0)
+
+    assert results['alumina_emission'].tolist() == pytest.approx([24418.5, 12209.25])
+
+    with pytest.raises(ValueError):
+        calc_per_sat_emission('Telesat', 1, 0, 0, 0)
+
+
+def test_calc_per_sat_emission_mixed():
+    """
+    Unit test for calculating emissions from scalar and array fuel masses.
+
+    """
+    hypergolic = np.array([7360, 3680, 0])
+
+    results = calc_per_sat_emission('OneWeb', 0, hypergolic, 218150, 0)
+
+    assert results['alumina_emission'].shape == (3,)
+
+    for idx, mass in enumerate(hypergolic):
+        single = calc_per_sat_emission('OneWeb', 0, mass, 218150, 0)
+        for key, value in single.items():
+            assert results[key][idx] == pytest.approx(value)
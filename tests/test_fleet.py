@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from globalsat.fleet import (
+    generate_deployment_schedule,
+    simulate_fleet
+)
+
+
+def test_generate_deployment_schedule():
+    """
+    Unit test for spreading the deployment over the deployment period.
+
+    """
+    deployment = generate_deployment_schedule([100, 60], [2, 3], 5)
+
+    assert deployment.shape == (5, 2)
+    assert deployment[:, 0].tolist() == [50, 50, 0, 0, 0]
+    assert deployment[:, 1].tolist() == [20, 20, 20, 0, 0]
+
+
+def test_simulate_fleet():
+    """
+    Unit test for simulating launches, retirements and emissions by year.
+
+    """
+    deployment = generate_deployment_schedule([100, 60], [2, 3], 12)
+
+    results = simulate_fleet(deployment, [5, 4], [10, 20], [[1, 2], [3, 4]])
+
+    launched = results['satellites_launched']
+
+    assert launched[:, 0].tolist() == [50, 50, 0, 0, 0, 50, 50, 0, 0, 0, 50, 50]
+    assert launched[:, 1].tolist() == [20, 20, 20, 0, 20, 20, 20, 0, 20, 20, 20, 0]
+    assert results['satellites_retired'][5, 0] == 50
+    assert results['on_orbit'][-1].tolist() == [100, 60]
+    assert results['launches'][0].tolist() == [5, 1]
+    assert results['emissions'][0].tolist() == [[5, 10], [3, 4]]
+    assert results['cumulative_emissions'][-1, 0].tolist() == [30, 60]
+
+    with pytest.raises(ValueError):
+        simulate_fleet(deployment, [0, 4], [10, 20], [[1, 2], [3, 4]])
+
+
+def test_simulate_fleet_samples():
+    """
+    Unit test for simulating constellations with sampled lifetimes.
+
+    """
+    deployment = generate_deployment_schedule([100, 60], [2, 3], 12)
+
+    lifetimes = np.array([[5, 6, 7], [4, 4, 4]])
+
+    results = simulate_fleet(deployment[..., np.newaxis], lifetimes,
+        np.array([10, 20])[:, np.newaxis], np.array([[[1.0]], [[3.0]]]))
+
+    assert results['satellites_launched'].shape == (12, 2, 3)
+    assert results['emissions'].shape == (12, 2, 3, 1)
+    assert results['satellites_launched'][6, 0].tolist() == [50, 50, 0]
+    assert (results['on_orbit'][-1, 0] == 100).all()
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from globalsat.emissions import FUELS, calc_emissions
+from globalsat.sim import calc_per_sat_emission
+from fleet_run import FUEL_PARAMETERS, calc_launch_emissions
+
+
+def test_calc_launch_emissions():
+    """
+    Unit test for the emissions of one launch of each constellation.
+
+    """
+    params = [
+        {'name': 'Starlink', 'fuel_mass': 488370, 'fuel_mass_1': 0,
+            'fuel_mass_2': 0, 'fuel_mass_3': 0},
+        {'name': 'OneWeb', 'fuel_mass': 218150, 'fuel_mass_1': 7360,
+            'fuel_mass_2': 0, 'fuel_mass_3': 0},
+        {'name': 'Kuiper', 'fuel_mass': 0, 'fuel_mass_1': 10000,
+            'fuel_mass_2': 480000, 'fuel_mass_3': 184900},
+    ]
+
+    emissions = calc_launch_emissions(params)
+
+    assert emissions.shape == (3, 6)
+    assert list(FUEL_PARAMETERS) == FUELS
+
+    #vehicles taking kerosene in fuel_mass match calc_per_sat_emission
+    for idx in [0, 2]:
+        item = params[idx]
+        expected = calc_per_sat_emission(item['name'], item['fuel_mass'],
+            item['fuel_mass_1'], item['fuel_mass_2'], item['fuel_mass_3'])
+        assert emissions[idx].tolist() == pytest.approx(list(expected.values()))
+
+    #the Soyuz kerosene load in fuel_mass is counted
+    assert emissions[1].tolist() == pytest.approx(
+        calc_emissions('soyuz_fg', [218150, 7360, 0, 0]).tolist())
+    assert emissions[1].tolist() != pytest.approx(list(calc_per_sat_emission(
+        'OneWeb', 218150, 7360, 0, 0).values()))
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from globalsat.geometry import EARTH_RADIUS_EQUATOR_KM
+from globalsat.footprint import (
+    calc_coverage_half_angle,
+    calc_max_slant_range,
+    calc_cap_area,
+    calc_slant_range_quantiles,
+    calc_mean_slant_range,
+    calc_footprint_table
+)
+
+
+def test_calc_coverage_half_angle():
+    """
+    Unit test for the Earth central angle of a satellite's coverage.
+
+    """
+    #at zero elevation the coverage reaches the horizon
+    assert calc_coverage_half_angle(6378.137, 0) == pytest.approx(60)
+
+    half_angle = calc_coverage_half_angle(np.array([550, 1200]), 25)
+
+    assert half_angle[0] < half_angle[1]
+    assert calc_coverage_half_angle(550, 90) == pytest.approx(0, abs=1e-6)
+
+
+def test_calc_max_slant_range():
+    """
+    Unit test for the slant range at the edge of coverage.
+
+    """
+    #at zero elevation the line of sight is tangent to the Earth
+    radius = EARTH_RADIUS_EQUATOR_KM
+    assert calc_max_slant_range(550, 0) == pytest.approx(
+        np.sqrt((radius + 550)**2 - radius**2))
+
+    assert calc_max_slant_range(550, 90) == pytest.approx(550)
+
+    max_slant_range = calc_max_slant_range(np.array([[550], [1200]]),
+        np.array([25, 35]))
+    assert max_slant_range.shape == (2, 2)
+    assert max_slant_range[0, 0] > max_slant_range[0, 1]
+
+
+def test_calc_cap_area():
+    """
+    Unit test for the surface area of the coverage cap.
+
+    """
+    #a satellite at infinite altitude sees half of the Earth
+    assert calc_cap_area(1e12, 0) == pytest.approx(
+        2 * np.pi * EARTH_RADIUS_EQUATOR_KM**2)
+
+    assert calc_cap_area(550, 90) == pytest.approx(0, abs=1e-3)
+
+
+def test_calc_slant_range_distribution():
+    """
+    Unit test for slant ranges of users spread over the coverage cap.
+
+    """
+    altitude, elevation = 550, 25
+
+    quantiles = calc_slant_range_quantiles(altitude, elevation, [0, 0.5, 1])
+    assert quantiles[0] == pytest.approx(altitude)
+    assert quantiles[-1] == pytest.approx(calc_max_slant_range(altitude, elevation))
+    assert calc_slant_range_quantiles(altitude, elevation, 0.5) == quantiles[1]
+
+    #compare against users sampled uniformly over the cap
+    half_angle = np.radians(calc_coverage_half_angle(altitude, elevation))
+    cos_angle = 1 - np.random.default_rng(1).random(200000) * (1 - np.cos(half_angle))
+    radius = EARTH_RADIUS_EQUATOR_KM
+    distance = np.sqrt(radius**2 + (radius + altitude)**2 -
+        2 * radius * (radius + altitude) * cos_angle)
+
+    assert calc_mean_slant_range(altitude, elevation) == pytest.approx(
+        distance.mean(), rel=1e-3)
+    assert quantiles[1] == pytest.approx(np.median(distance), rel=1e-3)
+
+    sweep = calc_slant_range_quantiles(np.array([550, 1200]), 25, [0.1, 0.9])
+    assert sweep.shape == (2, 2)
+
+
+def test_calc_footprint_table():
+    """
+    Unit test for the cached footprint table.
+
+    """
+    table = calc_footprint_table((550, 1200), (25, 35))
+
+    assert table is calc_footprint_table((550, 1200), (25, 35))
+    assert table['cap_area_km2'].shape == (2, 2)
+    assert not table['max_slant_range_km'].flags.writeable
+    assert table['mean_slant_range_km'][1, 0] == pytest.approx(
+        calc_mean_slant_range(1200, 25))
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from globalsat.gateway import group_regions, GatewayFlowModel
+
+
+def test_group_regions():
+    """
+    Unit test for grouping regions which see the same satellites.
+
+    """
+    cell = np.array([0, 1, 1, 2, 2, 3])
+    satellite = np.array([0, 1, 0, 0, 1, 2])
+
+    group, group_cell, group_satellite = group_regions(cell, satellite, 5, 3)
+
+    assert group[1] == group[2]
+    assert len(np.unique(group)) == 4
+    assert sorted(zip(group_cell, group_satellite)) == sorted(
+        [(group[0], 0), (group[1], 0), (group[1], 1), (group[3], 2)])
+
+
+def test_gateway_flow_model():
+    """
+    Unit test for served demand under satellite and gateway limits.
+
+    """
+    region_satellite = (np.array([0, 1, 2, 2]), np.array([0, 0, 0, 1]))
+    satellite_gateway = (np.array([0, 1]), np.array([0, 0]))
+
+    model = GatewayFlowModel(region_satellite, 4, [10, 10], satellite_gateway,
+        100, [15])
+
+    served = model.solve([5, 5, 10, 3])
+
+    #the gateway caps the total, and region 3 sees no satellite
+    assert served.sum() == pytest.approx(15)
+    assert served[3] == 0
+    assert (served <= [5, 5, 10, 3]).all()
+    assert served[0] + served[1] <= 10
+
+    served = model.solve([1, 1, 2, 0])
+    assert served.tolist() == [1, 1, 2, 0]
+
+
+def test_gateway_flow_model_scenarios():
+    """
+    Unit test for reusing the residual graph across demand scenarios.
+
+    """
+    rng = np.random.default_rng(1)
+    cell = rng.integers(0, 2000, 6000)
+    satellite = rng.integers(0, 50, 6000)
+    feeder_satellite = np.arange(50)
+    feeder_gateway = rng.integers(0, 5, 50)
+    satellite_capacity = rng.integers(50, 100, 50)
+
+    def build():
+        return GatewayFlowModel((cell, satellite), 2000,
+            satellite_capacity, (feeder_satellite, feeder_gateway), 60,
+            [400, 500, 600, 700, 800])
+
+    base_demand = rng.random(2000) * 3
+
+    warm = build()
+    for adoption_rate in [1, 2, 5]:
+        served = warm.solve(base_demand * adoption_rate)
+
+    cold = build()
+    expected = cold.solve(base_demand * 5)
+
+    assert served.sum() == pytest.approx(expected.sum())
+    assert (served <= base_demand * 5 + 1e-9).all()
+
+
+def test_gateway_flow_model_units():
+    """
+    Unit test for rejecting values too large for integer flow units.
+
+    """
+    region_satellite = (np.array([0]), np.array([0]))
+    satellite_gateway = (np.array([0]), np.array([0]))
+
+    with pytest.raises(ValueError):
+        GatewayFlowModel(region_satellite, 1, [1e9], satellite_gateway, 100,
+            [100], unit=0.001)
+
+    model = GatewayFlowModel(region_satellite, 1, [10], satellite_gateway, 100,
+        [100], unit=0.001)
+
+    with pytest.raises(ValueError):
+        model.solve([1e7])
+
+    with pytest.raises(ValueError):
+        model.solve([-1])
+
+    #a larger unit carries the same demand
+    model = GatewayFlowModel(region_satellite, 1, [1e9], satellite_gateway, 1e9,
+        [1e9], unit=1000)
+
+    assert model.solve([1e7]).tolist() == [1e7]
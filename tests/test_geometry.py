@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from globalsat.geometry import (
+    EARTH_RADIUS_EQUATOR_KM,
+    EARTH_RADIUS_POLES_KM,
+    calc_radius_at_latitude,
+    calc_area_from_equator,
+    calc_latitude_steps,
+    calc_latitude_bands,
+    find_latitude_band
+)
+
+
+def test_calc_radius_at_latitude():
+    """
+    Unit test for the radius of the Earth at a given latitude.
+
+    """
+    radius = calc_radius_at_latitude(np.array([0, 90, -90]))
+
+    assert radius.tolist() == pytest.approx([EARTH_RADIUS_EQUATOR_KM,
+        EARTH_RADIUS_POLES_KM, EARTH_RADIUS_POLES_KM])
+
+
+def test_calc_area_from_equator():
+    """
+    Unit test for the ellipsoid area between the equator and a latitude.
+
+    """
+    #WGS84 surface area is 510,065,622 km^2
+    assert 2 * calc_area_from_equator(90) == pytest.approx(510065622, rel=1e-6)
+    assert calc_area_from_equator(-30) == -calc_area_from_equator(30)
+
+
+def test_calc_latitude_steps():
+    """
+    Unit test for listing latitudes from the equator to the pole.
+
+    """
+    assert calc_latitude_steps(30).tolist() == [0, 30, 60, 90]
+    assert calc_latitude_steps(7).tolist() == list(range(0, 85, 7))
+
+    latitude = calc_latitude_steps(0.7)
+    assert len(latitude) == 129
+    assert latitude[-1] == pytest.approx(89.6)
+
+    assert calc_latitude_steps(0.1)[-1] == 90
+    assert (calc_latitude_steps(0.3) <= 90).all()
+
+
+def test_calc_latitude_bands():
+    """
+    Unit test for building the latitude band table.
+
+    """
+    bands = calc_latitude_bands(0.5)
+
+    assert len(bands['latitude']) == 360
+    assert bands['latitude'][0] == -89.75
+    assert bands['band_area_km2'].sum() == pytest.approx(510065622, rel=1e-6)
+    assert bands['cumulative_area_km2'][-1] == pytest.approx(bands['band_area_km2'].sum())
+    assert bands['band_area_km2'][180] > bands['band_area_km2'][-1]
+
+    assert calc_latitude_bands(0.5) is bands
+
+    with pytest.raises(ValueError):
+        bands['radius_km'][0] = 1
+
+    with pytest.raises(ValueError):
+        calc_latitude_bands(7)
+
+
+def test_find_latitude_band():
+    """
+    Unit test for finding the latitude band of each latitude.
+
+    """
+    idx = find_latitude_band([-90, -89.9, 0, 45.2, 90], 0.5)
+
+    assert idx.tolist() == [0, 0, 180, 270, 359]
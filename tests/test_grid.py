@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+from collections import namedtuple
+from globalsat.geometry import calc_area_from_equator
+from globalsat.grid import (
+    MAX_LATITUDE,
+    PYRAMID_RESOLUTIONS_KM,
+    get_pyramid_filename,
+    aggregate_blocks,
+    encode_quadkeys,
+    decode_quadkeys,
+    format_quadkeys,
+    calc_parent_quadkeys,
+    calc_tile_column,
+    calc_tile_row,
+    calc_tile_latitude,
+    aggregate_raster_to_quadkeys,
+    coarsen_grid
+)
+
+#the coefficients of affine.Affine used by the grid
+Transform = namedtuple('Transform', ['a', 'b', 'c', 'd', 'e', 'f'])
+
+
+def test_encode_quadkeys():
+    """
+    Unit test for encoding and decoding integer quadkeys.
+
+    """
+    #column 3, row 5 at zoom 3 is quadkey '213'
+    quadkey = encode_quadkeys(np.array([3]), np.array([5]))
+
+    assert format_quadkeys(quadkey, 3).tolist() == ['213']
+
+    column = np.random.default_rng(1).integers(0, 2**20, 100)
+    row = np.random.default_rng(2).integers(0, 2**20, 100)
+
+    decoded_column, decoded_row = decode_quadkeys(encode_quadkeys(column, row))
+
+    assert decoded_column.tolist() == column.tolist()
+    assert decoded_row.tolist() == row.tolist()
+
+
+def test_calc_parent_quadkeys():
+    """
+    Unit test for finding the parent tile at a coarser zoom level.
+
+    """
+    quadkey = encode_quadkeys(np.array([3]), np.array([5]))
+
+    assert format_quadkeys(calc_parent_quadkeys(quadkey, 3, 1), 1).tolist() == ['2']
+
+    with pytest.raises(ValueError):
+        calc_parent_quadkeys(quadkey, 1, 3)
+
+
+def test_calc_tile_position():
+    """
+    Unit test for finding the tile containing a location.
+
+    """
+    assert calc_tile_column(np.array([-180, -0.1, 0.1, 180]), 1).tolist() == [0, 0, 1, 1]
+    assert calc_tile_row(np.array([90, 0.1, -0.1, -90]), 1).tolist() == [0, 0, 1, 1]
+
+    assert calc_tile_latitude(np.array([0, 1, 2]), 1) == pytest.approx(
+        [MAX_LATITUDE, 0, -MAX_LATITUDE])
+
+    #each row ends where the next begins
+    edges = calc_tile_latitude(np.arange(9), 3)
+    assert calc_tile_row((edges[:-1] + edges[1:]) / 2, 3).tolist() == list(range(8))
+
+
+def test_aggregate_raster_to_quadkeys():
+    """
+    Unit test for summing a raster over quadkey tiles.
+
+    """
+    #one degree pixels over 2W to 2E and 2S to 2N
+    array = np.arange(16, dtype=float).reshape(4, 4)
+    affine = Transform(1, 0, -2, 0, -1, 2)
+
+    grid = aggregate_raster_to_quadkeys(array, affine, 1, block_rows=3)
+
+    assert format_quadkeys(grid['quadkey'], 1).tolist() == ['0', '1', '2', '3']
+    assert grid['population'].tolist() == [10, 18, 42, 50]
+    assert grid['area_km2'].sum() == pytest.approx(
+        4 / 360 * (calc_area_from_equator(2) - calc_area_from_equator(-2)))
+    assert grid['latitude'] == pytest.approx([MAX_LATITUDE / 2] * 2 +
+        [-MAX_LATITUDE / 2] * 2)
+
+    mask = np.ones((4, 4), dtype=bool)
+    mask[:, :2] = False
+    array[3, 3] = 255
+
+    grid = aggregate_raster_to_quadkeys(array, affine, 1, mask=mask, nodata=255)
+
+    assert format_quadkeys(grid['quadkey'], 1).tolist() == ['1', '3']
+    assert grid['population'].tolist() == [18, 35]
+
+    with pytest.raises(ValueError):
+        aggregate_raster_to_quadkeys(array, Transform(1, 0, -2, 0, 1, -2), 1)
+
+
+def test_coarsen_grid():
+    """
+    Unit test for summing a quadkey grid into coarser tiles.
+
+    """
+    array = np.ones((8, 8))
+    affine = Transform(1, 0, 0, 0, -1, 8)
+
+    fine = aggregate_raster_to_quadkeys(array, affine, 8)
+    coarse = coarsen_grid(fine, 8, 1)
+    direct = aggregate_raster_to_quadkeys(array, affine, 1)
+
+    assert len(fine['quadkey']) > 1
+    assert coarse['quadkey'].tolist() == direct['quadkey'].tolist()
+    assert coarse['population'] == pytest.approx(direct['population'])
+    assert coarse['area_km2'] == pytest.approx(direct['area_km2'])
+    assert coarse['latitude'] == pytest.approx(direct['latitude'])
+
+
+def test_get_pyramid_filename():
+    """
+    Unit test for naming files of a population raster pyramid level.
+
+    """
+    assert get_pyramid_filename('settlements.tif', 1) == 'settlements.tif'
+    assert get_pyramid_filename('settlements.tif', 5) == 'settlements_5km.tif'
+    assert get_pyramid_filename('lookup.csv', 25) == 'lookup_25km.csv'
+
+    for resolution_km in [0, 2, 1.5, 100]:
+        assert resolution_km not in PYRAMID_RESOLUTIONS_KM
+        with pytest.raises(ValueError):
+            get_pyramid_filename('settlements.tif', resolution_km)
+
+
+def test_aggregate_blocks():
+    """
+    Unit test for summing a population raster over square blocks.
+
+    """
+    array = np.random.default_rng(1).uniform(-1, 5, size=(23, 17))
+    array[3, 4] = np.nan
+    array[22, 16] = -99999
+
+    clean = np.where(array > 0, array, 0)
+
+    for factor in [1, 2, 5, 25]:
+        aggregated = aggregate_blocks(array, factor)
+
+        assert aggregated.shape == (-(-23 // factor), -(-17 // factor))
+        assert np.isfinite(aggregated).all()
+        assert aggregated.sum() == pytest.approx(clean.sum())
+
+    #the ragged last block holds only the leftover pixels
+    aggregated = aggregate_blocks(array, 5)
+    assert aggregated[4, 3] == pytest.approx(clean[20:, 15:].sum())
+    assert aggregated[0, 0] == pytest.approx(clean[:5, :5].sum())
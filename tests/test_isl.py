@@ -0,0 +1,200 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from globalsat.orbits import generate_walker_constellation, calc_ecef_positions
+from globalsat.visibility import calc_ground_positions
+from globalsat.isl import (
+    build_grid_edges,
+    build_snapshot_graph,
+    is_shortest_path_latency,
+    calc_tree_latency,
+    IslRouter,
+    calc_latency_distribution
+)
+
+
+def test_build_grid_edges():
+    """
+    Unit test for building the +Grid inter-satellite links.
+
+    """
+    elements = generate_walker_constellation(4, 5, 1, 53, 550)
+
+    edges, cross_plane = build_grid_edges(elements)
+
+    #every satellite has four links
+    assert len(edges) == 40
+    assert np.bincount(edges.ravel()).tolist() == [4] * 20
+    assert cross_plane.sum() == 20
+    assert [0, 1] in edges.tolist() and [0, 5] in edges.tolist()
+
+    #two satellites per plane share a single in-plane link
+    edges, cross_plane = build_grid_edges(generate_walker_constellation(3, 2, 0, 53, 550))
+    assert (~cross_plane).sum() == 3
+
+
+def test_build_snapshot_graph():
+    """
+    Unit test for building a snapshot graph of satellites and gateways.
+
+    """
+    elements = generate_walker_constellation(6, 10, 1, 53, 550)
+    positions = calc_ecef_positions(elements, [0])[0]
+    edges, cross_plane = build_grid_edges(elements)
+    gateways = calc_ground_positions([0, 40], [0, 100])
+
+    graph = build_snapshot_graph(positions, edges, cross_plane, gateways, 25)
+
+    assert graph.shape == (62, 62)
+    assert (graph != graph.T).nnz == 0
+    assert graph[:60, 60:].nnz > 0
+
+    #a link between adjacent satellites in a plane takes about 14 ms
+    assert 0.01 < graph[0, 1] < 0.02
+
+    polar = build_snapshot_graph(positions, edges, cross_plane, gateways, 25,
+        max_latitude_deg=0)
+    assert graph[:60, :60].nnz - polar[:60, :60].nnz == 2 * cross_plane.sum()
+
+
+def test_calc_tree_latency():
+    """
+    Unit test for summing delays along a shortest path tree.
+
+    """
+    elements = generate_walker_constellation(6, 10, 1, 53, 550)
+    edges, cross_plane = build_grid_edges(elements)
+    gateways = calc_ground_positions([0, 40], [0, 100])
+
+    positions = calc_ecef_positions(elements, [0, 1])
+    graph = build_snapshot_graph(positions[0], edges, cross_plane, gateways, 25)
+    moved = build_snapshot_graph(positions[1], edges, cross_plane, gateways, 25)
+
+    latency, predecessors, _ = dijkstra(graph, indices=[60, 61], min_only=True,
+        return_predecessors=True)
+    predecessors[[60, 61]] = [60, 61]
+
+    assert np.allclose(calc_tree_latency(graph, predecessors), latency)
+
+    #the same routes give almost the same latency a second later
+    assert np.allclose(calc_tree_latency(moved, predecessors), latency, rtol=0.01)
+
+
+def test_isl_router():
+    """
+    Unit test for reusing cached routes while the topology is unchanged.
+
+    """
+    elements = generate_walker_constellation(6, 10, 1, 53, 550)
+    edges, cross_plane = build_grid_edges(elements)
+    gateways = calc_ground_positions([0, 40], [0, 100])
+    positions = calc_ecef_positions(elements, [0, 1])
+
+    router = IslRouter()
+
+    graph = build_snapshot_graph(positions[0], edges, cross_plane, gateways, 25)
+    first = router.calc_latency_to_gateway(graph, [60, 61])
+
+    moved = build_snapshot_graph(positions[1], edges, cross_plane, gateways, 25)
+    second = router.calc_latency_to_gateway(moved, [60, 61])
+
+    assert router.searches == 1 and router.reuses == 1
+    assert np.allclose(second, dijkstra(moved, indices=[60, 61], min_only=True))
+    assert np.all(np.isfinite(first))
+    assert np.allclose(second, first, rtol=0.01)
+    assert second[[60, 61]].tolist() == [0, 0]
+
+
+def test_isl_router_changed_weights():
+    """
+    Unit test for repairing cached routes which are no longer shortest.
+
+    """
+    #a square of nodes 0-1-2-3-0 with gateway node 0
+    rows = np.array([0, 1, 2, 3])
+    cols = np.array([1, 2, 3, 0])
+    shape = (4, 4)
+
+    def build(weights):
+        graph = csr_matrix((np.r_[weights, weights], (np.r_[rows, cols],
+            np.r_[cols, rows])), shape=shape)
+        graph.sort_indices()
+        return graph
+
+    router = IslRouter()
+
+    graph = build([1.0, 1.0, 1.0, 5.0])
+    latency = router.calc_latency_to_gateway(graph, [0])
+    assert latency.tolist() == [0, 1, 2, 3]
+
+    #node 3 is now closer through its direct link
+    moved = build([1.0, 1.0, 1.0, 0.5])
+    latency = router.calc_latency_to_gateway(moved, [0])
+    expected = dijkstra(moved, indices=[0], min_only=True)
+
+    assert not is_shortest_path_latency(moved, calc_tree_latency(moved,
+        np.array([0, 0, 1, 2])))
+    assert np.allclose(latency, expected)
+    assert router.searches == 1 and router.repairs == 1 and router.reuses == 0
+
+    #the repaired tree is reused while it stays shortest
+    latency = router.calc_latency_to_gateway(build([1.0, 1.2, 1.0, 0.4]), [0])
+    assert np.allclose(latency, [0, 1, 1.4, 0.4])
+    assert router.searches == 1 and router.reuses == 1
+
+
+def test_isl_router_changed_gateway_links():
+    """
+    Unit test for reusing cached routes when only gateway links change.
+
+    """
+    #a chain of satellites 0-1-2-3 and a gateway node 4
+    def build(links):
+        rows = np.r_[[0, 1, 2], [link[0] for link in links]]
+        cols = np.r_[[1, 2, 3], [4] * len(links)]
+        weights = np.r_[[1.0, 1.0, 1.0], [link[1] for link in links]]
+        graph = csr_matrix((np.r_[weights, weights], (np.r_[rows, cols],
+            np.r_[cols, rows])), shape=(5, 5))
+        graph.sort_indices()
+        return graph
+
+    router = IslRouter()
+
+    router.calc_latency_to_gateway(build([(0, 2.0), (3, 2.0)]), [4])
+
+    #a new link to satellite 2 is not on any shortest path
+    graph = build([(0, 2.0), (2, 5.0), (3, 2.1)])
+    latency = router.calc_latency_to_gateway(graph, [4])
+
+    assert np.allclose(latency, dijkstra(graph, indices=[4], min_only=True))
+    assert router.searches == 1 and router.reuses > 0
+
+    #losing the link to satellite 3 breaks its subtree, which is repaired
+    graph = build([(0, 2.0), (2, 5.0)])
+    latency = router.calc_latency_to_gateway(graph, [4])
+
+    assert np.allclose(latency, dijkstra(graph, indices=[4], min_only=True))
+    assert router.searches == 1 and router.repairs == 1
+
+
+def test_calc_latency_distribution():
+    """
+    Unit test for region to gateway latency over time.
+
+    """
+    elements = generate_walker_constellation(6, 10, 1, 53, 550)
+    positions = calc_ecef_positions(elements, np.arange(0, 600, 120))
+
+    router = IslRouter()
+
+    latency = calc_latency_distribution(elements, positions,
+        [0, 30, 89], [10, -60, 0], [0, 40], [0, 100], 10, router=router)
+
+    assert latency.shape == (5, 3)
+
+    #no satellite of a 53 degree shell is visible from the pole
+    assert np.isinf(latency[:, 2]).all()
+
+    reachable = latency[np.isfinite(latency)]
+    assert len(reachable) > 0
+    assert (reachable > 0.001).all() and (reachable < 0.2).all()
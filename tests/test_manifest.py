@@ -0,0 +1,124 @@
+import os
+import pytest
+import manifest
+from manifest import (
+    calc_checksum,
+    fingerprint_file,
+    load_manifest,
+    save_manifest,
+    is_current,
+    record_step,
+    atomic_output
+)
+
+
+def write(path, text):
+    """
+    Write a small text file.
+
+    """
+    with open(path, 'w') as target:
+        target.write(text)
+
+
+def test_is_current(tmp_path, monkeypatch):
+    """
+    Unit test for checking whether a recorded step is still valid.
+
+    """
+    monkeypatch.setattr(manifest, 'CHECKSUMS', {})
+
+    path_input = str(tmp_path / 'input.txt')
+    path_output = str(tmp_path / 'output.txt')
+    write(path_input, 'input')
+    write(path_output, 'output')
+
+    steps = load_manifest(str(tmp_path))
+    assert not is_current(steps, 'step', [path_input], {'a': 1}, [path_output])
+
+    record_step(steps, 'step', [path_input], {'a': 1}, [path_output])
+    save_manifest(str(tmp_path), steps)
+    steps = load_manifest(str(tmp_path))
+
+    assert is_current(steps, 'step', [path_input], {'a': 1}, [path_output])
+    assert steps['steps']['step']['inputs'][path_input]['sha256'] == \
+        calc_checksum(path_input)
+
+    #a changed parameter, input or set of files
+    assert not is_current(steps, 'step', [path_input], {'a': 2}, [path_output])
+    assert not is_current(steps, 'step', [], {'a': 1}, [path_output])
+
+    write(path_input, 'changed input')
+    assert not is_current(steps, 'step', [path_input], {'a': 1}, [path_output])
+
+    record_step(steps, 'step', [path_input], {'a': 1}, [path_output])
+    os.remove(path_output)
+    assert not is_current(steps, 'step', [path_input], {'a': 1}, [path_output])
+
+
+def test_fingerprint_file(tmp_path, monkeypatch):
+    """
+    Unit test for skipping checksums of files whose size and mtime are
+    unchanged.
+
+    """
+    monkeypatch.setattr(manifest, 'CHECKSUMS', {})
+
+    hashed = []
+
+    def count_checksum(path):
+        hashed.append(path)
+        return calc_checksum(path)
+
+    monkeypatch.setattr(manifest, 'calc_checksum', count_checksum)
+
+    path = str(tmp_path / 'input.txt')
+    write(path, 'input')
+
+    fingerprint = fingerprint_file(path)
+    assert len(hashed) == 1
+
+    #hashed once per process, and not at all given an unchanged fingerprint
+    assert fingerprint_file(path) == fingerprint
+    monkeypatch.setattr(manifest, 'CHECKSUMS', {})
+    assert fingerprint_file(path, dict(fingerprint, sha256='recorded'))['sha256'] == 'recorded'
+    assert len(hashed) == 1
+
+    steps = {'steps': {}}
+    record_step(steps, 'step', [path], {}, [])
+    monkeypatch.setattr(manifest, 'CHECKSUMS', {})
+    assert is_current(steps, 'step', [path], {}, [])
+    assert len(hashed) == 1
+
+    #a new modification time is hashed again
+    os.utime(path, (0, fingerprint['mtime'] + 10))
+    assert fingerprint_file(path, fingerprint)['sha256'] == fingerprint['sha256']
+    assert len(hashed) == 2
+
+
+def test_atomic_output(tmp_path):
+    """
+    Unit test for replacing outputs only once they are complete.
+
+    """
+    path = str(tmp_path / 'output.csv')
+
+    with pytest.raises(RuntimeError):
+        with atomic_output(path) as temp_path:
+            assert os.path.dirname(temp_path) == str(tmp_path)
+            assert temp_path.endswith('.csv')
+            write(temp_path, 'partial')
+            raise RuntimeError('interrupted')
+
+    assert os.listdir(str(tmp_path)) == []
+
+    write(path, 'old')
+
+    with atomic_output(path) as temp_path:
+        write(temp_path, 'new')
+        with open(path, 'r') as source:
+            assert source.read() == 'old'
+
+    with open(path, 'r') as source:
+        assert source.read() == 'new'
+    assert os.listdir(str(tmp_path)) == ['output.csv']
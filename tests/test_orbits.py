@@ -0,0 +1,72 @@
+import numpy as np
+from globalsat.geometry import EARTH_RADIUS_EQUATOR_KM
+from globalsat.orbits import (
+    EARTH_ROTATION_RATE,
+    generate_walker_constellation,
+    calc_ecef_positions,
+    propagate_to_memmap
+)
+
+
+def test_generate_walker_constellation():
+    """
+    Unit test for generating Walker-delta orbital elements.
+
+    """
+    elements = generate_walker_constellation(3, 4, 1, 53, 550)
+
+    assert len(elements['raan']) == 12
+    assert elements['plane'].tolist() == [0] * 4 + [1] * 4 + [2] * 4
+    assert np.allclose(np.degrees(elements['raan'][[0, 4, 8]]), [0, 120, 240])
+    assert np.allclose(np.degrees(elements['mean_anomaly'][[0, 1, 4]]), [0, 90, 30])
+
+    #a 550 km orbit has a period of about 95.6 minutes
+    period = 2 * np.pi / elements['mean_motion'][0] / 60
+    assert round(period, 1) == 95.6
+
+
+def test_calc_ecef_positions():
+    """
+    Unit test for calculating Earth-fixed satellite positions.
+
+    """
+    elements = generate_walker_constellation(3, 4, 1, 53, 550)
+
+    positions = calc_ecef_positions(elements, [0, 60, 120])
+
+    assert positions.shape == (3, 12, 3)
+    assert np.allclose(np.linalg.norm(positions, axis=-1),
+        EARTH_RADIUS_EQUATOR_KM + 550)
+
+    #maximum latitude equals the inclination
+    quarter_orbit = np.pi / 2 / elements['mean_motion'][0]
+    position = calc_ecef_positions(elements, [quarter_orbit])[0, 0]
+    latitude = np.degrees(np.arcsin(position[2] / np.linalg.norm(position)))
+    assert round(latitude, 6) == 53
+
+    #at the epoch the first satellite is at the ascending node on the x axis
+    assert np.allclose(positions[0, 0], [EARTH_RADIUS_EQUATOR_KM + 550, 0, 0])
+
+    #a geostationary satellite stays above the same point
+    elements = generate_walker_constellation(1, 1, 0, 0, 35786)
+    elements['mean_motion'][:] = EARTH_ROTATION_RATE
+    positions = calc_ecef_positions(elements, [0, 3600, 7200])
+    assert np.allclose(positions[0], positions[2])
+
+
+def test_propagate_to_memmap(tmp_path):
+    """
+    Unit test for propagating in time chunks into a memory-mapped file.
+
+    """
+    elements = generate_walker_constellation(4, 5, 2, 87.9, 1200)
+
+    path = str(tmp_path / 'positions.npy')
+
+    positions = propagate_to_memmap(elements, 600, 10, path,
+        max_chunk_bytes=1000, dtype=np.float64)
+
+    assert positions.shape == (61, 20, 3)
+    assert not positions.flags.writeable
+    assert np.allclose(positions,
+        calc_ecef_positions(elements, np.arange(0, 601, 10)))
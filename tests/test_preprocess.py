@@ -0,0 +1,472 @@
+import os
+import numpy as np
+import fiona
+import geopandas as gpd
+import pandas as pd
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from shapely.geometry import box, MultiPolygon
+from globalsat.geometry import calc_area_from_equator
+import preprocess
+from preprocess import (
+    get_layer_name,
+    partition_boundaries,
+    calc_layer_checksum,
+    calc_layer_signature,
+    is_layer_current,
+    load_boundaries,
+    open_raster,
+    get_window,
+    read_raster_window,
+    get_raster_cache_paths,
+    cache_raster,
+    load_raster,
+    create_pop_regional_lookup,
+    create_pop_grid_lookup,
+    calc_regional_population,
+    exclude_small_shapes,
+    get_area,
+    process_countries,
+    merge_lookups,
+    LOOKUP_COLUMNS
+)
+from manifest import load_manifest, save_manifest
+
+
+@pytest.fixture
+def data_folders(tmp_path, monkeypatch):
+    """
+    Point the preprocessing paths at empty raw and intermediate folders.
+
+    """
+    raw = tmp_path / 'raw'
+    intermediate = tmp_path / 'intermediate'
+    os.makedirs(raw / 'gadm36_levels_shp')
+    os.makedirs(intermediate)
+
+    monkeypatch.setattr(preprocess, 'DATA_RAW', str(raw))
+    monkeypatch.setattr(preprocess, 'DATA_INTERMEDIATE', str(intermediate))
+    monkeypatch.setattr(preprocess, 'PATH_BOUNDARIES',
+        str(intermediate / 'boundaries.gpkg'))
+
+    return raw, intermediate
+
+
+def write_gadm(raw):
+    """
+    Write small GADM level 0 and level 1 shapefiles and country information.
+
+    """
+    folder = os.path.join(raw, 'gadm36_levels_shp')
+
+    gpd.GeoDataFrame({'GID_0': ['AAA', 'BBB', 'ZZZ']},
+        geometry=[box(0, 0, 2, 2), box(10, 0, 11, 1), box(20, 0, 21, 1)],
+        crs='EPSG:4326').to_file(os.path.join(folder, 'gadm36_0.shp'))
+
+    gpd.GeoDataFrame({'GID_0': ['AAA', 'AAA', 'BBB'],
+        'GID_1': ['AAA.1_1', 'AAA.2_1', 'BBB.1_1']},
+        geometry=[box(0, 0, 1, 2), box(1, 0, 2, 2), box(10, 0, 11, 1)],
+        crs='EPSG:4326').to_file(os.path.join(folder, 'gadm36_1.shp'))
+
+    pd.DataFrame({'ISO_3digit': ['AAA', 'BBB', 'ZZZ'],
+        'continent': ['Africa', 'Asia', 'Europe']}).to_csv(
+        os.path.join(raw, 'global_information.csv'), index=False)
+
+
+def write_raster(path, array, transform):
+    """
+    Write a single band float GeoTIFF in degrees.
+
+    """
+    with rasterio.open(path, 'w', driver='GTiff', height=array.shape[0],
+        width=array.shape[1], count=1, dtype='float32', crs='EPSG:4326',
+        transform=transform, nodata=-1) as target:
+        target.write(array.astype('float32'), 1)
+
+
+def fake_process_country(country, resolution_km=1, grid_zoom=None):
+    """
+    Stand in for `process_country` which fails for one country.
+
+    """
+    if country['iso3'] == 'BBB':
+        raise ValueError('no boundaries')
+
+    return '{}_{}.csv'.format(country['iso3'], resolution_km)
+
+
+def test_get_layer_name():
+    """
+    Unit test for naming per-country boundary layers.
+
+    """
+    assert get_layer_name('AAA', 0) == 'national_outline_AAA'
+    assert get_layer_name('AAA', 2) == 'regions_2_AAA'
+
+
+def test_partition_boundaries(data_folders):
+    """
+    Unit test for splitting GADM layers into per-country layers.
+
+    """
+    raw, intermediate = data_folders
+    write_gadm(raw)
+
+    countries = [
+        {'iso3': 'AAA', 'regional_level': 1},
+        {'iso3': 'BBB', 'regional_level': 0},
+    ]
+
+    partition_boundaries(countries)
+
+    assert sorted(fiona.listlayers(preprocess.PATH_BOUNDARIES)) == [
+        'national_outline_AAA', 'national_outline_BBB', 'regions_1_AAA']
+
+    #each country layer holds only its own features
+    national = load_boundaries('AAA', 0)
+    assert national['GID_0'].tolist() == ['AAA']
+    assert national['continent'].tolist() == ['Africa']
+    assert load_boundaries('BBB', 0)['GID_0'].tolist() == ['BBB']
+    assert sorted(load_boundaries('AAA', 1)['GID_1']) == ['AAA.1_1', 'AAA.2_1']
+
+    #the manifest records the sources, parameters and stored layer
+    manifest = load_manifest(os.path.join(intermediate, 'AAA'))
+    entry = manifest['steps']['boundaries_1']
+    path = os.path.join(raw, 'gadm36_levels_shp', 'gadm36_1.shp')
+
+    assert sorted(entry['inputs']) == sorted([path, path.replace('.shp', '.dbf')])
+    assert entry['params'] == {'small_shape_thresholds':
+        preprocess.SMALL_SHAPE_THRESHOLDS}
+    assert entry['outputs'] == {}
+    assert entry['layer_sha256'] == calc_layer_checksum(load_boundaries('AAA', 1))
+
+    assert 'boundaries_1' not in load_manifest(
+        os.path.join(intermediate, 'BBB'))['steps']
+
+    #nothing is rewritten when the sources are unchanged
+    mtime = os.path.getmtime(preprocess.PATH_BOUNDARIES)
+    partition_boundaries(countries)
+    assert os.path.getmtime(preprocess.PATH_BOUNDARIES) == mtime
+
+
+def test_is_layer_current(data_folders, monkeypatch):
+    """
+    Unit test for checking stored boundary layers by signature, then checksum.
+
+    """
+    raw, intermediate = data_folders
+    write_gadm(raw)
+
+    countries = [
+        {'iso3': 'AAA', 'regional_level': 0},
+        {'iso3': 'BBB', 'regional_level': 0},
+    ]
+
+    partition_boundaries(countries)
+
+    manifest = load_manifest(os.path.join(intermediate, 'BBB'))
+    signature = calc_layer_signature('BBB', 0)
+
+    assert signature[0] == 1
+    assert signature[2:] == [10, 0, 11, 1]
+    assert manifest['steps']['boundaries_0']['layer_signature'] == signature
+    assert calc_layer_signature('BBB', 1) is None
+
+    checksums = []
+
+    def count_checksum(layer):
+        checksums.append(len(layer))
+        return calc_layer_checksum(layer)
+
+    monkeypatch.setattr(preprocess, 'calc_layer_checksum', count_checksum)
+
+    #unchanged layers are not read
+    assert is_layer_current(manifest, 'BBB', 0)
+    assert checksums == []
+
+    #an unknown signature falls back to the checksum, and is then recorded
+    manifest['steps']['boundaries_0']['layer_signature'] = None
+    assert is_layer_current(manifest, 'BBB', 0)
+    assert len(checksums) == 1
+    assert manifest['steps']['boundaries_0']['layer_signature'] == signature
+
+    #a layer changed outside the script is rewritten from the source
+    gpd.GeoDataFrame({'GID_0': ['BBB']}, geometry=[box(10, 0, 12, 1)],
+        crs='EPSG:4326').to_file(preprocess.PATH_BOUNDARIES,
+        layer='national_outline_BBB', driver='GPKG')
+
+    assert not is_layer_current(manifest, 'BBB', 0)
+
+    partition_boundaries(countries)
+
+    assert load_boundaries('BBB', 0).total_bounds.tolist() == [10, 0, 11, 1]
+    assert load_boundaries('BBB', 0)['continent'].tolist() == ['Asia']
+    assert is_layer_current(load_manifest(os.path.join(intermediate, 'BBB')),
+        'BBB', 0)
+
+
+def test_read_raster_window(tmp_path, monkeypatch):
+    """
+    Unit test for reading the pixels of a raster covering a bounding box.
+
+    """
+    monkeypatch.setattr(preprocess, 'RASTER_HANDLES', {})
+
+    path = str(tmp_path / 'settlements.tif')
+    array = np.arange(60, dtype=float).reshape(6, 10)
+    write_raster(path, array, from_origin(0, 6, 1, 1))
+
+    src = open_raster(path)
+    assert open_raster(path) is src
+
+    full = src.read()
+
+    #a box from x 2.5 to 5.5 and y 1.5 to 3.5 touches rows 2-4, columns 2-5
+    window, meta = read_raster_window(path, (2.5, 1.5, 5.5, 3.5))
+
+    assert np.array_equal(window, full[:, 2:5, 2:6])
+    assert (meta['height'], meta['width']) == (3, 4)
+    assert meta['transform'] == from_origin(2, 4, 1, 1)
+
+    #boxes are clipped to the raster
+    window = get_window(src, (-5, -5, 2, 20))
+    assert (window.row_off, window.col_off, window.height, window.width) == (0, 0, 6, 2)
+    assert get_window(src, (50, 50, 60, 60)).width == 0
+
+
+def test_cache_raster(tmp_path):
+    """
+    Unit test for caching a raster as a memory mapped array.
+
+    """
+    path = str(tmp_path / 'settlements.tif')
+    array = np.arange(60, dtype=float).reshape(6, 10)
+    transform = from_origin(-10, 5, 0.5, 0.25)
+    write_raster(path, array, transform)
+
+    with pytest.raises(ValueError):
+        load_raster(path)
+
+    manifest = {'steps': {}}
+    assert cache_raster(path, manifest)
+    assert not cache_raster(path, manifest)
+
+    cached, affine = load_raster(path)
+
+    assert isinstance(cached, np.memmap)
+    assert np.array_equal(cached, array)
+    assert tuple(affine)[:6] == tuple(transform)[:6]
+
+    with pytest.raises(ValueError):
+        cached[0, 0] = 1
+
+    #a changed raster is cached again
+    write_raster(path, array * 2, transform)
+    assert cache_raster(path, manifest)
+    assert np.array_equal(load_raster(path)[0], array * 2)
+
+
+def test_changed_raster_cache(data_folders):
+    """
+    Unit test for recomputing population lookups when the cached raster
+    they read changes.
+
+    """
+    raw, intermediate = data_folders
+    write_gadm(raw)
+
+    country = {'iso3': 'AAA', 'regional_level': 1}
+    partition_boundaries([country])
+
+    #half degree pixels of population 1 over the country
+    path = os.path.join(intermediate, 'AAA', 'settlements.tif')
+    write_raster(path, np.ones((4, 4)), from_origin(0, 2, 0.5, 0.5))
+
+    manifest = load_manifest(os.path.join(intermediate, 'AAA'))
+    cache_raster(path, manifest)
+    save_manifest(os.path.join(intermediate, 'AAA'), manifest)
+
+    regional = create_pop_regional_lookup(country)
+    grid = create_pop_grid_lookup(country, 2)
+
+    assert [region['population'] for region in regional] == [8, 8]
+    assert sum(tile['population'] for tile in grid) == 16
+
+    #the cache is changed while the raster itself is not
+    path_array = get_raster_cache_paths(path)[0]
+    np.save(path_array, np.full((4, 4), 2, dtype='float32'))
+
+    regional = create_pop_regional_lookup(country)
+    grid = create_pop_grid_lookup(country, 2)
+
+    assert [region['population'] for region in regional] == [16, 16]
+    assert sum(tile['population'] for tile in grid) == 32
+
+
+def test_calc_regional_population(tmp_path):
+    """
+    Unit test for summing the population of regions from a raster.
+
+    """
+    #one degree pixels from 0 to 4 E and 0 to 4 N, valued 1 to 16 by row
+    array = np.arange(1, 17, dtype=float).reshape(4, 4)
+    array[2, 2] = np.nan
+    array[3, 3] = -5
+    array[1, 2] = np.nan
+
+    path = str(tmp_path / 'settlements.tif')
+    write_raster(path, array, from_origin(0, 4, 1, 1))
+    cache_raster(path, {'steps': {}})
+
+    geometries = [
+        box(0, 2, 2, 4), #pixels 1, 2, 5 and 6
+        box(2, 0, 4, 2), #pixels 11, 12, 15 and 16, with NaN and negative
+        box(2, 2, 3, 3), #one NaN pixel only
+        box(0.2, 0.2, 0.8, 0.8), #0.36 of pixel 13, including its centre
+        box(0.1, 1.1, 0.4, 1.4), #0.09 of pixel 9, missing its centre
+    ]
+
+    population = calc_regional_population(geometries, path,
+        fractional_coverage=False)
+
+    assert population[:2].tolist() == [14, 27]
+    assert np.isnan(population[2])
+    assert population[3] == 13
+    assert np.isnan(population[4])
+
+    population = calc_regional_population(geometries, path, supersample=10,
+        block_rows=3)
+
+    assert population[:2].tolist() == [14, 27]
+    assert np.isnan(population[2])
+    assert population[3:].tolist() == pytest.approx([0.36 * 13, 0.09 * 9])
+
+
+def test_process_countries(monkeypatch):
+    """
+    Unit test for preprocessing countries largest first, isolating failures.
+
+    """
+    countries = [
+        {'iso3': 'AAA', 'area': 1},
+        {'iso3': 'BBB', 'area': 5},
+        {'iso3': 'CCC', 'area': 3},
+    ]
+
+    started = []
+
+    def record(country, resolution_km=1, grid_zoom=None):
+        started.append(country['iso3'])
+        return fake_process_country(country, resolution_km, grid_zoom)
+
+    monkeypatch.setattr(preprocess, 'process_country', record)
+
+    paths, failures = process_countries(countries, 1, resolution_km=5)
+
+    assert started == ['BBB', 'CCC', 'AAA']
+    assert paths == ['CCC_5.csv', 'AAA_5.csv']
+    assert failures == [('BBB', "ValueError('no boundaries')")]
+
+    #worker processes report failures the same way
+    monkeypatch.setattr(preprocess, 'process_country', fake_process_country)
+
+    paths, failures = process_countries(countries, 2)
+
+    assert sorted(paths) == ['AAA_1.csv', 'CCC_1.csv']
+    assert failures == [('BBB', "ValueError('no boundaries')")]
+
+
+def test_merge_lookups(tmp_path):
+    """
+    Unit test for merging country lookups, skipping empty ones.
+
+    """
+    lookup = pd.DataFrame([['AAA', 'AAA.1_1', 10, 2, 5, 1.5]],
+        columns=LOOKUP_COLUMNS)
+
+    path_full = str(tmp_path / 'full.csv')
+    lookup.to_csv(path_full, index=False)
+
+    path_empty = str(tmp_path / 'empty.csv')
+    open(path_empty, 'w').close()
+
+    path_header = str(tmp_path / 'header.csv')
+    pd.DataFrame(columns=LOOKUP_COLUMNS).to_csv(path_header, index=False)
+
+    path_output = str(tmp_path / 'global.csv')
+
+    skipped = merge_lookups([path_header, path_full, path_empty], path_output)
+
+    assert sorted(skipped) == [(path_empty, 'empty file'), (path_header, 'no regions')]
+    pd.testing.assert_frame_equal(pd.read_csv(path_output), lookup)
+
+    #with no regions at all only the column names are written
+    skipped = merge_lookups([path_empty, path_header], path_output)
+
+    assert len(skipped) == 2
+    with open(path_output, 'r') as source:
+        assert source.read().strip() == ','.join(LOOKUP_COLUMNS)
+
+
+def test_get_area():
+    """
+    Unit test for the equal-area size of regions at low and high latitude.
+
+    """
+    geometries = gpd.GeoSeries([box(10, 0, 11, 1), box(10, 70, 11, 71)],
+        crs='EPSG:4326')
+
+    expected = [(calc_area_from_equator(top) - calc_area_from_equator(bottom)) / 360
+        for bottom, top in [(0, 1), (70, 71)]]
+
+    assert get_area(geometries) == pytest.approx(expected, rel=1e-4)
+
+    #geometries without a CRS are taken to be in degrees
+    assert get_area(gpd.GeoSeries([box(10, 70, 11, 71)])) == pytest.approx(
+        expected[1:], rel=1e-4)
+
+
+def test_exclude_small_shapes():
+    """
+    Unit test for removing tiny islands, against the former per-feature loop.
+
+    """
+    def exclude_small_shapes_loop(x):
+        if x.geometry.geom_type == 'Polygon':
+            return x.geometry
+        elif x.geometry.geom_type == 'MultiPolygon':
+            if x.geometry.area < 0.01:
+                return x.geometry
+            if x['GID_0'] in ['CHL', 'IDN', 'RUS', 'GRL', 'CAN', 'USA']:
+                threshold = 0.01
+            elif x.geometry.area > 50:
+                threshold = 0.1
+            else:
+                threshold = 0.001
+            return MultiPolygon([y for y in x.geometry.geoms if y.area > threshold])
+
+    def islands(sides):
+        return MultiPolygon([box(10 * idx, 0, 10 * idx + side, side)
+            for idx, side in enumerate(sides)])
+
+    layer = gpd.GeoDataFrame({'GID_0': ['AAA', 'CAN', 'BBB', 'CCC', 'DDD', 'USA']},
+        geometry=[
+            islands([1, 0.02, 0.05, 0.2]), #only the 0.0004 island is below 0.001
+            islands([1, 0.05, 0.2]), #national threshold of 0.01
+            islands([8, 0.2, 0.4]), #larger threshold of 0.1 above 50
+            box(0, 0, 0.01, 0.01), #polygons are kept
+            islands([0.05, 0.05]), #total area below 0.01 is kept
+            islands([0.08, 0.08]), #every part removed
+        ], index=[3, 5, 7, 9, 11, 13])
+
+    geometry = exclude_small_shapes(layer)
+
+    assert geometry.index.tolist() == layer.index.tolist()
+    assert [len(geom.geoms) for geom in geometry[[3, 5, 7]]] == [3, 2, 2]
+
+    for (_, row), geom in zip(layer.iterrows(), geometry):
+        expected = exclude_small_shapes_loop(row)
+        assert geom.geom_type == expected.geom_type
+        assert geom.is_empty == expected.is_empty
+        assert geom.is_empty or geom.equals(expected)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from globalsat.sensitivity import (
+    generate_saltelli_samples,
+    calc_sobol_indices
+)
+
+
+def test_generate_saltelli_samples():
+    """
+    Unit test for generating a Saltelli sample design.
+
+    """
+    n = 4
+    samples = generate_saltelli_samples([0, 10, 100], [1, 1, 1], n, 42)
+
+    assert samples.shape == (4 * (3 + 2), 3)
+
+    a, b = samples[:n], samples[n:2 * n]
+    ab_2 = samples[3 * n:4 * n]
+
+    #AB_2 takes the second column from B and all others from A
+    assert (ab_2[:, 1] == b[:, 1]).all()
+    assert (ab_2[:, [0, 2]] == a[:, [0, 2]]).all()
+
+    assert (samples == generate_saltelli_samples([0, 10, 100], [1, 1, 1], n, 42)).all()
+
+
+def test_calc_sobol_indices():
+    """
+    Unit test for estimating Sobol indices.
+
+    For y = x1 + 0.5 x2 + x1 x3 with standard normal inputs the variance is
+    2.25, giving S1 = (0.444, 0.111, 0) and ST = (0.889, 0.111, 0.444).
+
+    """
+    n = 20000
+    samples = generate_saltelli_samples([0, 0, 0], [1, 1, 1], n, 1)
+    y = samples[:, 0] + 0.5 * samples[:, 1] + samples[:, 0] * samples[:, 2]
+
+    indices = calc_sobol_indices(y, n, 3, seed_value=2)
+
+    assert indices['S1'] == pytest.approx([0.444, 0.111, 0], abs=0.05)
+    assert indices['ST'] == pytest.approx([0.889, 0.111, 0.444], abs=0.05)
+    assert (indices['S1_conf'] > 0).all()
+    assert (indices['ST_conf'] > 0).all()
+
+    with pytest.raises(ValueError):
+        calc_sobol_indices(y[:-1], n, 3)
+
+    indices = calc_sobol_indices(np.ones(5 * 4), 4, 3)
+
+    assert np.isnan(indices['S1']).all()
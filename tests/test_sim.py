@@ -1,6 +1,8 @@
+import numpy as np
 import pytest
 from globalsat.sim import (
     system_capacity,
+    calc_link_budget,
     calc_geographic_metrics,
     calc_free_space_path_loss,
     generate_log_normal_dist_value,
@@ -11,6 +13,7 @@ from globalsat.sim import (
     calc_noise,
     calc_cnr,
     calc_spectral_efficiency,
+    calc_spectral_efficiency_batch,
     calc_capacity,
     single_satellite_capacity,
     calc_agg_capacity,
@@ -46,6 +49,26 @@ def test_system_capacity(setup_params, setup_lut):
     assert round(results['capacity_kmsq']) == 288
 
 
+def test_calc_link_budget(setup_params, setup_lut):
+    """
+    Unit test for the batched link budget.
+
+    """
+    distance = np.array([10, 10, 1000])
+    random_variations = np.array([0, 1, 0])
+
+    setup_params['receiver_gain'] = np.array([38, 38, 30])
+
+    results = calc_link_budget(distance, setup_params, random_variations, setup_lut)
+
+    assert np.round(results['path_loss']).tolist() == [135, 136, 175]
+    assert round(results['antenna_gain']) == 38
+    assert np.round(results['received_power']).tolist() == [-40, -41, -88]
+    assert results['spectral_efficiency'].tolist() == [5.768987, 5.768987, 1.647211]
+    assert np.round(results['channel_capacity']).tolist() == [1442, 1442, 412]
+    assert np.round(results['aggregate_capacity']).tolist() == [2884, 2884, 824]
+
+
 def test_calc_geographic_metrics():
     """
     Unit test for calculating geographic metrics including:
@@ -190,6 +213,18 @@ def test_calc_spectral_efficiency(setup_lut):
     assert calc_spectral_efficiency(28, setup_lut) == 5.768987 # bits/Hz/s
 
 
+def test_calc_spectral_efficiency_batch(setup_lut):
+    """
+    Unit test for finding the spectral efficiency of an array of cnr values.
+
+    """
+    cnr = np.linspace(-5, 25, 601)
+
+    expected = [calc_spectral_efficiency(value, setup_lut) for value in cnr]
+
+    assert calc_spectral_efficiency_batch(cnr, setup_lut).tolist() == expected
+
+
 def test_calc_capacity():
     """
     Unit test for calculating the channel capacity.
@@ -238,12 +273,12 @@ def test_soyuz_fg():
     kerosene = 7360
 
     emission = soyuz_fg(hypergolic, kerosene)
-    assert emission['alumina_emission'] == 586.15   
-    assert emission["sulphur_emission"] == 157.857
-    assert emission["carbon_emission"] == 57564.520000000004
-    assert emission["cfc_gases"] == 3157.1399999999994
-    assert emission["particulate_matter"] == 635.7622
-    assert emission["photo_oxidation"] == 4162.923167999999                         
+    assert emission['alumina_emission'] == pytest.approx(586.15)   
+    assert emission["sulphur_emission"] == pytest.approx(157.857)
+    assert emission["carbon_emission"] == pytest.approx(57564.520000000004)
+    assert emission["cfc_gases"] == pytest.approx(3157.1399999999994)
+    assert emission["particulate_matter"] == pytest.approx(635.7622)
+    assert emission["photo_oxidation"] == pytest.approx(4162.923167999999)                         
 
 
 def test_falcon_9():
@@ -255,12 +290,12 @@ def test_falcon_9():
 
     emission = falcon_9(kerosene)
 
-    assert emission['alumina_emission'] == 24418.5                  
-    assert emission["sulphur_emission"] == 341.859
-    assert emission["carbon_emission"] == 171906.24
-    assert emission["cfc_gases"] == 6837.18
-    assert emission["particulate_matter"] == 24525.9414
-    assert emission["photo_oxidation"] == 12246.756816000003
+    assert emission['alumina_emission'] == pytest.approx(24418.5)                  
+    assert emission["sulphur_emission"] == pytest.approx(341.859)
+    assert emission["carbon_emission"] == pytest.approx(171906.24)
+    assert emission["cfc_gases"] == pytest.approx(6837.18)
+    assert emission["particulate_matter"] == pytest.approx(24525.9414)
+    assert emission["photo_oxidation"] == pytest.approx(12246.756816000003)
 
 
 def test_falcon_heavy():
@@ -272,12 +307,12 @@ def test_falcon_heavy():
 
     emission = falcon_heavy(kerosene)
 
-    assert emission['alumina_emission'] == 69850.0          
-    assert emission["sulphur_emission"] == 977.9
-    assert emission["carbon_emission"] == 491744.0
-    assert emission["cfc_gases"] == 19558.0
-    assert emission["particulate_matter"] == 70157.34
-    assert emission["photo_oxidation"] == 35032.289600000004
+    assert emission['alumina_emission'] == pytest.approx(69850.0)          
+    assert emission["sulphur_emission"] == pytest.approx(977.9)
+    assert emission["carbon_emission"] == pytest.approx(491744.0)
+    assert emission["cfc_gases"] == pytest.approx(19558.0)
+    assert emission["particulate_matter"] == pytest.approx(70157.34)
+    assert emission["photo_oxidation"] == pytest.approx(35032.289600000004)
 
 
 def test_ariane():
@@ -291,12 +326,12 @@ def test_ariane():
 
     emission = ariane(hypergolic, solid, cryogenic)
 
-    assert emission['alumina_emission'] == 158410.0               
-    assert emission["sulphur_emission"] == 65176.43
-    assert emission["carbon_emission"] == 54360.0
-    assert emission["cfc_gases"] == 86728.6
-    assert emission["particulate_matter"] == 158980.878
-    assert emission["photo_oxidation"] == 6313.124
+    assert emission['alumina_emission'] == pytest.approx(158410.0)               
+    assert emission["sulphur_emission"] == pytest.approx(65176.43)
+    assert emission["carbon_emission"] == pytest.approx(54360.0)
+    assert emission["cfc_gases"] == pytest.approx(86728.6)
+    assert emission["particulate_matter"] == pytest.approx(158980.878)
+    assert emission["photo_oxidation"] == pytest.approx(6313.124)
 
 
 def test_emission_per_sat():
@@ -310,12 +345,12 @@ def test_emission_per_sat():
     fuel_mass_2 = 0
     fuel_mass_3 = 0
     sat_emissions = calc_per_sat_emission("Starlink", fuel_mass, fuel_mass_1, fuel_mass_2, fuel_mass_3)
-    assert sat_emissions['alumina_emission'] == 24418.5   #'alumina_emission': 158410.0 for Kuiper.
-    assert sat_emissions["sulphur_emission"] == 341.859
-    assert sat_emissions["carbon_emission"] == 171906.24
-    assert sat_emissions["cfc_gases"] == 6837.18
-    assert sat_emissions["particulate_matter"] == 24525.9414
-    assert sat_emissions["photo_oxidation"] == 12246.756816000003
+    assert sat_emissions['alumina_emission'] == pytest.approx(24418.5)   #'alumina_emission': 158410.0 for Kuiper.
+    assert sat_emissions["sulphur_emission"] == pytest.approx(341.859)
+    assert sat_emissions["carbon_emission"] == pytest.approx(171906.24)
+    assert sat_emissions["cfc_gases"] == pytest.approx(6837.18)
+    assert sat_emissions["particulate_matter"] == pytest.approx(24525.9414)
+    assert sat_emissions["photo_oxidation"] == pytest.approx(12246.756816000003)
     
     fuel_mass = 218150
     fuel_mass_1 = 7360
@@ -323,21 +358,21 @@ def test_emission_per_sat():
     fuel_mass_3 = 0
 
     sat_emissions = calc_per_sat_emission("OneWeb", fuel_mass, fuel_mass_1, fuel_mass_2, fuel_mass_3)
-    assert sat_emissions['alumina_emission'] == 7.36 
-    assert sat_emissions["sulphur_emission"] == 5.152
-    assert sat_emissions["carbon_emission"] == 1854.72
-    assert sat_emissions["cfc_gases"] == 103.04
-    assert sat_emissions["particulate_matter"] == 8.9792
-    assert sat_emissions["photo_oxidation"] == 134.222848
+    assert sat_emissions['alumina_emission'] == pytest.approx(7.36) 
+    assert sat_emissions["sulphur_emission"] == pytest.approx(5.152)
+    assert sat_emissions["carbon_emission"] == pytest.approx(1854.72)
+    assert sat_emissions["cfc_gases"] == pytest.approx(103.04)
+    assert sat_emissions["particulate_matter"] == pytest.approx(8.9792)
+    assert sat_emissions["photo_oxidation"] == pytest.approx(134.222848)
 
     fuel_mass = 0
     fuel_mass_1 = 10000
     fuel_mass_2 = 480000
     fuel_mass_3 = 184900
     sat_emissions = calc_per_sat_emission("Kuiper", fuel_mass, fuel_mass_1, fuel_mass_2, fuel_mass_3)
-    assert sat_emissions['alumina_emission'] == 158410.0 
-    assert sat_emissions["sulphur_emission"] == 65176.43
-    assert sat_emissions["carbon_emission"] == 54360.0
-    assert sat_emissions["cfc_gases"] == 86728.6
-    assert sat_emissions["particulate_matter"] == 158980.878
-    assert sat_emissions["photo_oxidation"] == 6313.124
\ No newline at end of file
+    assert sat_emissions['alumina_emission'] == pytest.approx(158410.0) 
+    assert sat_emissions["sulphur_emission"] == pytest.approx(65176.43)
+    assert sat_emissions["carbon_emission"] == pytest.approx(54360.0)
+    assert sat_emissions["cfc_gases"] == pytest.approx(86728.6)
+    assert sat_emissions["particulate_matter"] == pytest.approx(158980.878)
+    assert sat_emissions["photo_oxidation"] == pytest.approx(6313.124)
\ No newline at end of file
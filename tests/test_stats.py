@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from globalsat.sim import system_capacity
+from globalsat.stats import (
+    RunningMoments,
+    QuantileSketch,
+    StreamingSummary
+)
+
+
+def test_running_moments():
+    """
+    Unit test for the running mean and variance.
+
+    """
+    values = np.random.default_rng(42).normal(3, 2, 1001)
+
+    moments = RunningMoments()
+    for batch in np.array_split(values, 7):
+        moments.update(batch)
+
+    assert moments.count == 1001
+    assert moments.mean == pytest.approx(values.mean())
+    assert moments.variance() == pytest.approx(values.var(ddof=1))
+    assert moments.min == values.min()
+    assert moments.max == values.max()
+
+    first, second = RunningMoments(), RunningMoments()
+    first.update(values[:10])
+    second.update(values[10:])
+    first.merge(second)
+
+    assert first.count == moments.count
+    assert first.mean == pytest.approx(moments.mean)
+    assert first.variance() == pytest.approx(moments.variance())
+
+    empty = RunningMoments()
+    empty.update([np.nan])
+
+    assert empty.count == 0
+    assert np.isnan(empty.variance())
+
+
+def test_quantile_sketch():
+    """
+    Unit test for the relative-error quantile sketch.
+
+    """
+    values = np.random.default_rng(42).normal(3, 2, 10000)
+
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.update(values)
+
+    for q in [0, 0.05, 0.5, 0.95, 1]:
+        expected = np.quantile(values, q, method='lower')
+        assert sketch.quantile(q) == pytest.approx(expected, rel=0.0101)
+
+    first, second = QuantileSketch(), QuantileSketch()
+    first.update(values[:3])
+    first.update([0, 0])
+    second.update(values[3:])
+    second.merge(QuantileSketch())
+    first.merge(second)
+
+    assert first.count == 10002
+    assert first.zero_count == 2
+    assert first.positive == sketch.positive
+    assert first.negative == sketch.negative
+
+    with pytest.raises(ValueError):
+        first.merge(QuantileSketch(relative_accuracy=0.05))
+
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_streaming_summary(setup_params, setup_lut):
+    """
+    Unit test for summarizing system capacity batches.
+
+    """
+    setup_params['iterations'] = 20
+
+    summary = StreamingSummary(['cnr', 'channel_capacity'])
+
+    results = []
+    for number_of_satellites in [10, 20]:
+        data = system_capacity('starlink', number_of_satellites, setup_params, setup_lut)
+        summary.update('starlink', data)
+        results = results + data
+
+    records = {item['metric']: item for item in summary.to_records()}
+    cnr = np.array([item['cnr'] for item in results])
+
+    assert records['cnr']['count'] == 40
+    assert records['cnr']['mean'] == pytest.approx(cnr.mean())
+    assert records['cnr']['std'] == pytest.approx(cnr.std(ddof=1))
+    assert records['cnr']['q50'] == pytest.approx(np.median(cnr), rel=0.05)
+
+    other = StreamingSummary(['cnr', 'channel_capacity'])
+    other.update('kuiper', {'cnr': [1, 2], 'channel_capacity': [3, 4]})
+    summary.merge(other)
+
+    groups = set(item['group'] for item in summary.to_records())
+
+    assert groups == {'starlink', 'kuiper'}
@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pytest
+from globalsat.orbits import EARTH_MU
+from globalsat.tle import (
+    parse_tle_file,
+    load_tle_catalog,
+    solve_kepler,
+    propagate_catalog
+)
+
+
+TLE = """ISS (ZARYA)
+1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927
+2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537
+1 44713U 19074A   20001.00000000  .00001264  00000-0  10270-3 0  9991
+2 44713  53.0000  90.0000 0001000   0.0000   0.0000 15.05500000  1234
+"""
+
+
+@pytest.fixture
+def tle_path(tmp_path):
+    path = tmp_path / 'catalog.txt'
+    path.write_text(TLE)
+    return str(path)
+
+
+def test_parse_tle_file(tle_path):
+    """
+    Unit test for parsing two- and three-line element sets.
+
+    """
+    catalog = parse_tle_file(tle_path)
+
+    assert len(catalog) == 2
+    assert catalog['name'].tolist() == ['ISS (ZARYA)', '']
+    assert catalog['catalog_number'].tolist() == [25544, 44713]
+    assert catalog['epoch'][0] == np.datetime64('2008-09-20T12:25:40.104192')
+    assert catalog['inclination'][0] == 51.6416
+    assert catalog['raan'][0] == 247.4627
+    assert catalog['eccentricity'][0] == pytest.approx(0.0006703)
+    assert catalog['argument_of_perigee'][0] == 130.5360
+    assert catalog['mean_anomaly'][0] == 325.0288
+    assert catalog['mean_motion'][0] == 15.72125391
+    assert catalog['bstar'].tolist() == pytest.approx([-0.11606e-4, 0.10270e-3])
+
+
+def test_load_tle_catalog(tle_path):
+    """
+    Unit test for caching parsed catalogs.
+
+    """
+    catalog = load_tle_catalog(tle_path)
+
+    cache_path = os.path.splitext(tle_path)[0] + '.npy'
+    assert os.path.exists(cache_path)
+
+    cached = load_tle_catalog(tle_path)
+    assert cached.dtype == catalog.dtype
+    assert (cached == catalog).all()
+
+
+def test_solve_kepler():
+    """
+    Unit test for solving Kepler's equation.
+
+    """
+    eccentricity = np.array([0, 0.1, 0.7])
+    eccentric_anomaly = solve_kepler(np.array([1.0, 2.0, 3.0]), eccentricity)
+
+    assert np.allclose(eccentric_anomaly - eccentricity * np.sin(eccentric_anomaly),
+        [1, 2, 3])
+
+
+def test_propagate_catalog(tle_path):
+    """
+    Unit test for propagating catalog objects over a time grid.
+
+    """
+    catalog = parse_tle_file(tle_path)
+
+    times = catalog['epoch'][1] + np.arange(0, 6000, 600).astype('timedelta64[s]')
+    positions = propagate_catalog(catalog, times)
+
+    assert positions.shape == (10, 2, 3)
+
+    #the near-circular orbit keeps its semi-major axis
+    mean_motion = catalog['mean_motion'][1] * 2 * np.pi / 86400
+    semi_major_axis = (EARTH_MU / mean_motion**2)**(1 / 3)
+    radius = np.linalg.norm(positions[:, 1], axis=-1)
+    assert np.allclose(radius, semi_major_axis, rtol=2e-4)
+
+    #the object starts at its ascending node on the equator
+    assert abs(positions[0, 1, 2]) < 1e-6
+
+    #J2 only changes positions slowly
+    two_body = propagate_catalog(catalog, times, include_j2=False)
+    difference = np.linalg.norm(positions - two_body, axis=-1)
+    assert difference[0, 1] == pytest.approx(0)
+    assert 0 < difference[-1, 1] < 100
@@ -0,0 +1,84 @@
+import numpy as np
+from globalsat.geometry import EARTH_RADIUS_EQUATOR_KM
+from globalsat.orbits import generate_walker_constellation, calc_ecef_positions
+from globalsat.sim import calc_link_budget
+from globalsat.visibility import (
+    calc_ground_positions,
+    find_visible_satellites,
+    calc_visibility,
+    calc_serving_slant_range
+)
+
+
+def test_find_visible_satellites():
+    """
+    Unit test for finding satellites above the elevation mask.
+
+    """
+    cells = calc_ground_positions([0, 0], [0, 90])
+
+    radius = EARTH_RADIUS_EQUATOR_KM + 500
+    satellites = np.array([
+        [radius, 0, 0], #overhead the first cell
+        [0, 0, radius], #over the pole
+        [0, -radius, 0], #opposite the second cell
+    ])
+
+    visibility = find_visible_satellites(cells, satellites, 25)
+
+    assert visibility['cell'].tolist() == [0]
+    assert visibility['satellite'].tolist() == [0]
+    assert np.allclose(visibility['slant_range'], 500)
+    assert np.allclose(visibility['elevation'], 90)
+
+
+def test_calc_visibility():
+    """
+    Unit test for visibility over a time grid against brute force.
+
+    """
+    elements = generate_walker_constellation(6, 10, 1, 53, 550)
+    positions = calc_ecef_positions(elements, np.arange(0, 600, 60))
+
+    latitude, longitude = np.meshgrid(np.arange(-60, 61, 10), np.arange(-180, 180, 20))
+    latitude, longitude = latitude.ravel(), longitude.ravel()
+
+    visibility = calc_visibility(latitude, longitude, positions, 25)
+
+    cells = calc_ground_positions(latitude, longitude)
+    line_of_sight = positions[:, np.newaxis] - cells[np.newaxis, :, np.newaxis]
+    distance = np.linalg.norm(line_of_sight, axis=-1)
+    zenith = cells / EARTH_RADIUS_EQUATOR_KM
+    sin_elevation = np.einsum('tcsk,ck->tcs', line_of_sight, zenith) / distance
+    expected = np.argwhere(sin_elevation >= np.sin(np.radians(25)))
+
+    found = np.stack([visibility['time_step'], visibility['cell'],
+        visibility['satellite']], axis=1)
+
+    assert len(expected) > 0
+    assert sorted(map(tuple, found)) == sorted(map(tuple, expected))
+
+    slant_range = calc_serving_slant_range(visibility, len(latitude), len(positions))
+    masked = np.where(sin_elevation >= np.sin(np.radians(25)), distance, np.inf)
+    assert np.allclose(slant_range, masked.min(axis=-1))
+
+
+def test_calc_serving_slant_range_link_budget(setup_params, setup_lut):
+    """
+    Unit test for passing slant ranges into the link budget.
+
+    """
+    visibility = {
+        'time_step': np.array([0, 0, 1]),
+        'cell': np.array([0, 0, 1]),
+        'slant_range': np.array([900.0, 600.0, 700.0]),
+    }
+
+    slant_range = calc_serving_slant_range(visibility, 2, 2)
+
+    assert slant_range.tolist() == [[600, np.inf], [np.inf, 700]]
+
+    link_budget = calc_link_budget(slant_range[slant_range < np.inf],
+        setup_params, [0, 0], setup_lut)
+
+    assert link_budget['path_loss'][0] < link_budget['path_loss'][1]